@@ -0,0 +1,19 @@
+-- Migration 0007: Episodic context-tag index
+-- Purpose: One row per (context tag, episode) so episodes can be looked up and
+-- intersected by tag through an index instead of LIKE scans over payload_json.
+-- EpisodicMemory creates this table on first use as well, and backfills it
+-- from the context_tags of the episodes already stored (in the monthly
+-- partitions, deduplicated payload bodies included); this migration only
+-- creates the schema.
+
+CREATE TABLE IF NOT EXISTS episodic_tags (
+    tag TEXT NOT NULL,
+    episodic_id TEXT NOT NULL,
+    created_at TEXT,
+    PRIMARY KEY (tag, episodic_id)
+);
+
+-- Covering index for "episodes with this tag, newest first"
+CREATE INDEX IF NOT EXISTS idx_episodic_tags_tag_created ON episodic_tags(tag, created_at, episodic_id);
+CREATE INDEX IF NOT EXISTS idx_episodic_tags_episode ON episodic_tags(episodic_id);
+
@@ -0,0 +1,8 @@
+-- Migration 0008: Keyset pagination indexes for the event logs
+-- Purpose: iter_all_events / iter_events_by_type page through the Stage-2 and
+-- Stage-3 event logs by (created_at, event_id); these indexes let every page
+-- start at the last key seen instead of re-sorting the log.
+
+CREATE INDEX IF NOT EXISTS idx_stage2_events_created ON stage2_events(created_at, event_id);
+CREATE INDEX IF NOT EXISTS idx_stage2_events_type_created ON stage2_events(event_type, created_at, event_id);
+CREATE INDEX IF NOT EXISTS idx_stage3_events_type_created ON stage3_advice_events(event_type, created_at, event_id);
@@ -0,0 +1,12 @@
+-- Migration 0009: Content-addressed episodic payloads
+-- Purpose: With episodic_payload_dedup enabled, payload bodies are stored once
+-- per distinct content (keyed by the SHA-256 of their canonical JSON) and
+-- episodes reference them through their payload_hash column.
+-- EpisodicMemory creates this table, and adds payload_hash to its partitions,
+-- on first use as well.
+
+CREATE TABLE IF NOT EXISTS episodic_payloads (
+    payload_hash TEXT PRIMARY KEY,
+    body_json TEXT NOT NULL,
+    created_at TEXT
+);
@@ -0,0 +1,13 @@
+-- Migration 0010: Delta-encoded BrainState snapshots
+-- Purpose: Snapshots are stored as keyframes (full JSON in brainstate_json)
+-- followed by JSON-patch deltas against the snapshot in base_snapshot_id.
+-- chain_length counts the deltas since the keyframe.
+-- bs_persistence adds these columns on first use, so they may already exist:
+-- ADD COLUMN IF NOT EXISTS (emulated for SQLite by migrate_template.py) skips
+-- them.
+
+ALTER TABLE brainstate_snapshots ADD COLUMN IF NOT EXISTS base_snapshot_id TEXT;
+ALTER TABLE brainstate_snapshots ADD COLUMN IF NOT EXISTS delta_json TEXT;
+ALTER TABLE brainstate_snapshots ADD COLUMN IF NOT EXISTS chain_length INTEGER DEFAULT 0;
+
+CREATE INDEX IF NOT EXISTS idx_brainstate_base ON brainstate_snapshots(base_snapshot_id);
@@ -0,0 +1,13 @@
+-- Migration 0011: Per-session BrainState snapshot numbering
+-- Purpose: session_seq numbers each job_seed's snapshots 1, 2, 3, ... so the
+-- latest one is well defined (created_at is often empty) and found through
+-- the (job_seed, session_seq) index. Also indexes (job_seed, created_at) for
+-- snapshots saved before the column existed.
+-- bs_persistence adds the column and indexes on first use, so the column may
+-- already exist: ADD COLUMN IF NOT EXISTS (emulated for SQLite by
+-- migrate_template.py) skips it.
+
+ALTER TABLE brainstate_snapshots ADD COLUMN IF NOT EXISTS session_seq INTEGER;
+
+CREATE INDEX IF NOT EXISTS idx_brainstate_job_seed_seq ON brainstate_snapshots(job_seed, session_seq);
+CREATE INDEX IF NOT EXISTS idx_brainstate_job_seed_created ON brainstate_snapshots(job_seed, created_at);
@@ -0,0 +1,18 @@
+-- Migration 0012: BrainState rehydration checkpoints
+-- Purpose: rehydrate.rebuild_brainstate stores the state it has rebuilt so
+-- far for a job (plain JSON), with the (created_at, episodic_id) key of the
+-- last episode applied and the episodes applied in the
+-- rehydrate_resume_slack_s window before it (recent_json); the next rebuild
+-- re-reads that window and resumes from there.
+-- core/rehydrate.py creates this table on first use as well.
+
+CREATE TABLE IF NOT EXISTS rehydrate_checkpoints (
+    job_seed TEXT PRIMARY KEY,
+    brainstate_json TEXT,
+    last_created_at TEXT,
+    last_episodic_id TEXT,
+    recent_json TEXT,
+    episodes_applied INTEGER,
+    created_at TEXT
+);
+
@@ -1,4 +1,5 @@
 import os
+import re
 import sys
 import argparse
 import sqlite3
@@ -15,6 +16,24 @@ def parse_db_url(url):
         # Assume it's already a file path
         return url
 
+_ADD_COLUMN_IF_NOT_EXISTS = re.compile(
+    r"ALTER\s+TABLE\s+(\w+)\s+ADD\s+COLUMN\s+IF\s+NOT\s+EXISTS\s+(\w+)([^;]*);", re.IGNORECASE
+)
+
+def guard_add_columns(conn, sql):
+    """
+    SQLite has no ADD COLUMN IF NOT EXISTS: drop those statements for
+    columns the table already has (e.g. added by the app on first use) and
+    run the others as plain ADD COLUMN.
+    """
+    def rewrite(match):
+        table, column, definition = match.groups()
+        existing = {row[1] for row in conn.execute(f"PRAGMA table_info({table})")}
+        if column in existing:
+            return ""
+        return f"ALTER TABLE {table} ADD COLUMN {column}{definition};"
+    return _ADD_COLUMN_IF_NOT_EXISTS.sub(rewrite, sql)
+
 def run_migration_sqlite(db_path, sql_file):
     # Parse URL if needed
     db_path = parse_db_url(db_path)
@@ -34,6 +53,7 @@ def run_migration_sqlite(db_path, sql_file):
     
     conn = sqlite3.connect(db_path)
     try:
+        sql = guard_add_columns(conn, sql)
         cursor = conn.cursor()
         cursor.executescript(sql)
         conn.commit()
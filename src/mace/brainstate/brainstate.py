@@ -1,6 +1,6 @@
-import copy
-from mace.core import deterministic, canonical
+from mace.core import deterministic
 from mace.config import config_loader
+from mace.brainstate import state_hash
 
 def create_snapshot(job_seed, initial_goals=None, resource_budget=None):
     """
@@ -71,6 +71,8 @@ def tick(brainstate, events=None):
     brainstate["attention_gain"] *= decay_rate
     
     # 2. Update WM TTLs and promote expired items (Rule 4.1)
+    # The snapshot carries (and hashes) every item's remaining TTL, so each
+    # tick rewrites all live items; WorkingMemory expires through ttl_wheel.
     active_wm = []
     promoted_items = []
     for item in brainstate["working_memory"]:
@@ -89,13 +91,10 @@ def tick(brainstate, events=None):
     # New ID depends on previous state + events
     # We need to canonicalize the state to hash it.
     # But we can't hash the ID itself if it's inside.
-    # So we hash the content excluding ID.
+    # So we hash the content excluding ID (serialized without a deepcopy,
+    # byte-identical to serializing a copy; see state_hash.py).
     
-    content_to_hash = copy.deepcopy(brainstate)
-    if "snapshot_id" in content_to_hash:
-        del content_to_hash["snapshot_id"]
-        
-    payload = canonical.canonical_json_serialize(content_to_hash)
+    payload = state_hash.state_payload(brainstate, exclude=("snapshot_id",))
     brainstate["snapshot_id"] = deterministic.deterministic_id("brainstate_snapshot", payload)
     
     return brainstate
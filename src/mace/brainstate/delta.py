@@ -0,0 +1,144 @@
+"""
+JSON-patch style deltas between BrainState snapshots.
+
+diff(old, new) returns a list of RFC 6902 operations ("add", "remove",
+"replace" with JSON-pointer paths) that apply(old, ops) turns into new.
+Both sides are plain JSON values (parsed canonical JSON).
+
+Lists of dicts that carry a unique id (memory_id for WM items, id / goal_id)
+are matched by that id: a tick that expires the oldest WM item comes out as
+one "remove" at index 0 plus a small "replace" per changed field of the
+items that stayed. Other lists keep their common prefix and suffix and are
+compared element by element in between, so dropping the first goal is one
+"remove" too.
+"""
+import copy
+
+# Fields that identify a list element across snapshots
+_ID_FIELDS = ("memory_id", "id", "goal_id")
+
+
+def diff(old, new, path=""):
+    """Operations that turn `old` into `new`."""
+    if type(old) is not type(new):
+        return [{"op": "replace", "path": path, "value": new}]
+    if isinstance(old, dict):
+        ops = []
+        for key in old:
+            if key not in new:
+                ops.append({"op": "remove", "path": f"{path}/{_escape(key)}"})
+        for key, value in new.items():
+            if key not in old:
+                ops.append({"op": "add", "path": f"{path}/{_escape(key)}", "value": value})
+            else:
+                ops.extend(diff(old[key], value, f"{path}/{_escape(key)}"))
+        return ops
+    if isinstance(old, list):
+        keyed = _diff_keyed(old, new, path)
+        return keyed if keyed is not None else _diff_positional(old, new, path)
+    if old != new:
+        return [{"op": "replace", "path": path, "value": new}]
+    return []
+
+
+def _ids(items):
+    """
+    (field, ids) if every element of `items` is a dict with a unique value
+    for one of _ID_FIELDS, else None.
+    """
+    for field in _ID_FIELDS:
+        if all(isinstance(item, dict) and field in item for item in items):
+            ids = [repr(item[field]) for item in items]
+            return (field, ids) if len(set(ids)) == len(ids) else None
+    return None
+
+
+def _diff_keyed(old, new, path):
+    """
+    Operations matching elements by id, or None if the lists are not keyed
+    by the same field or the elements they share changed order.
+    """
+    if not old or not new:
+        return None
+    keyed_old, keyed_new = _ids(old), _ids(new)
+    if keyed_old is None or keyed_new is None or keyed_old[0] != keyed_new[0]:
+        return None
+    old_ids, new_ids = keyed_old[1], keyed_new[1]
+    new_set, old_set = set(new_ids), set(old_ids)
+    kept = [i for i in old_ids if i in new_set]
+    if kept != [i for i in new_ids if i in old_set]:
+        return None  # Reordered: positional diff
+    ops = []
+    # Remove from the end first so the remaining indexes stay valid
+    for i in range(len(old) - 1, -1, -1):
+        if old_ids[i] not in new_set:
+            ops.append({"op": "remove", "path": f"{path}/{i}"})
+    # Kept elements now sit in order; build the new list left to right
+    by_id = dict(zip(old_ids, old))
+    for j, item_id in enumerate(new_ids):
+        if item_id in old_set:
+            ops.extend(diff(by_id[item_id], new[j], f"{path}/{j}"))
+        else:
+            ops.append({"op": "add", "path": f"{path}/{j}", "value": new[j]})
+    return ops
+
+
+def _diff_positional(old, new, path):
+    """Operations comparing element by element between the common prefix and suffix."""
+    start = 0
+    while start < len(old) and start < len(new) and _same(old[start], new[start]):
+        start += 1
+    end_old, end_new = len(old), len(new)
+    while end_old > start and end_new > start and _same(old[end_old - 1], new[end_new - 1]):
+        end_old -= 1
+        end_new -= 1
+    ops = []
+    common = min(end_old, end_new) - start
+    for i in range(start, start + common):
+        ops.extend(diff(old[i], new[i], f"{path}/{i}"))
+    # Remove from the end first so the remaining indexes stay valid
+    for i in range(end_old - 1, start + common - 1, -1):
+        ops.append({"op": "remove", "path": f"{path}/{i}"})
+    for i in range(start + common, end_new):
+        ops.append({"op": "add", "path": f"{path}/{i}", "value": new[i]})
+    return ops
+
+
+def _same(a, b):
+    """Equal as JSON (1 and 1.0, or 1 and True, are not)."""
+    return type(a) is type(b) and not diff(a, b)
+
+
+def apply(state, ops):
+    """A copy of `state` with `ops` applied."""
+    state = copy.deepcopy(state)
+    for op in ops:
+        tokens = [_unescape(t) for t in op["path"].split("/")[1:]]
+        if not tokens:
+            state = copy.deepcopy(op["value"])
+            continue
+        parent = state
+        for token in tokens[:-1]:
+            parent = parent[int(token)] if isinstance(parent, list) else parent[token]
+        last = tokens[-1]
+        if isinstance(parent, list):
+            index = len(parent) if last == "-" else int(last)
+            if op["op"] == "add":
+                parent.insert(index, copy.deepcopy(op["value"]))
+            elif op["op"] == "remove":
+                del parent[index]
+            else:
+                parent[index] = copy.deepcopy(op["value"])
+        elif op["op"] == "remove":
+            del parent[last]
+        else:
+            parent[last] = copy.deepcopy(op["value"])
+    return state
+
+
+def _escape(key):
+    return str(key).replace("~", "~0").replace("/", "~1")
+
+
+def _unescape(token):
+    return token.replace("~1", "/").replace("~0", "~")
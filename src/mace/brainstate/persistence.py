@@ -1,12 +1,64 @@
 """
 BrainState persistence layer for Stage-1.
 Handles save/load of brain state snapshots to/from database.
+
+Snapshots of a job_seed are stored as chains: a keyframe (the full
+canonical JSON in brainstate_json) followed by deltas (delta_json, a
+JSON-patch against the snapshot named by base_snapshot_id). Every
+brainstate_keyframe_interval-th snapshot of a chain is a keyframe, so
+reading one applies at most interval - 1 deltas. load_latest_snapshot and
+get_snapshot_by_id return full snapshots either way.
+
+Each job_seed's snapshots are numbered by session_seq, so its latest one is
+the highest (index-served; created_at is often empty). The latest snapshot
+of recently used sessions is also kept in process (write-through, at most
+brainstate_session_cache_size sessions): load_latest_snapshot(job_seed)
+returns a copy of it without touching the DB. Sessions found to have no
+snapshot are remembered too, so looking up a new session (as executor.execute
+does for every request seed) queries the DB once. It assumes one process
+writes a given session at a time.
 """
+import collections
+import copy
 import json
-from mace.core import persistence, canonical
+import sqlite3
+import threading
+from mace.core import persistence
+from mace.config import config_loader
+from mace.brainstate import state_hash, delta
 
 _table_initialized = False
 
+# The latest snapshot of a session: the next one is diffed against `state`
+_Session = collections.namedtuple("_Session", "snapshot_id state chain_length seq")
+
+_sessions = collections.OrderedDict()  # job_seed -> _Session, least recently used first
+_NO_SNAPSHOT = _Session(None, None, 0, 0)  # Cached for a session with no snapshot in the DB
+_sessions_lock = threading.Lock()
+
+def _reset_table_flag():
+    global _table_initialized
+    _table_initialized = False
+    _forget_sessions()
+
+def _forget_sessions():
+    with _sessions_lock:
+        _sessions.clear()
+
+def _cached_session(job_seed):
+    with _sessions_lock:
+        session = _sessions.get(job_seed)
+        if session is not None:
+            _sessions.move_to_end(job_seed)
+        return session
+
+def _remember_session(job_seed, session):
+    with _sessions_lock:
+        _sessions[job_seed] = session
+        _sessions.move_to_end(job_seed)
+        while len(_sessions) > config_loader.get_brainstate_session_cache_size():
+            _sessions.popitem(last=False)
+
 def _ensure_table_exists():
     """Create brainstate_snapshots table if it doesn't exist."""
     global _table_initialized
@@ -21,17 +73,51 @@ def _ensure_table_exists():
                 job_seed TEXT,
                 brainstate_json TEXT,
                 created_at TEXT,
-                tick_count INTEGER
+                tick_count INTEGER,
+                base_snapshot_id TEXT,
+                delta_json TEXT,
+                chain_length INTEGER DEFAULT 0,
+                session_seq INTEGER
             )
         """)
+        # Tables created before delta encoding / session numbering
+        for column, definition in [("base_snapshot_id", "TEXT"), ("delta_json", "TEXT"),
+                                   ("chain_length", "INTEGER DEFAULT 0"), ("session_seq", "INTEGER")]:
+            if column not in _columns(conn):
+                persistence.execute_query(conn, f"ALTER TABLE brainstate_snapshots ADD COLUMN {column} {definition}")
+        persistence.execute_query(conn, """
+            CREATE INDEX IF NOT EXISTS idx_brainstate_base ON brainstate_snapshots(base_snapshot_id)
+        """)
+        persistence.execute_query(conn, """
+            CREATE INDEX IF NOT EXISTS idx_brainstate_job_seed_seq ON brainstate_snapshots(job_seed, session_seq)
+        """)
+        persistence.execute_query(conn, """
+            CREATE INDEX IF NOT EXISTS idx_brainstate_job_seed_created ON brainstate_snapshots(job_seed, created_at)
+        """)
         conn.commit()
         _table_initialized = True
+        persistence.on_rollback(_reset_table_flag)
     finally:
         conn.close()
+    # The database may have been replaced: reload sessions from it
+    _forget_sessions()
+
+def _columns(conn):
+    if isinstance(conn, sqlite3.Connection):
+        cur = persistence.execute_query(conn, "PRAGMA table_info(brainstate_snapshots)")
+        return {row["name"] for row in persistence.fetch_all(cur)}
+    cur = persistence.execute_query(conn,
+        "SELECT column_name AS name FROM information_schema.columns WHERE table_name = 'brainstate_snapshots'"
+    )
+    return {row["name"] for row in persistence.fetch_all(cur)}
 
 def save_snapshot(brainstate):
     """
     Persist BrainState snapshot to database.
+    
+    Stored as a delta against the previous snapshot this process saved for
+    the same job_seed, or as a keyframe when there is none or the chain is
+    brainstate_keyframe_interval long.
     """
     _ensure_table_exists()
     conn = persistence.get_connection()
@@ -42,47 +128,128 @@ def save_snapshot(brainstate):
         tick_count = brainstate.get("tick_count", 0)
         
         # Canonicalize before storage
-        brainstate_json = canonical.canonical_json_serialize(brainstate)
+        brainstate_json = state_hash.state_payload(brainstate, exclude=())
+        state = json.loads(brainstate_json)
+        
+        # Deltas based on a snapshot must not see it change under them
+        _detach(conn, snapshot_id)
+        
+        previous = _cached_session(job_seed)
+        seq = (previous.seq if previous else _max_seq(conn, job_seed)) + 1
+        if previous is _NO_SNAPSHOT:
+            previous = None
+        interval = config_loader.get_brainstate_keyframe_interval()
+        if previous and previous.snapshot_id != snapshot_id and previous.chain_length + 1 < interval:
+            base_snapshot_id, chain_length = previous.snapshot_id, previous.chain_length + 1
+            row = (None, base_snapshot_id, json.dumps(delta.diff(previous.state, state), separators=(",", ":"), ensure_ascii=False))
+        else:
+            chain_length = 0
+            row = (brainstate_json, None, None)
         
         # Upsert (insert or replace)
         persistence.execute_query(conn,
-            "INSERT OR REPLACE INTO brainstate_snapshots (snapshot_id, job_seed, brainstate_json, created_at, tick_count) VALUES (?, ?, ?, ?, ?)",
-            (snapshot_id, job_seed, brainstate_json, created_at, tick_count)
+            "INSERT OR REPLACE INTO brainstate_snapshots (snapshot_id, job_seed, brainstate_json, created_at, tick_count, base_snapshot_id, delta_json, chain_length, session_seq) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (snapshot_id, job_seed, row[0], created_at, tick_count, row[1], row[2], chain_length, seq)
         )
         conn.commit()
+        _remember_session(job_seed, _Session(snapshot_id, state, chain_length, seq))
+        persistence.on_rollback(_forget_sessions)
         return snapshot_id
     finally:
         conn.close()
 
+def _max_seq(conn, job_seed):
+    cur = persistence.execute_query(conn,
+        "SELECT MAX(session_seq) AS seq FROM brainstate_snapshots WHERE job_seed = ?",
+        (job_seed,)
+    )
+    row = persistence.fetch_one(cur)
+    return (row["seq"] if row else None) or 0
+
+def _detach(conn, snapshot_id):
+    """Store the deltas based on `snapshot_id` as keyframes."""
+    cur = persistence.execute_query(conn,
+        "SELECT snapshot_id FROM brainstate_snapshots WHERE base_snapshot_id = ?",
+        (snapshot_id,)
+    )
+    for row in persistence.fetch_all(cur):
+        _write_keyframe(conn, row["snapshot_id"], _load(conn, row["snapshot_id"]))
+
+def _write_keyframe(conn, snapshot_id, state):
+    persistence.execute_query(conn,
+        "UPDATE brainstate_snapshots SET brainstate_json = ?, base_snapshot_id = NULL, delta_json = NULL, chain_length = 0 WHERE snapshot_id = ?",
+        (state_hash.state_payload(state, exclude=()), snapshot_id)
+    )
+
+def _load(conn, snapshot_id):
+    """The full snapshot `snapshot_id`, rebuilt from its keyframe and deltas."""
+    deltas = []
+    while True:
+        cur = persistence.execute_query(conn,
+            "SELECT brainstate_json, base_snapshot_id, delta_json FROM brainstate_snapshots WHERE snapshot_id = ?",
+            (snapshot_id,)
+        )
+        row = persistence.fetch_one(cur)
+        if not row:
+            if not deltas:
+                return None
+            raise ValueError(f"BrainState snapshot {snapshot_id} is missing from a delta chain")
+        if row["base_snapshot_id"] is None:
+            break
+        deltas.append(row["delta_json"])
+        snapshot_id = row["base_snapshot_id"]
+    
+    brainstate_json = row["brainstate_json"]
+    # Handle both string (SQLite) and dict (Postgres JSONB)
+    state = json.loads(brainstate_json) if isinstance(brainstate_json, str) else brainstate_json
+    for ops in reversed(deltas):
+        state = delta.apply(state, json.loads(ops) if isinstance(ops, str) else ops)
+    return state
+
 def load_latest_snapshot(job_seed=None):
     """
     Load the most recent BrainState snapshot, optionally filtered by job_seed.
     Returns None if no snapshots exist.
     """
     _ensure_table_exists()
+    if job_seed:
+        session = _cached_session(job_seed)
+        if session is _NO_SNAPSHOT:
+            return None
+        if session is not None:
+            return copy.deepcopy(session.state)
     conn = persistence.get_connection()
     try:
         if job_seed:
             cur = persistence.execute_query(conn,
-                "SELECT brainstate_json FROM brainstate_snapshots WHERE job_seed = ? ORDER BY created_at DESC LIMIT 1",
+                "SELECT snapshot_id, chain_length, session_seq FROM brainstate_snapshots WHERE job_seed = ? AND session_seq IS NOT NULL ORDER BY session_seq DESC LIMIT 1",
                 (job_seed,)
             )
+            row = persistence.fetch_one(cur)
+            if not row:
+                # Saved before snapshots were numbered
+                cur = persistence.execute_query(conn,
+                    "SELECT snapshot_id, chain_length, session_seq FROM brainstate_snapshots WHERE job_seed = ? ORDER BY created_at DESC LIMIT 1",
+                    (job_seed,)
+                )
+                row = persistence.fetch_one(cur)
         else:
             cur = persistence.execute_query(conn,
-                "SELECT brainstate_json FROM brainstate_snapshots ORDER BY created_at DESC LIMIT 1"
+                "SELECT snapshot_id, chain_length, session_seq FROM brainstate_snapshots ORDER BY created_at DESC, session_seq DESC LIMIT 1"
             )
+            row = persistence.fetch_one(cur)
         
-        row = persistence.fetch_one(cur)
         if not row:
+            if job_seed:
+                _remember_session(job_seed, _NO_SNAPSHOT)
             return None
         
-        brainstate_json = row["brainstate_json"]
-        
-        # Handle both string (SQLite) and dict (Postgres JSONB)
-        if isinstance(brainstate_json, str):
-            return json.loads(brainstate_json)
-        else:
-            return brainstate_json
+        state = _load(conn, row["snapshot_id"])
+        if job_seed:
+            _remember_session(job_seed, _Session(row["snapshot_id"], state, row["chain_length"] or 0,
+                                                 row["session_seq"] or 0))
+            return copy.deepcopy(state)
+        return state
     finally:
         conn.close()
 
@@ -92,18 +259,62 @@ def get_snapshot_by_id(snapshot_id):
     """
     conn = persistence.get_connection()
     try:
-        cur = persistence.execute_query(conn,
-            "SELECT brainstate_json FROM brainstate_snapshots WHERE snapshot_id = ?",
-            (snapshot_id,)
-        )
-        row = persistence.fetch_one(cur)
-        if not row:
-            return None
-        
-        brainstate_json = row["brainstate_json"]
-        if isinstance(brainstate_json, str):
-            return json.loads(brainstate_json)
+        return _load(conn, snapshot_id)
+    finally:
+        conn.close()
+
+def compact_snapshots(interval=None, job_seed=None):
+    """
+    Re-keyframe snapshot chains so that no snapshot is more than
+    `interval` - 1 deltas from its keyframe (default:
+    brainstate_keyframe_interval), e.g. after lowering the interval.
+    
+    Returns the number of snapshots rewritten as keyframes.
+    """
+    _ensure_table_exists()
+    if interval is None:
+        interval = config_loader.get_brainstate_keyframe_interval()
+    conn = persistence.get_connection()
+    try:
+        columns = "snapshot_id, base_snapshot_id, chain_length"
+        if job_seed:
+            cur = persistence.execute_query(conn,
+                f"SELECT {columns} FROM brainstate_snapshots WHERE job_seed = ?",
+                (job_seed,)
+            )
         else:
-            return brainstate_json
+            cur = persistence.execute_query(conn, f"SELECT {columns} FROM brainstate_snapshots")
+        children = {}
+        for row in persistence.fetch_all(cur):
+            children.setdefault(row["base_snapshot_id"], []).append(row)
+        
+        # Walk each chain down from its keyframe, carrying the parent's state
+        rewritten = 0
+        pending = [(row, 0, None) for row in children.get(None, [])]
+        while pending:
+            row, depth, parent = pending.pop()
+            state = _load(conn, row["snapshot_id"]) if parent is None else _apply_delta(conn, row["snapshot_id"], parent)
+            if depth >= interval:
+                _write_keyframe(conn, row["snapshot_id"], state)
+                rewritten += 1
+                depth = 0
+            elif row["chain_length"] != depth:
+                persistence.execute_query(conn,
+                    "UPDATE brainstate_snapshots SET chain_length = ? WHERE snapshot_id = ?",
+                    (depth, row["snapshot_id"])
+                )
+            pending.extend((child, depth + 1, state) for child in children.get(row["snapshot_id"], []))
+        conn.commit()
     finally:
         conn.close()
+    # Chains this process is extending may have been cut
+    _forget_sessions()
+    return rewritten
+
+def _apply_delta(conn, snapshot_id, base_state):
+    cur = persistence.execute_query(conn,
+        "SELECT delta_json FROM brainstate_snapshots WHERE snapshot_id = ?",
+        (snapshot_id,)
+    )
+    ops = persistence.fetch_one(cur)["delta_json"]
+    return delta.apply(base_state, json.loads(ops) if isinstance(ops, str) else ops)
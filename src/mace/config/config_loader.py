@@ -52,6 +52,106 @@ def get_agent_timeout_ms():
     """Get agent timeout in milliseconds (Rule F4)."""
     return get_limits().get('agent_timeout_ms', 30000)
 
+def get_db_pool_max_size():
+    """Get max open connections per Postgres pool."""
+    return get_limits().get('db_pool_max_size', 10)
+
+def get_db_pool_max_idle_per_thread():
+    """Get max idle SQLite connections kept per thread and DB file."""
+    return get_limits().get('db_pool_max_idle_per_thread', 4)
+
+def get_db_pool_timeout_ms():
+    """Get max wait for a free pooled connection in milliseconds."""
+    return get_limits().get('db_pool_timeout_ms', 5000)
+
+def get_db_pool_health_check_interval_s():
+    """Get idle time after which a pooled connection is pinged before reuse."""
+    return get_limits().get('db_pool_health_check_interval_s', 30)
+
+def get_durability_profile():
+    """Get the SQLite durability profile name (strict | wal | group_commit)."""
+    return get_limits().get('durability_profile', 'strict')
+
+def get_sem_cache_max_entries():
+    """Get max entries in the get_sem read cache (0 disables it)."""
+    return get_limits().get('sem_cache_max_entries', 4096)
+
+def get_sem_journal_segment_max_bytes():
+    """Get the size at which the SEM journal rolls to a new segment."""
+    return get_limits().get('sem_journal_segment_max_bytes', 67108864)
+
+def get_sem_journal_fsync():
+    """Get the SEM journal fsync policy (always | batch | none)."""
+    return get_limits().get('sem_journal_fsync', 'batch')
+
+def get_sem_journal_fsync_interval_ms():
+    """Get the minimum interval between SEM journal fsyncs under the batch policy."""
+    return get_limits().get('sem_journal_fsync_interval_ms', 200)
+
+def get_sem_version_keep_per_key():
+    """Get how many versions of each SEM key compaction always keeps."""
+    return get_limits().get('sem_version_keep_per_key', 8)
+
+def get_sem_bloom_enabled():
+    """Get whether LiveSEMStore keeps per-namespace Bloom filters for misses."""
+    return bool(get_limits().get('sem_bloom_enabled', False))
+
+def get_sem_bloom_error_rate():
+    """Get the target false-positive rate of the SEM Bloom filters."""
+    return get_limits().get('sem_bloom_error_rate', 0.01)
+
+def get_sem_bloom_min_capacity():
+    """Get the minimum key capacity of a per-namespace SEM Bloom filter."""
+    return get_limits().get('sem_bloom_min_capacity', 1024)
+
+def get_sem_shards():
+    """Get the number of SQLite shards a new SEM database is split across."""
+    return get_limits().get('sem_shards', 1)
+
+def get_episodic_hot_months():
+    """Get the number of newest monthly episodic partitions kept live."""
+    return get_limits().get('episodic_hot_months', 6)
+
+def get_episodic_archive_dir():
+    """Get the directory archived episodic partitions are written to."""
+    return get_limits().get('episodic_archive_dir', 'archived/episodic')
+
+def get_episodic_payload_dedup():
+    """Check whether episodic payload bodies are stored once per distinct content."""
+    return get_limits().get('episodic_payload_dedup', False)
+
+def get_cwm_flush_interval_ms():
+    """Get the longest a queued CWM write waits for the write-behind flusher."""
+    return get_limits().get('cwm_flush_interval_ms', 50)
+
+def get_cwm_flush_batch_size():
+    """Get the number of queued CWM writes that triggers an immediate flush."""
+    return get_limits().get('cwm_flush_batch_size', 256)
+
+def get_stream_batch_size():
+    """Get the rows read per page by streaming (keyset-paginated) queries."""
+    return get_limits().get('stream_batch_size', 500)
+
+def get_brainstate_hash_mode():
+    """Get how BrainState snapshot IDs are serialized: direct, verify or legacy."""
+    return get_limits().get('brainstate_hash_mode', 'direct')
+
+def get_brainstate_keyframe_interval():
+    """Get how many snapshots of a job_seed share one keyframe (1 = no deltas)."""
+    return get_limits().get('brainstate_keyframe_interval', 16)
+
+def get_brainstate_session_cache_size():
+    """Get how many sessions' latest BrainState are kept in process."""
+    return get_limits().get('brainstate_session_cache_size', 256)
+
+def get_rehydrate_checkpoint_every():
+    """Get how many episodes rehydrate.rebuild_brainstate applies between checkpoints."""
+    return get_limits().get('rehydrate_checkpoint_every', 1000)
+
+def get_rehydrate_resume_slack_s():
+    """Get how many seconds before its checkpoint a resumed rebuild re-reads."""
+    return get_limits().get('rehydrate_resume_slack_s', 300)
+
 def get_signing_key(key_id):
     """Get signing key by ID."""
     keys = get_keys()
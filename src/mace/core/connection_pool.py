@@ -0,0 +1,382 @@
+"""
+Module: connection_pool
+Stage: cross-stage
+Purpose: Connection pooling behind persistence.get_connection().
+
+         - SQLite: connections are kept per thread and reused. A connection is
+           only handed out again if the database file it was opened on is still
+           the file at that path (tests and admin tools delete DB files).
+         - Postgres: a bounded, thread-safe pool. Callers block up to
+           db_pool_timeout_ms for a free slot, then raise PoolTimeout.
+
+         Callers keep the usual `try/finally conn.close()` pattern; close()
+         rolls back anything left uncommitted and returns the connection to
+         its pool instead of closing the socket/file handle.
+
+Part of MACE (Meta Aware Cognitive Engine).
+"""
+import os
+import sqlite3
+import threading
+import time
+import weakref
+
+from mace.config import config_loader
+from mace.core import durability
+from mace.ops import metrics
+
+
+class PoolTimeout(RuntimeError):
+    """Raised when no pooled connection becomes free within the timeout."""
+
+
+def file_identity(db_path):
+    """(st_dev, st_ino) of the DB file, or None if it does not exist."""
+    try:
+        st = os.stat(db_path)
+    except OSError:
+        return None
+    return (st.st_dev, st.st_ino)
+
+
+# =============================================================================
+# SQLITE: per-thread pool
+# =============================================================================
+
+class PooledSQLiteConnection(durability.DurableSQLiteConnection):
+    """
+    sqlite3 connection whose close() returns it to the per-thread pool.
+
+    Opened through durability.connect, so the active durability profile's
+    pragmas apply. Subclassing (rather than wrapping) keeps `isinstance(conn, sqlite3.Connection)`
+    checks in persistence.execute_query working unchanged.
+    """
+
+    _pool_pinned = False
+
+    def commit(self):
+        if self._pool_pinned:
+            return  # Deferred to the unit of work holding this connection
+        super().commit()
+
+    def close(self):
+        if self._pool_pinned:
+            return
+        _sqlite_pool.release(self)
+
+    def _close_physical(self):
+        super().close()
+
+
+class SQLitePool:
+    """Per-thread idle stacks of SQLite connections, keyed by DB path."""
+
+    def __init__(self):
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._all = weakref.WeakSet()
+        self._generation = 0
+
+    def _idle_for(self, db_path):
+        idle = getattr(self._local, "idle", None)
+        if idle is None:
+            idle = self._local.idle = {}
+        return idle.setdefault(db_path, [])
+
+    def _open(self, db_path):
+        conn = durability.connect(
+            db_path,
+            factory=PooledSQLiteConnection,
+            check_same_thread=False  # The pool, not sqlite3, enforces ownership
+        )
+        conn.row_factory = sqlite3.Row
+        conn._pool_db_path = db_path
+        conn._pool_identity = file_identity(db_path)
+        conn._pool_generation = self._generation
+        conn._pool_in_use = False
+        with self._lock:
+            self._all.add(conn)
+        metrics.increment("db_pool_opened_total")
+        return conn
+
+    def _is_healthy(self, conn):
+        if conn._pool_generation != self._generation:
+            return False
+        return conn._pool_identity == file_identity(conn._pool_db_path)
+
+    def _discard(self, conn):
+        with self._lock:
+            self._all.discard(conn)
+        try:
+            conn._close_physical()
+        except sqlite3.Error:
+            pass
+
+    def acquire(self, db_path):
+        idle = self._idle_for(db_path)
+        conn = None
+        while idle:
+            candidate = idle.pop()
+            if self._is_healthy(candidate):
+                conn = candidate
+                metrics.increment("db_pool_reused_total")
+                break
+            metrics.increment("db_pool_health_evictions_total")
+            self._discard(candidate)
+
+        if conn is None:
+            conn = self._open(db_path)
+
+        conn._pool_in_use = True
+        metrics.increment("db_pool_checkouts_total")
+        return conn
+
+    def release(self, conn):
+        if not conn._pool_in_use:
+            return  # Double close is a no-op, as with sqlite3
+        conn._pool_in_use = False
+
+        if conn._pool_generation != self._generation:
+            self._discard(conn)
+            return
+
+        try:
+            if conn.in_transaction:
+                conn.rollback()
+        except sqlite3.Error:
+            self._discard(conn)
+            return
+
+        idle = self._idle_for(conn._pool_db_path)
+        if len(idle) >= config_loader.get_db_pool_max_idle_per_thread():
+            self._discard(conn)
+        else:
+            idle.append(conn)
+
+    def close_all(self):
+        """Close idle connections; in-use ones are closed when released."""
+        with self._lock:
+            self._generation += 1
+            conns = list(self._all)
+        for conn in conns:
+            if not conn._pool_in_use:
+                self._discard(conn)
+
+    def stats(self):
+        with self._lock:
+            conns = list(self._all)
+        in_use = sum(1 for c in conns if c._pool_in_use)
+        return {"open": len(conns), "in_use": in_use, "idle": len(conns) - in_use}
+
+
+_sqlite_pool = SQLitePool()
+
+
+# =============================================================================
+# POSTGRES: bounded pool
+# =============================================================================
+
+class PooledPGConnection:
+    """Proxy around a psycopg2 connection whose close() returns it to the pool."""
+
+    def __init__(self, pool, raw):
+        self._pool = pool
+        self._raw = raw
+        self._released = False
+        self._pool_pinned = False
+
+    def commit(self):
+        if self._pool_pinned:
+            return  # Deferred to the unit of work holding this connection
+        self._raw.commit()
+
+    def close(self):
+        if self._pool_pinned or self._released:
+            return
+        self._released = True
+        self._pool.release(self._raw)
+
+    def __enter__(self):
+        self._raw.__enter__()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return self._raw.__exit__(exc_type, exc, tb)
+
+    def __getattr__(self, name):
+        return getattr(self._raw, name)
+
+
+class PostgresPool:
+    """Bounded pool of psycopg2 connections for one DSN."""
+
+    def __init__(self, dsn, connect):
+        self._dsn = dsn
+        self._connect = connect
+        self._cond = threading.Condition()
+        self._idle = []  # [(raw_conn, last_released_monotonic)]
+        self._size = 0
+        self._in_use = 0
+
+    def _check(self, raw, idle_since):
+        """Health check: closed handles always fail; stale ones get a ping."""
+        if raw.closed:
+            return False
+        interval = config_loader.get_db_pool_health_check_interval_s()
+        if time.monotonic() - idle_since < interval:
+            return True
+        try:
+            cur = raw.cursor()
+            cur.execute("SELECT 1")
+            cur.fetchone()
+            raw.rollback()
+            return True
+        except Exception:
+            return False
+
+    def acquire(self):
+        max_size = config_loader.get_db_pool_max_size()
+        timeout_s = config_loader.get_db_pool_timeout_ms() / 1000.0
+        start = time.monotonic()
+        deadline = start + timeout_s
+
+        while True:
+            candidate = None
+            must_open = False
+            with self._cond:
+                while not self._idle and self._size >= max_size:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        metrics.increment("db_pool_timeouts_total")
+                        raise PoolTimeout(
+                            f"No pooled connection free after {timeout_s:.1f}s "
+                            f"(max_size={max_size})"
+                        )
+                    self._cond.wait(remaining)
+                if self._idle:
+                    candidate = self._idle.pop()
+                else:
+                    self._size += 1
+                    must_open = True
+                self._in_use += 1
+
+            if must_open:
+                try:
+                    raw = self._connect(self._dsn)
+                except Exception:
+                    self._forget(closing=None)
+                    raise
+                metrics.increment("db_pool_opened_total")
+                break
+
+            raw, idle_since = candidate
+            if self._check(raw, idle_since):
+                metrics.increment("db_pool_reused_total")
+                break
+            metrics.increment("db_pool_health_evictions_total")
+            self._forget(closing=raw)
+
+        waited_ms = (time.monotonic() - start) * 1000.0
+        metrics.increment("db_pool_checkouts_total")
+        metrics.increment("db_pool_wait_ms_total", waited_ms)
+        return PooledPGConnection(self, raw)
+
+    def _forget(self, closing):
+        if closing is not None:
+            try:
+                closing.close()
+            except Exception:
+                pass
+        with self._cond:
+            self._size -= 1
+            self._in_use -= 1
+            self._cond.notify()
+
+    def release(self, raw):
+        healthy = not raw.closed
+        if healthy:
+            try:
+                raw.rollback()
+            except Exception:
+                healthy = False
+        if not healthy:
+            self._forget(closing=raw)
+            return
+        with self._cond:
+            self._in_use -= 1
+            self._idle.append((raw, time.monotonic()))
+            self._cond.notify()
+
+    def close_all(self):
+        with self._cond:
+            idle, self._idle = self._idle, []
+            self._size -= len(idle)
+        for raw, _ in idle:
+            try:
+                raw.close()
+            except Exception:
+                pass
+
+    def stats(self):
+        with self._cond:
+            return {"open": self._size, "in_use": self._in_use, "idle": len(self._idle)}
+
+
+_pg_pools = {}
+_pg_lock = threading.Lock()
+
+
+# =============================================================================
+# PUBLIC API
+# =============================================================================
+
+def get_sqlite_connection(db_path):
+    """Check out a SQLite connection for `db_path` from the calling thread's pool."""
+    return _sqlite_pool.acquire(db_path)
+
+
+def get_postgres_connection(dsn, connect):
+    """
+    Check out a Postgres connection for `dsn`.
+
+    Args:
+        dsn: Connection URL (one pool per distinct URL).
+        connect: Factory `connect(dsn) -> raw psycopg2 connection`.
+    """
+    with _pg_lock:
+        pool = _pg_pools.get(dsn)
+        if pool is None:
+            pool = _pg_pools[dsn] = PostgresPool(dsn, connect)
+    return pool.acquire()
+
+
+def pin(conn):
+    """
+    Pin a checked-out connection: commit() and close() become no-ops until
+    unpin(). Used by persistence.unit_of_work to share one transaction.
+    """
+    conn._pool_pinned = True
+
+
+def unpin(conn):
+    conn._pool_pinned = False
+
+
+def close_all():
+    """Close every pooled connection (shutdown, or before deleting DB files)."""
+    _sqlite_pool.close_all()
+    durability.flush()
+    with _pg_lock:
+        pools = list(_pg_pools.values())
+    for pool in pools:
+        pool.close_all()
+
+
+def stats():
+    """Pool sizes for observability: {"sqlite": {...}, "postgres": {dsn: {...}}}."""
+    with _pg_lock:
+        pools = dict(_pg_pools)
+    return {
+        "sqlite": _sqlite_pool.stats(),
+        "postgres": {dsn: pool.stats() for dsn, pool in pools.items()}
+    }
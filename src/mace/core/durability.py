@@ -0,0 +1,152 @@
+"""
+Module: durability
+Stage: cross-stage
+Purpose: Named durability profiles for every SQLite connection MACE opens
+         (persistence.get_connection and memory.storage_backend).
+
+         strict       - journal_mode=DELETE, synchronous=FULL. Every commit is
+                        fsynced before it returns (the historical behaviour).
+         wal          - journal_mode=WAL, synchronous=NORMAL plus mmap, page
+                        cache and busy_timeout. Readers no longer block the
+                        writer; the WAL is fsynced at checkpoints.
+         group_commit - WAL with synchronous=OFF; a background flusher fsyncs
+                        the WAL of every recently committed database at most
+                        once per group_commit_window_ms, so concurrent commits
+                        share one fsync. A crash can lose at most that window.
+
+         Selected by the MACE_DURABILITY_PROFILE env var, else
+         `durability_profile` in config/limits.yaml (default: strict).
+
+         Profiles only change *when* bytes reach disk, never *which* bytes,
+         so deterministic IDs, journal entries and replay are identical in
+         every profile.
+
+Part of MACE (Meta Aware Cognitive Engine).
+"""
+import os
+import sqlite3
+import threading
+import time
+
+from mace.config import config_loader
+from mace.ops import metrics
+
+PROFILES = ("strict", "wal", "group_commit")
+
+
+def get_profile() -> str:
+    """
+    Resolve the active durability profile name.
+
+    Raises:
+        ValueError: If the configured profile is unknown.
+    """
+    name = os.environ.get("MACE_DURABILITY_PROFILE") or config_loader.get_durability_profile()
+    if name not in PROFILES:
+        raise ValueError(f"Unknown durability profile: {name}. Must be one of {PROFILES}")
+    return name
+
+
+def pragmas(profile: str) -> list:
+    """PRAGMA statements applied to a new connection under `profile`."""
+    if profile == "strict":
+        return [
+            "PRAGMA synchronous=FULL",
+            "PRAGMA journal_mode=DELETE",
+        ]
+
+    limits = config_loader.get_limits()
+    tuning = [
+        "PRAGMA journal_mode=WAL",
+        f"PRAGMA mmap_size={int(limits.get('sqlite_mmap_size', 268435456))}",
+        f"PRAGMA cache_size=-{int(limits.get('sqlite_cache_size_kb', 16384))}",
+        f"PRAGMA busy_timeout={int(limits.get('sqlite_busy_timeout_ms', 5000))}",
+    ]
+    if profile == "wal":
+        return ["PRAGMA synchronous=NORMAL"] + tuning
+    return ["PRAGMA synchronous=OFF"] + tuning
+
+
+class DurableSQLiteConnection(sqlite3.Connection):
+    """sqlite3 connection that reports commits to the group-commit flusher."""
+
+    _durability_db_path = None
+    _durability_profile = "strict"
+
+    def commit(self):
+        super().commit()
+        if self._durability_profile == "group_commit":
+            _flusher.mark_dirty(self._durability_db_path)
+
+
+def connect(db_path, factory=DurableSQLiteConnection, **kwargs):
+    """
+    Open a SQLite connection with the active durability profile applied.
+
+    Args:
+        db_path: Database file path.
+        factory: sqlite3.Connection subclass; must derive from DurableSQLiteConnection.
+        **kwargs: Passed through to sqlite3.connect (timeout, check_same_thread, ...).
+    """
+    profile = get_profile()
+    conn = sqlite3.connect(db_path, factory=factory, **kwargs)
+    for statement in pragmas(profile):
+        conn.execute(statement)
+    conn._durability_db_path = db_path
+    conn._durability_profile = profile
+    return conn
+
+
+class _GroupCommitFlusher:
+    """Background thread that fsyncs dirty WAL files once per window."""
+
+    def __init__(self):
+        self._cond = threading.Condition()
+        self._dirty = set()
+        self._thread = None
+
+    def mark_dirty(self, db_path):
+        with self._cond:
+            self._dirty.add(db_path)
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(
+                    target=self._run, name="mace-group-commit", daemon=True
+                )
+                self._thread.start()
+            self._cond.notify()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._dirty:
+                    self._cond.wait()
+            # Let the window fill up so one fsync covers many commits
+            window_s = config_loader.get_limits().get("group_commit_window_ms", 50) / 1000.0
+            time.sleep(window_s)
+            self.flush()
+
+    def flush(self):
+        """fsync every dirty database now (also used at shutdown)."""
+        with self._cond:
+            dirty, self._dirty = self._dirty, set()
+        for db_path in dirty:
+            # With synchronous=OFF, checkpoints copy WAL pages into the main
+            # file without syncing it either, so both files need the barrier.
+            for path in (f"{db_path}-wal", db_path):
+                try:
+                    fd = os.open(path, os.O_RDWR)
+                except OSError:
+                    continue  # Checkpointed away or DB removed
+                try:
+                    os.fsync(fd)
+                finally:
+                    os.close(fd)
+            metrics.increment("group_commit_fsyncs_total")
+
+
+_flusher = _GroupCommitFlusher()
+
+
+def flush():
+    """Force pending group commits to disk."""
+    _flusher.flush()
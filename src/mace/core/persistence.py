@@ -1,6 +1,11 @@
 import os
 import sqlite3
 import json
+import threading
+import contextlib
+from mace.config import config_loader
+from mace.core import connection_pool
+from mace.ops import metrics
 try:
     import psycopg2
     from psycopg2.extras import RealDictCursor
@@ -11,21 +16,171 @@ except ImportError:
 # Global DB config
 _DB_URL = os.environ.get("MACE_DB_URL", "sqlite:///mace_stage1.db")
 
+# Active unit of work for the current thread (see unit_of_work)
+_uow_local = threading.local()
+
+class _UnitOfWork:
+    def __init__(self, conn):
+        self.conn = conn
+        self.rollback_hooks = []
+        self.exit_hooks = []
+        self.savepoint_hooks = []  # Rollback hooks of each open savepoint, innermost last
+
+def _pg_connect(dsn):
+    return psycopg2.connect(dsn, cursor_factory=RealDictCursor)
+
 def get_connection():
     """
-    Get a database connection based on MACE_DB_URL.
+    Get a pooled database connection based on MACE_DB_URL.
     Supports sqlite:///path and postgresql://...
+
+    The connection comes from mace.core.connection_pool; conn.close()
+    returns it to the pool (uncommitted work is rolled back).
+    Inside unit_of_work() the request's shared connection is returned instead.
     """
+    uow = getattr(_uow_local, "current", None)
+    if uow is not None:
+        return uow.conn
+    return _checkout()
+
+def get_dedicated_connection():
+    """
+    A pooled connection of its own, even inside unit_of_work(): for writes
+    that must commit independently of the request transaction (e.g. the CWM
+    write-behind flusher). conn.close() returns it to the pool.
+    """
+    return _checkout()
+
+def in_unit_of_work():
+    """True if a unit of work is active on this thread."""
+    return getattr(_uow_local, "current", None) is not None
+
+def _checkout():
     if _DB_URL.startswith("sqlite:///"):
         db_path = _DB_URL.replace("sqlite:///", "")
-        conn = sqlite3.connect(db_path)
-        conn.row_factory = sqlite3.Row
-        return conn
+        return connection_pool.get_sqlite_connection(db_path)
     elif _DB_URL.startswith("postgresql://") or _DB_URL.startswith("postgres://"):
-        return psycopg2.connect(_DB_URL, cursor_factory=RealDictCursor)
+        return connection_pool.get_postgres_connection(_DB_URL, _pg_connect)
     else:
         raise ValueError(f"Unsupported DB URL: {_DB_URL}")
 
+@contextlib.contextmanager
+def unit_of_work():
+    """
+    Request-scoped transaction.
+
+    Every get_connection() on this thread inside the block returns one shared
+    connection whose commit() and close() are deferred. On exit there is a
+    single commit; if the block raises, everything is rolled back together.
+    Nested unit_of_work() blocks join the outermost one.
+
+    Yields the shared connection.
+    """
+    current = getattr(_uow_local, "current", None)
+    if current is not None:
+        yield current.conn
+        return
+
+    conn = _checkout()
+    uow = _UnitOfWork(conn)
+    connection_pool.pin(conn)
+    _uow_local.current = uow
+    committed = False
+    try:
+        yield conn
+        _uow_local.current = None
+        connection_pool.unpin(conn)
+        conn.commit()
+        committed = True
+        metrics.increment("uow_commits_total")
+    finally:
+        _uow_local.current = None
+        connection_pool.unpin(conn)
+        if not committed:
+            try:
+                conn.rollback()
+            finally:
+                metrics.increment("uow_rollbacks_total")
+                for hook in uow.rollback_hooks:
+                    hook()
+        conn.close()
+        for hook in uow.exit_hooks:
+            hook()
+
+def on_rollback(callback):
+    """
+    Register callback() to run if the active unit of work rolls back, or the
+    innermost savepoint() open at registration (or one enclosing it) does.
+    Used to reset in-process caches (e.g. table-initialized flags) that would
+    otherwise describe state that was never committed. No-op outside a unit of work.
+    """
+    uow = getattr(_uow_local, "current", None)
+    if uow is not None:
+        uow.rollback_hooks.append(callback)
+        if uow.savepoint_hooks:
+            uow.savepoint_hooks[-1].append(callback)
+
+def after_unit_of_work(callback):
+    """
+    Run callback() once the active unit of work has committed or rolled back
+    and released its connection (once per callback, however often it is
+    registered). Runs it right away outside a unit of work.
+    """
+    uow = getattr(_uow_local, "current", None)
+    if uow is None:
+        callback()
+    elif callback not in uow.exit_hooks:
+        uow.exit_hooks.append(callback)
+
+@contextlib.contextmanager
+def savepoint(name):
+    """
+    Isolate an optional step inside the active unit of work.
+
+    If the block raises, only its statements are rolled back, along with the
+    on_rollback hooks registered inside it, and the request transaction
+    stays usable (Postgres aborts the whole transaction on error otherwise).
+    No-op outside a unit of work.
+    """
+    uow = getattr(_uow_local, "current", None)
+    if uow is None:
+        yield
+        return
+
+    conn = uow.conn
+    if isinstance(conn, sqlite3.Connection) and not conn.in_transaction:
+        # A top-level SAVEPOINT would make RELEASE commit the request early
+        conn.execute("BEGIN")
+    execute_query(conn, f"SAVEPOINT {name}")
+    uow.savepoint_hooks.append([])
+    try:
+        yield
+    except BaseException:
+        hooks = uow.savepoint_hooks.pop()
+        try:
+            execute_query(conn, f"ROLLBACK TO SAVEPOINT {name}")
+            execute_query(conn, f"RELEASE SAVEPOINT {name}")
+        finally:
+            for hook in hooks:
+                hook()
+        raise
+    hooks = uow.savepoint_hooks.pop()
+    if uow.savepoint_hooks:
+        # Still undone if an enclosing savepoint rolls back
+        uow.savepoint_hooks[-1].extend(hooks)
+    execute_query(conn, f"RELEASE SAVEPOINT {name}")
+
+def close_all():
+    """
+    Close all pooled connections.
+    Call at shutdown, or before deleting/replacing database files.
+    """
+    connection_pool.close_all()
+
+def pool_stats():
+    """Current connection pool sizes (open / in_use / idle)."""
+    return connection_pool.stats()
+
 def execute_query(conn, query, params=None):
     """
     Execute a query and return cursor.
@@ -52,6 +207,14 @@ def execute_query(conn, query, params=None):
         cursor.execute(query, params)
         return cursor
 
+def execute_many(conn, query, seq_of_params):
+    """executemany() counterpart of execute_query (same placeholder handling)."""
+    if not isinstance(conn, sqlite3.Connection) and "?" in query:
+        query = query.replace("?", "%s")
+    cursor = conn.cursor()
+    cursor.executemany(query, seq_of_params)
+    return cursor
+
 def fetch_one(cursor):
     row = cursor.fetchone()
     if row is None:
@@ -60,3 +223,50 @@ def fetch_one(cursor):
 
 def fetch_all(cursor):
     return [dict(row) for row in cursor.fetchall()]
+
+def iter_keyset(table, key, where="1 = 1", params=(), columns="*", batch_size=None, conn=None, after=None):
+    """
+    Stream the rows of `table` matching `where`, ordered by the `key`
+    columns, in pages of batch_size rows (default: stream_batch_size in
+    config/limits.yaml).
+
+    Keyset pagination: every page is its own query resuming after the key
+    of the last row seen, so memory stays constant however many rows there
+    are and no cursor or pooled connection is held between pages. The key
+    must be unique and non-NULL (e.g. ("created_at", "event_id")); each
+    entry may be a column or an SQL expression.
+
+    Args:
+        conn: Read every page through this connection (not closed)
+              instead of checking one out of the pool per page.
+        after: Start after this key (values for `key`, in order), e.g. the
+               key of the last row a previous stream returned.
+    """
+    if batch_size is None:
+        batch_size = config_loader.get_stream_batch_size()
+    if batch_size < 1:
+        raise ValueError(f"batch_size must be positive, got {batch_size}")
+    aliases = [f"_key{i}" for i in range(len(key))]
+    select = ", ".join([columns] + [f"{expr} AS {alias}" for expr, alias in zip(key, aliases)])
+    order = ", ".join(key)
+    after = list(after) if after is not None else None
+    while True:
+        condition, args = f"({where})", list(params)
+        if after is not None:
+            condition += f" AND ({order}) > ({', '.join('?' * len(key))})"
+            args += after
+        page_conn = conn if conn is not None else get_connection()
+        try:
+            rows = fetch_all(execute_query(
+                page_conn,
+                f"SELECT {select} FROM {table} WHERE {condition} ORDER BY {order} LIMIT ?",
+                args + [batch_size]
+            ))
+        finally:
+            if conn is None:
+                page_conn.close()
+        for row in rows:
+            after = [row.pop(alias) for alias in aliases]
+            yield row
+        if len(rows) < batch_size:
+            return
@@ -1,60 +1,204 @@
+"""
+BrainState rehydration from episodic memory.
+
+rebuild_brainstate replays a job's episodes in (created_at, episodic_id)
+order, resuming from the job's checkpoint in rehydrate_checkpoints (one row
+per job) if it has one. A checkpoint is written every
+rehydrate_checkpoint_every episodes and at the end of a rebuild: the state
+so far (plain JSON), the key of the last episode applied and the episodes
+applied in the rehydrate_resume_slack_s seconds before it.
+
+Persisted BrainState snapshots are not used as a starting point: nothing
+places them in the episode stream (BrainStates carry no created_at, and
+the executor's snapshots are not stored under the request's job_seed).
+
+An episode's created_at is taken before its unit of work commits, so it can
+become visible after episodes created later were applied. A rebuild resumed
+from a checkpoint therefore re-reads the slack window before it and skips
+the episodes it already applied. Such a late episode is applied after the
+later ones (a rebuild from scratch applies it in created_at order); one
+committed more than the slack window late is missed.
+"""
+import datetime
 import json
 from mace.core import persistence
+from mace.config import config_loader
 from mace.brainstate import brainstate
+from mace.brainstate import persistence as bs_persistence
+from mace.memory.episodic import EpisodicMemory
+
+_table_initialized = False
+
+def _reset_table_flag():
+    global _table_initialized
+    _table_initialized = False
 
-def rebuild_brainstate(job_id):
+def _ensure_table_exists():
+    """Create rehydrate_checkpoints table if it doesn't exist."""
+    global _table_initialized
+    if _table_initialized:
+        return
+
+    conn = persistence.get_connection()
+    try:
+        persistence.execute_query(conn, """
+            CREATE TABLE IF NOT EXISTS rehydrate_checkpoints (
+                job_seed TEXT PRIMARY KEY,
+                brainstate_json TEXT,
+                last_created_at TEXT,
+                last_episodic_id TEXT,
+                recent_json TEXT,
+                episodes_applied INTEGER,
+                created_at TEXT
+            )
+        """)
+        conn.commit()
+        _table_initialized = True
+        persistence.on_rollback(_reset_table_flag)
+    finally:
+        conn.close()
+
+def rebuild_brainstate(job_id, on_progress=None, checkpoint_every=None, batch_size=None):
     """
     Reconstruct BrainState from episodic memory for a specific job.
     Returns reconstructed brainstate dict or None if no data.
+
+    Starts from the job's checkpoint, if any, and streams the episodes
+    after it (batch_size per query, default stream_batch_size).
+
+    Args:
+        on_progress: Function(episodes_applied) called after each episode,
+                     with the count applied by this call so far
+        checkpoint_every: Episodes between checkpoints (default:
+                          rehydrate_checkpoint_every); a checkpoint is also
+                          written at the end if any episode was applied
     """
+    _ensure_table_exists()
+    if checkpoint_every is None:
+        checkpoint_every = config_loader.get_rehydrate_checkpoint_every()
+    slack = datetime.timedelta(seconds=config_loader.get_rehydrate_resume_slack_s())
+
+    seed = _load_seed(job_id, slack)
+    if seed:
+        bs, last, start = seed["state"], seed["last"], seed["start"]
+        recent, previous_total = seed["recent"], seed["episodes_applied"]
+    else:
+        # Start with fresh state
+        bs = brainstate.create_snapshot(job_id)
+        last, start, recent, previous_total = None, None, {}, 0
+    skip = set(recent)
+
+    # Replay episodic entries to rebuild state
+    applied = 0
+    episodes = EpisodicMemory(job_seed=job_id).iter_session_history(
+        job_id, batch_size=batch_size, include_archived=True, after=start
+    )
+    for episode in episodes:
+        if episode["episodic_id"] in skip:
+            continue  # Re-read from the slack window, already applied
+        bs = _apply_episode(bs, episode["payload"])
+        key = (episode["created_at"] or "", episode["episodic_id"])
+        last = key if last is None else max(last, key)
+        recent[episode["episodic_id"]] = key[0]
+        applied += 1
+        if on_progress:
+            on_progress(applied)
+        if checkpoint_every and applied % checkpoint_every == 0:
+            recent = _window(recent, last, slack)
+            _save_checkpoint(job_id, bs, last, recent, previous_total + applied)
+
+    if applied and (not checkpoint_every or applied % checkpoint_every):
+        _save_checkpoint(job_id, bs, last, _window(recent, last, slack), previous_total + applied)
+
+    if not seed and not applied:
+        return None
+    return bs
+
+def _apply_episode(bs, episode_data):
+    """Apply one episode's payload to the state being rebuilt."""
+    # Extract state info from episode
+    # Episodes might contain goals, WM items, or other state
+    if isinstance(episode_data, dict):
+        # If episode has goals, add them
+        if "goals" in episode_data:
+            for goal in episode_data["goals"]:
+                if goal not in bs["goals"]:
+                    bs["goals"].append(goal)
+
+        # If episode has WM items, add them
+        if "working_memory" in episode_data:
+            for item in episode_data["working_memory"]:
+                brainstate.add_wm_item(bs, item)
+
+        # If episode records a complete brainstate, use it
+        if "snapshot_id" in episode_data and "tick_count" in episode_data:
+            # This episode is a brainstate snapshot
+            bs = episode_data
+    return bs
+
+def _load_seed(job_id, slack):
+    """
+    Where a rebuild of `job_id` resumes, from its checkpoint, or None. A
+    dict with the state, the key of the last episode it reflects ("last"),
+    the key to stream after ("start"), the episodes already applied in the
+    slack window ("recent", {episodic_id: created_at}) and the
+    episodes_applied count.
+    """
+    checkpoint = _load_checkpoint(job_id)
+    if not checkpoint:
+        return None
+    last = (checkpoint["last_created_at"] or "", checkpoint["last_episodic_id"])
+    return {
+        "state": checkpoint["state"],
+        "last": last,
+        "start": (_shift(last[0], -slack), ""),
+        "recent": checkpoint["recent"],
+        "episodes_applied": checkpoint["episodes_applied"],
+    }
+
+def _shift(created_at, delta):
+    """created_at moved by `delta`; unchanged if it is not an ISO timestamp (undated)."""
+    try:
+        return (datetime.datetime.fromisoformat(created_at) + delta).isoformat()
+    except (TypeError, ValueError):
+        return created_at
+
+def _window(recent, last, slack):
+    """The entries of `recent` created in the slack window before `last`."""
+    cutoff = _shift(last[0], -slack)
+    return {episodic_id: created_at for episodic_id, created_at in recent.items() if created_at >= cutoff}
+
+def _load_checkpoint(job_id):
     conn = persistence.get_connection()
     try:
-        # Query episodic entries matching job_seed pattern
-        cur = persistence.execute_query(conn, 
-            "SELECT * FROM episodic WHERE job_seed = ? ORDER BY created_seeded_ts ASC",
+        cur = persistence.execute_query(conn,
+            "SELECT brainstate_json, last_created_at, last_episodic_id, recent_json, episodes_applied FROM rehydrate_checkpoints WHERE job_seed = ?",
             (job_id,)
         )
-        rows = persistence.fetch_all(cur)
-        
-        if not rows:
-            return None
-        
-        # Start with fresh state
-        bs = brainstate.create_snapshot(job_id)
-        
-        # Replay episodic entries to rebuild state
-        for row in rows:
-            payload = row["payload"]
-            
-            # Handle both JSON string (SQLite) and dict (Postgres)
-            if isinstance(payload, str):
-                try:
-                    episode_data = json.loads(payload)
-                except:
-                    continue
-            else:
-                episode_data = payload
-            
-            # Extract state info from episode
-            # Episodes might contain goals, WM items, or other state
-            if isinstance(episode_data, dict):
-                # If episode has goals, add them
-                if "goals" in episode_data:
-                    for goal in episode_data["goals"]:
-                        if goal not in bs["goals"]:
-                            bs["goals"].append(goal)
-                
-                # If episode has WM items, add them
-                if "working_memory" in episode_data:
-                    for item in episode_data["working_memory"]:
-                        brainstate.add_wm_item(bs, item)
-                
-                # If episode records a complete brainstate, use it
-                if "snapshot_id" in episode_data and "tick_count" in episode_data:
-                    # This episode is a brainstate snapshot
-                    bs = episode_data
-        
-        return bs
+        row = persistence.fetch_one(cur)
+    finally:
+        conn.close()
+    if not row:
+        return None
+    # Handle both string (SQLite) and dict (Postgres JSONB)
+    brainstate_json = row.pop("brainstate_json")
+    row["state"] = json.loads(brainstate_json) if isinstance(brainstate_json, str) else brainstate_json
+    recent_json = row.pop("recent_json")
+    row["recent"] = (json.loads(recent_json) if isinstance(recent_json, str) else recent_json) or {}
+    return row
+
+def _save_checkpoint(job_id, bs, last, recent, total):
+    conn = persistence.get_connection()
+    try:
+        # Plain JSON, not canonical: a resumed rebuild must return what a
+        # rebuild from scratch would (canonical form normalizes strings and
+        # rounds floats)
+        persistence.execute_query(conn,
+            "INSERT OR REPLACE INTO rehydrate_checkpoints (job_seed, brainstate_json, last_created_at, last_episodic_id, recent_json, episodes_applied, created_at) VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (job_id, json.dumps(bs, ensure_ascii=False), last[0], last[1], json.dumps(recent), total,
+             datetime.datetime.now(datetime.timezone.utc).isoformat())
+        )
+        conn.commit()
     finally:
         conn.close()
 
@@ -63,5 +207,4 @@ def load_last_snapshot():
     Load the most recent valid brainstate snapshot.
     Uses the new persistence layer.
     """
-    from mace.brainstate import persistence as bs_persistence
     return bs_persistence.load_latest_snapshot()
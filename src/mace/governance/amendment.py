@@ -4,11 +4,22 @@ Stage: cross-stage
 Purpose: Governance amendment engine. Loads policy amendments and enforces them
          with a fail-halt (kill-switch) strategy per the Zero Divergence Protocol.
 
+         check_policy() and blocked_targets() read a compiled index of the
+         amendments file ({(policy_type, target): active}) that is rebuilt only
+         when the file's stat signature and content hash change, so a check is
+         one stat() plus a dict lookup. A corrupt or unreadable file is never
+         cached: every check raises GovernanceViolation until it is fixed.
+
 Part of MACE (Meta Aware Cognitive Engine).
 """
+import hashlib
 import json
 import logging
 import os
+import threading
+import time
+
+from mace.ops import metrics
 
 AMENDMENTS_FILE = "amendments.jsonl"
 
@@ -30,35 +41,110 @@ def load_amendments() -> list:
         GovernanceViolation: If the amendments file exists but is corrupt
                              (fail-halt, NOT fail-open).
     """
-    amendments = []
     if not os.path.exists(AMENDMENTS_FILE):
-        return amendments
+        return []
 
     try:
-        with open(AMENDMENTS_FILE, "r") as f:
-            for line_num, line in enumerate(f, 1):
-                stripped = line.strip()
-                if not stripped:
-                    continue
-                try:
-                    amendments.append(json.loads(stripped))
-                except json.JSONDecodeError as e:
-                    # FAIL-HALT: Corrupt governance data is a critical violation
-                    raise GovernanceViolation(
-                        f"GOVERNANCE_CORRUPT: Malformed amendment at line {line_num} "
-                        f"in {AMENDMENTS_FILE}: {e}"
-                    )
-    except GovernanceViolation:
-        raise  # Re-raise governance violations
+        with open(AMENDMENTS_FILE, "rb") as f:
+            data = f.read()
     except OSError as e:
         # FAIL-HALT: If we cannot read governance, we cannot enforce it
         raise GovernanceViolation(
             f"GOVERNANCE_UNREADABLE: Cannot read {AMENDMENTS_FILE}: {e}"
         )
+    return _parse_amendments(data)
 
+
+def _parse_amendments(data: bytes) -> list:
+    try:
+        text = data.decode("utf-8")
+    except UnicodeDecodeError as e:
+        raise GovernanceViolation(
+            f"GOVERNANCE_CORRUPT: {AMENDMENTS_FILE} is not valid UTF-8: {e}"
+        )
+    amendments = []
+    for line_num, line in enumerate(text.splitlines(), 1):
+        stripped = line.strip()
+        if not stripped:
+            continue
+        try:
+            amendments.append(json.loads(stripped))
+        except json.JSONDecodeError as e:
+            # FAIL-HALT: Corrupt governance data is a critical violation
+            raise GovernanceViolation(
+                f"GOVERNANCE_CORRUPT: Malformed amendment at line {line_num} "
+                f"in {AMENDMENTS_FILE}: {e}"
+            )
     return amendments
 
 
+# A file modified this close to when it was read may be rewritten again
+# without its mtime or size changing; such signatures are re-hashed.
+_RACY_WINDOW_NS = 2_000_000_000
+
+
+class _PolicyIndex:
+    """Compiled {(policy_type, target): active} view of AMENDMENTS_FILE."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._path = None
+        self._signature = None
+        self._digest = None
+        self._racy = True
+        self._policies = {}
+
+    def get(self) -> dict:
+        with self._lock:
+            try:
+                st = os.stat(AMENDMENTS_FILE)
+            except FileNotFoundError:
+                self._path, self._signature, self._digest = AMENDMENTS_FILE, None, None
+                self._policies = {}
+                return self._policies
+            except OSError as e:
+                raise GovernanceViolation(
+                    f"GOVERNANCE_UNREADABLE: Cannot read {AMENDMENTS_FILE}: {e}"
+                )
+
+            signature = (st.st_ino, st.st_size, st.st_mtime_ns)
+            if self._path == AMENDMENTS_FILE and signature == self._signature and not self._racy:
+                return self._policies
+            self._reload(signature)
+            return self._policies
+
+    def _reload(self, signature):
+        start = time.perf_counter()
+        try:
+            with open(AMENDMENTS_FILE, "rb") as f:
+                data = f.read()
+        except OSError as e:
+            raise GovernanceViolation(
+                f"GOVERNANCE_UNREADABLE: Cannot read {AMENDMENTS_FILE}: {e}"
+            )
+        digest = hashlib.sha256(data).digest()
+        self._racy = time.time_ns() - signature[2] < _RACY_WINDOW_NS
+        if self._path == AMENDMENTS_FILE and digest == self._digest:
+            # Touched but unchanged: no recompile
+            self._signature = signature
+            return
+
+        # Invalidate first so a corrupt file keeps failing on every check
+        self._path, self._signature, self._digest = None, None, None
+        policies = {}
+        for amd in _parse_amendments(data):
+            key = (amd.get("policy_type"), amd.get("target"))
+            policies[key] = policies.get(key, False) or bool(amd.get("active", True))
+        self._policies = policies
+        self._path, self._signature, self._digest = AMENDMENTS_FILE, signature, digest
+
+        metrics.increment("amendment_policy_reloads_total")
+        metrics.increment("amendment_policy_reload_ms_total", (time.perf_counter() - start) * 1000)
+
+
+_policy_index = _PolicyIndex()
+
+
 def check_policy(policy_type: str, target: str) -> bool:
     """
     Check if a target is blocked by any active amendment.
@@ -73,13 +159,21 @@ def check_policy(policy_type: str, target: str) -> bool:
     Raises:
         GovernanceViolation: If amendments cannot be loaded (fail-halt).
     """
-    amendments = load_amendments()
-    for amd in amendments:
-        if not amd.get("active", True):
-            continue
+    return _policy_index.get().get((policy_type, target), False)
 
-        if amd.get("policy_type") == policy_type:
-            if amd.get("target") == target:
-                return True
 
-    return False
+def blocked_targets(policy_type: str) -> set:
+    """
+    All targets blocked by active amendments of `policy_type`.
+
+    Reads the compiled index once, so batch callers can check many targets
+    with the same result as calling check_policy() for each.
+
+    Raises:
+        GovernanceViolation: If amendments cannot be loaded (fail-halt).
+    """
+    return {
+        target
+        for (ptype, target), active in _policy_index.get().items()
+        if active and ptype == policy_type
+    }
@@ -26,12 +26,19 @@ class CandidateGenerator:
     def __init__(self, episodic_memory: EpisodicMemory):
         self.episodic = episodic_memory
         
-    def generate_candidates(self, max_episodes: int = 100) -> List[Dict[str, Any]]:
+    def generate_candidates(self, max_episodes: int = 100, tags: List[str] = None) -> List[Dict[str, Any]]:
         """
         Extracts candidate hypotheses from the N most recent episodic traces.
         Returns a list of candidate dictionaries with the 6 strictly prescribed features.
+        
+        With `tags`, only the N most recent episodes carrying at least one
+        of those context tags are clustered (read through the episodic tag
+        index), e.g. to build candidates for one kind of interaction.
         """
-        episodes = self.episodic.get_recent(n=max_episodes)
+        if tags:
+            episodes = self.episodic.search_by_tags(any_of=tags, limit=max_episodes)
+        else:
+            episodes = self.episodic.get_recent(n=max_episodes)
         if not episodes:
             return []
             
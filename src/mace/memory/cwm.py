@@ -5,16 +5,37 @@ Purpose: Maintain context across multiple requests in a session.
 Capacity: 20 items (configurable via max_cwm_items)
 Lifetime: Persists for session/job duration, DB-backed
 Eviction: Oldest items when full, promotes to Episodic on session end
+
+Items live in one in-memory ring buffer per job_seed, shared by every
+ContextualWorkingMemory instance of that session in the process; the DB is
+only read to load a session the process has not seen yet. Writes (inserts,
+evictions, session clears) are queued and applied in batches by a
+background write-behind flusher, at most cwm_flush_interval_ms after they
+were queued or as soon as cwm_flush_batch_size are pending. end_session()
+and flush() are barriers: when they return, every queued write is in the
+DB. Queued writes are applied on a dedicated connection, outside any
+unit_of_work, so a request that rolls back does not take them with it (the
+ring buffer keeps them too). Inside a unit_of_work the barrier waits for the
+unit of work to end: until then it may hold the SQLite write lock.
 """
+import atexit
+import collections
 import datetime
 import json
+import threading
 from mace.core import persistence, deterministic, canonical
 from mace.config import config_loader
+from mace.ops import metrics
 
 
 _table_initialized = False
 
 
+def _reset_table_flag():
+    global _table_initialized
+    _table_initialized = False
+
+
 def _ensure_table_exists():
     """Create cwm_items table if it doesn't exist."""
     global _table_initialized
@@ -34,10 +55,149 @@ def _ensure_table_exists():
                 expires_at TEXT
             )
         """)
+        persistence.execute_query(conn, """
+            CREATE INDEX IF NOT EXISTS idx_cwm_items_job_seed ON cwm_items(job_seed, created_at)
+        """)
         conn.commit()
         _table_initialized = True
+        persistence.on_rollback(_reset_table_flag)
     finally:
         conn.close()
+    # The database may have been replaced: reload sessions from it
+    close_sessions()
+
+
+class _WriteBehind:
+    """Background thread that applies queued CWM writes in batches."""
+    
+    def __init__(self):
+        self._cond = threading.Condition()
+        self._pending = []  # ("put", row) | ("delete", item_id) | ("clear", job_seed), in order
+        self._flush_lock = threading.Lock()
+        self._thread = None
+    
+    def submit(self, op):
+        with self._cond:
+            self._pending.append(op)
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="mace-cwm-write-behind", daemon=True)
+                self._thread.start()
+            if len(self._pending) >= config_loader.get_cwm_flush_batch_size():
+                self._cond.notify()
+    
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._pending:
+                    self._cond.wait()
+                # Let the batch fill up so one transaction covers many writes
+                if len(self._pending) < config_loader.get_cwm_flush_batch_size():
+                    self._cond.wait(config_loader.get_cwm_flush_interval_ms() / 1000.0)
+            try:
+                self.flush()
+            except Exception:
+                # Writes stay queued; retry after the next interval
+                with self._cond:
+                    self._cond.wait(config_loader.get_cwm_flush_interval_ms() / 1000.0)
+    
+    def flush(self):
+        """Apply every queued write now, in one transaction."""
+        with self._flush_lock:
+            with self._cond:
+                ops, self._pending = self._pending, []
+            if not ops:
+                return
+            conn = persistence.get_dedicated_connection()
+            try:
+                # Consecutive writes of one kind go out as one executemany
+                for kind, run in _runs(ops):
+                    if kind == "put":
+                        persistence.execute_many(conn, """
+                            INSERT OR REPLACE INTO cwm_items
+                            (item_id, job_seed, content_json, source_wm_id, priority, created_at)
+                            VALUES (?, ?, ?, ?, ?, ?)
+                        """, run)
+                    elif kind == "delete":
+                        persistence.execute_many(conn, "DELETE FROM cwm_items WHERE item_id = ?", [(i,) for i in run])
+                    else:
+                        persistence.execute_many(conn, "DELETE FROM cwm_items WHERE job_seed = ?", [(j,) for j in run])
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                with self._cond:
+                    self._pending[:0] = ops
+                metrics.increment("cwm_flush_errors_total")
+                raise
+            finally:
+                conn.close()
+            metrics.increment("cwm_flushes_total")
+            metrics.increment("cwm_flushed_writes_total", len(ops))
+
+
+def _runs(ops):
+    """Group consecutive ops of the same kind: [(kind, [arg, ...])]."""
+    runs = []
+    for kind, arg in ops:
+        if runs and runs[-1][0] == kind:
+            runs[-1][1].append(arg)
+        else:
+            runs.append((kind, [arg]))
+    return runs
+
+
+_write_behind = _WriteBehind()
+
+
+class _Session:
+    """
+    Ring buffer of one session's items, oldest first (None until loaded),
+    and the counter item IDs are derived from.
+    """
+    
+    def __init__(self):
+        self.items = None
+        self.item_counter = 0
+        self.lock = threading.RLock()
+
+
+_sessions = {}  # job_seed -> _Session
+_sessions_lock = threading.Lock()
+
+
+def _session(job_seed):
+    with _sessions_lock:
+        session = _sessions.get(job_seed)
+        if session is None:
+            session = _sessions[job_seed] = _Session()
+        return session
+
+
+def flush():
+    """
+    Write every queued CWM change to the DB now, or inside a unit_of_work
+    as soon as it ends.
+    """
+    persistence.after_unit_of_work(_write_behind.flush)
+
+
+def close_sessions():
+    """
+    Flush queued writes and drop the in-memory buffers; sessions are
+    reloaded from the DB on next use (before replacing the database).
+    """
+    _write_behind.flush()
+    with _sessions_lock:
+        _sessions.clear()
+
+
+def _flush_at_exit():
+    try:
+        _write_behind.flush()
+    except Exception:
+        pass  # Shutdown: the DB may already be gone
+
+
+atexit.register(_flush_at_exit)
 
 
 class ContextualWorkingMemory:
@@ -45,7 +205,7 @@ class ContextualWorkingMemory:
     Contextual Working Memory - Session-level context.
     
     Persists across multiple requests within the same job/session.
-    DB-backed for durability.
+    DB-backed for durability (write-behind; see module docstring).
     """
     
     def __init__(self, job_seed: str, on_session_end_callback=None):
@@ -60,35 +220,37 @@ class ContextualWorkingMemory:
         self.job_seed = job_seed
         self.max_capacity = config_loader.get_limits().get('max_cwm_items', 20)
         self.on_session_end_callback = on_session_end_callback
-        self._item_counter = 0
-        self._items_cache = None  # Lazy load
+        self._session = _session(job_seed)  # Shared with other instances of this session
     
-    def _load_items(self) -> list:
-        """Load items from DB for this job_seed."""
-        if self._items_cache is not None:
-            return self._items_cache
-        
-        conn = persistence.get_connection()
-        try:
-            cur = persistence.execute_query(
-                conn,
-                "SELECT item_id, content_json, source_wm_id, priority, created_at FROM cwm_items WHERE job_seed = ? ORDER BY created_at ASC",
-                (self.job_seed,)
-            )
-            rows = persistence.fetch_all(cur)
-            self._items_cache = []
-            for row in rows:
-                self._items_cache.append({
+    def _load_items(self) -> collections.deque:
+        """This session's ring buffer, loaded from the DB on first use in the process."""
+        session = self._session
+        with session.lock:
+            if session.items is not None:
+                return session.items
+            conn = persistence.get_connection()
+            try:
+                cur = persistence.execute_query(
+                    conn,
+                    "SELECT item_id, content_json, source_wm_id, priority, created_at FROM cwm_items WHERE job_seed = ? ORDER BY created_at ASC",
+                    (self.job_seed,)
+                )
+                rows = persistence.fetch_all(cur)
+            finally:
+                conn.close()
+            session.items = collections.deque(
+                {
                     "item_id": row["item_id"],
                     "content": json.loads(row["content_json"]),
                     "source_wm_id": row["source_wm_id"],
                     "priority": row["priority"],
                     "created_at": row["created_at"],
                     "job_seed": self.job_seed
-                })
-            return self._items_cache
-        finally:
-            conn.close()
+                }
+                for row in rows
+            )
+            session.item_counter = len(rows)
+            return session.items
     
     def add(self, content: dict, source_wm_id: str = None, priority: float = 1.0) -> str:
         """
@@ -102,35 +264,33 @@ class ContextualWorkingMemory:
         Returns:
             The item_id
         """
-        items = self._load_items()
-        
-        # Evict oldest if at capacity
-        while len(items) >= self.max_capacity:
-            evicted = items.pop(0)
-            self._delete_from_db(evicted["item_id"])
-        
-        # Generate deterministic ID
-        self._item_counter += 1
-        id_payload = f"{self.job_seed}:cwm:{self._item_counter}:{canonical.canonical_json_serialize(content)}"
-        item_id = deterministic.deterministic_id("cwm_item", id_payload)
-        
-        timestamp = datetime.datetime.now(datetime.timezone.utc).isoformat()
-        
-        item = {
-            "item_id": item_id,
-            "content": content,
-            "source_wm_id": source_wm_id,
-            "priority": priority,
-            "created_at": timestamp,
-            "job_seed": self.job_seed
-        }
-        
-        # Persist to DB
-        self._save_to_db(item)
-        
-        # Update cache
-        items.append(item)
-        self._items_cache = items
+        with self._session.lock:
+            items = self._load_items()
+            
+            # Evict oldest if at capacity
+            while len(items) >= self.max_capacity:
+                evicted = items.popleft()
+                self._delete_from_db(evicted["item_id"])
+            
+            # Generate deterministic ID
+            self._session.item_counter += 1
+            id_payload = f"{self.job_seed}:cwm:{self._session.item_counter}:{canonical.canonical_json_serialize(content)}"
+            item_id = deterministic.deterministic_id("cwm_item", id_payload)
+            
+            timestamp = datetime.datetime.now(datetime.timezone.utc).isoformat()
+            
+            item = {
+                "item_id": item_id,
+                "content": content,
+                "source_wm_id": source_wm_id,
+                "priority": priority,
+                "created_at": timestamp,
+                "job_seed": self.job_seed
+            }
+            
+            # Queue the insert, then update the buffer
+            self._save_to_db(item)
+            items.append(item)
         
         return item_id
     
@@ -152,85 +312,66 @@ class ContextualWorkingMemory:
     
     def get(self, item_id: str) -> dict:
         """Get a specific item by ID."""
-        items = self._load_items()
-        for item in items:
+        for item in self.get_all():
             if item["item_id"] == item_id:
                 return item
         return None
     
     def get_all(self) -> list:
         """Get all items for this session."""
-        return self._load_items().copy()
+        with self._session.lock:
+            return list(self._load_items())
     
     def get_recent(self, n: int = 5) -> list:
         """Get the N most recent items."""
-        items = self._load_items()
-        return items[-n:] if len(items) >= n else items.copy()
+        items = self.get_all()
+        return items[-n:] if len(items) >= n else items
     
     def end_session(self) -> list:
         """
         End the session: promote all items to Episodic and clear.
         
+        Also a flush barrier: every queued CWM write is in the DB when this
+        returns.
+        
         Returns:
             List of all promoted items
         """
-        items = self._load_items()
+        items = self.get_all()
         
         if self.on_session_end_callback and items:
             self.on_session_end_callback(items)
         
         # Clear from DB
-        self._clear_from_db()
-        self._items_cache = []
+        with self._session.lock:
+            self._clear_from_db()
+            self._load_items().clear()
+        flush()
         
         return items
     
     def _save_to_db(self, item: dict):
-        """Persist item to database."""
-        conn = persistence.get_connection()
-        try:
-            persistence.execute_query(conn, """
-                INSERT OR REPLACE INTO cwm_items 
-                (item_id, job_seed, content_json, source_wm_id, priority, created_at)
-                VALUES (?, ?, ?, ?, ?, ?)
-            """, (
-                item["item_id"],
-                self.job_seed,
-                canonical.canonical_json_serialize(item["content"]),
-                item.get("source_wm_id"),
-                item.get("priority", 1.0),
-                item["created_at"]
-            ))
-            conn.commit()
-        finally:
-            conn.close()
+        """Queue the insert of an item."""
+        _write_behind.submit(("put", (
+            item["item_id"],
+            self.job_seed,
+            canonical.canonical_json_serialize(item["content"]),
+            item.get("source_wm_id"),
+            item.get("priority", 1.0),
+            item["created_at"]
+        )))
     
     def _delete_from_db(self, item_id: str):
-        """Delete item from database."""
-        conn = persistence.get_connection()
-        try:
-            persistence.execute_query(conn, 
-                "DELETE FROM cwm_items WHERE item_id = ?", 
-                (item_id,)
-            )
-            conn.commit()
-        finally:
-            conn.close()
+        """Queue the delete of an item."""
+        _write_behind.submit(("delete", item_id))
     
     def _clear_from_db(self):
-        """Clear all items for this job_seed."""
-        conn = persistence.get_connection()
-        try:
-            persistence.execute_query(conn,
-                "DELETE FROM cwm_items WHERE job_seed = ?",
-                (self.job_seed,)
-            )
-            conn.commit()
-        finally:
-            conn.close()
+        """Queue the delete of all items for this job_seed."""
+        _write_behind.submit(("clear", self.job_seed))
     
     def __len__(self):
-        return len(self._load_items())
+        with self._session.lock:
+            return len(self._load_items())
     
     def __repr__(self):
         return f"ContextualWorkingMemory(job_seed={self.job_seed}, items={len(self)})"
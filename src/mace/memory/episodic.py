@@ -10,49 +10,202 @@ Episodic memory stores:
 - Session summaries (from CWM promotion)
 - Lineage tracking (which CWM items contributed)
 - Knowledge graph entity/relation tags
+
+Episodes are stored in monthly partitions of created_at (see
+episodic_partitions). Queries walk the partitions newest first and stop as
+soon as they have enough rows, so recent-window reads only touch the newest
+partitions; since/until filters prune partitions outside the window.
+Partitions archived by tools/archive_episodic.py are read only when a query
+passes include_archived=True. Episode ids are unique within a partition.
+
+With episodic_payload_dedup enabled, payload bodies are stored once per
+distinct content in episodic_payloads and rehydrated on read, so returned
+episodes look the same either way (see episodic_payloads).
+
+Keyword, content and context searches go through an FTS5 index per
+partition over the summary, percept text, response text and context tags
+of every episode, ranked by BM25 (scores come from each partition's own
+statistics). Where FTS5 is unavailable (Postgres, SQLite builds without it)
+they fall back to LIKE scans. Context tags are also kept in episodic_tags,
+one row per (tag, episode), for exact tag lookups and set intersections
+(search_by_context, search_by_tags).
 """
 import datetime
+import itertools
 import json
+import re
+import sqlite3
+from typing import Iterator
 from mace.core import persistence, deterministic, canonical
 from mace.config import config_loader
+from mace.memory import episodic_partitions, episodic_payloads
 from mace.memory.knowledge_graph import get_knowledge_graph
 
 
 _table_initialized = False
+_fts_enabled = False
+
+# Full-text search of one partition, keyed by the partition's rowid
+_SQL_FTS_SEARCH = """
+    SELECT e.*, bm25({fts}) AS score FROM {fts}
+    JOIN {table} AS e ON e.rowid = {fts}.rowid
+    WHERE {fts} MATCH ?{filters}
+    ORDER BY bm25({fts}), e.created_at DESC
+    LIMIT ?
+"""
+# Columns searched by content/keyword queries (context tags have their own)
+_FTS_TEXT_COLUMNS = "{summary percept_text response_text}"
+_FTS_TOKEN = re.compile(r"[a-z0-9_]+")
+
+
+# Tag index: (tag, created_at, episodic_id) covers "episodes with tag X,
+# newest first", so tag queries never touch the episodic table until the
+# final page of ids is known.
+_SQL_TAGS_CREATE = """
+    CREATE TABLE IF NOT EXISTS episodic_tags (
+        tag TEXT NOT NULL,
+        episodic_id TEXT NOT NULL,
+        created_at TEXT,
+        PRIMARY KEY (tag, episodic_id)
+    )
+"""
+_SQL_TAGS_INDEX = """
+    CREATE INDEX IF NOT EXISTS idx_episodic_tags_tag_created
+    ON episodic_tags(tag, created_at, episodic_id)
+"""
+_SQL_TAGS_EPISODE_INDEX = """
+    CREATE INDEX IF NOT EXISTS idx_episodic_tags_episode ON episodic_tags(episodic_id)
+"""
+# Backfill for episodes written before the tag index existed, per partition
+# (the same statement as migrations/0007_episodic_tags.sql)
+_SQL_TAGS_BACKFILL_SQLITE = """
+    INSERT OR IGNORE INTO episodic_tags (tag, episodic_id, created_at)
+    SELECT DISTINCT t.value, e.episodic_id, e.created_at
+    FROM {table} AS e
+    LEFT JOIN episodic_payloads AS p ON p.payload_hash = e.payload_hash,
+    json_each(COALESCE(p.body_json, e.payload_json), '$.context_tags') AS t
+    WHERE json_valid(COALESCE(p.body_json, e.payload_json))
+"""
+_SQL_TAGS_BACKFILL_POSTGRES = """
+    INSERT INTO episodic_tags (tag, episodic_id, created_at)
+    SELECT DISTINCT jsonb_array_elements_text(COALESCE(p.body_json, e.payload_json)::jsonb -> 'context_tags'),
+           e.episodic_id, e.created_at
+    FROM episodic AS e
+    LEFT JOIN episodic_payloads AS p ON p.payload_hash = e.payload_hash
+    ON CONFLICT DO NOTHING
+"""
+# LIKE condition on an episode's summary and payload, deduplicated body included
+_SQL_LIKE_EPISODE = """(summary LIKE ? OR payload_json LIKE ?
+    OR (SELECT p.body_json FROM episodic_payloads AS p WHERE p.payload_hash = e.payload_hash) LIKE ?)"""
+
+
+def _fts_phrase(text):
+    """FTS5 prefix phrase for free text, or None if it has no tokens."""
+    tokens = _FTS_TOKEN.findall(text.lower())
+    if not tokens:
+        return None
+    return '"' + " ".join(tokens) + '"*'
+
+
+def _filter_clause(job_seed=None, since=None, until=None):
+    """Extra WHERE conditions (on alias e) for the optional search filters."""
+    conditions, params = [], []
+    if job_seed is not None:
+        conditions.append("e.job_seed = ?")
+        params.append(job_seed)
+    if since is not None:
+        conditions.append("e.created_at >= ?")
+        params.append(since)
+    if until is not None:
+        conditions.append("e.created_at < ?")
+        params.append(until)
+    return "".join(f" AND {c}" for c in conditions), params
+
+
+def _tag_range(partition):
+    """Condition on episodic_tags AS t restricting tag rows to `partition`'s month."""
+    if partition.month is None or partition.month == episodic_partitions.UNDATED_MONTH:
+        return ""
+    return f" AND t.created_at >= '{partition.month}' AND t.created_at < '{partition.upper_bound()}'"
+
+
+def _reset_table_flag():
+    global _table_initialized
+    _table_initialized = False
+    episodic_partitions.forget_partitions()
 
 
 def _ensure_table_exists():
-    """Create episodic table if it doesn't exist."""
+    """Create the episodic partitions' schema if it doesn't exist."""
     global _table_initialized
     if _table_initialized:
         return
     
+    episodic_partitions.forget_partitions()
     conn = persistence.get_connection()
     try:
-        persistence.execute_query(conn, """
-            CREATE TABLE IF NOT EXISTS episodic (
-                episodic_id TEXT PRIMARY KEY,
-                job_seed TEXT,
-                summary TEXT,
-                payload_json TEXT,
-                source_cwm_ids TEXT,
-                interaction_type TEXT,
-                created_at TEXT
-            )
-        """)
-        # Index for faster lookups
-        persistence.execute_query(conn, """
-            CREATE INDEX IF NOT EXISTS idx_episodic_job_seed ON episodic(job_seed)
-        """)
-        persistence.execute_query(conn, """
-            CREATE INDEX IF NOT EXISTS idx_episodic_created ON episodic(created_at)
-        """)
+        episodic_partitions.ensure_schema(conn)
+        _ensure_search_index(conn)
+        _ensure_tag_index(conn)
         conn.commit()
         _table_initialized = True
+        persistence.on_rollback(_reset_table_flag)
+    finally:
+        conn.close()
+
+
+def prepare_partitions():
+    """
+    Create the schema and the partitions of the current and the next month,
+    committed on their own. Call it before a unit of work that records
+    episodes (executor.execute does): SQLite cannot roll an FTS5 table
+    created and written inside a savepoint back to it, so a failing
+    record_interaction would make the whole request's commit fail.
+    """
+    _ensure_table_exists()
+    month = episodic_partitions.month_of(datetime.datetime.now(datetime.timezone.utc).isoformat())
+    conn = persistence.get_connection()
+    try:
+        for m in (month, episodic_partitions.next_month(month)):
+            episodic_partitions.ensure_partition(conn, m)
+        conn.commit()
     finally:
         conn.close()
 
 
+def _ensure_search_index(conn):
+    """Create the partitions' FTS indexes (SQLite only), backfilling missing ones."""
+    global _fts_enabled
+    _fts_enabled = episodic_partitions.ensure_search_index(conn)
+
+
+def _ensure_tag_index(conn):
+    """Create episodic_tags and its indexes, backfilling it if it is new or empty."""
+    is_sqlite = isinstance(conn, sqlite3.Connection)
+    if is_sqlite:
+        existed = persistence.execute_query(
+            conn, "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'episodic_tags'"
+        ).fetchone() is not None
+    else:
+        row = persistence.fetch_one(persistence.execute_query(
+            conn, "SELECT to_regclass('episodic_tags') AS name"
+        ))
+        existed = row["name"] is not None
+    if existed:
+        # Migration 0007 creates the table empty and leaves the backfill to us
+        existed = persistence.fetch_one(persistence.execute_query(
+            conn, "SELECT 1 AS found FROM episodic_tags LIMIT 1"
+        )) is not None
+    persistence.execute_query(conn, _SQL_TAGS_CREATE)
+    persistence.execute_query(conn, _SQL_TAGS_INDEX)
+    persistence.execute_query(conn, _SQL_TAGS_EPISODE_INDEX)
+    if not existed and is_sqlite:
+        for table in episodic_partitions.live_tables(conn):
+            persistence.execute_query(conn, _SQL_TAGS_BACKFILL_SQLITE.format(table=table))
+    elif not existed:
+        persistence.execute_query(conn, _SQL_TAGS_BACKFILL_POSTGRES)
+
+
 class EpisodicMemory:
     """
     Episodic Memory - Historical record of interactions.
@@ -203,28 +356,68 @@ class EpisodicMemory:
         
         return tags if tags else ["untagged"]
     
-    def search_by_context(self, context_tag: str, limit: int = 10) -> list:
+    def search_by_context(self, context_tag: str, limit: int = 10, job_seed: str = None,
+                          since: str = None, until: str = None, include_archived: bool = False) -> list:
         """
         Search episodes by context tag.
         
         Args:
             context_tag: The tag to search for (e.g., "stored_name_context")
             limit: Maximum results
+            job_seed: Only episodes of this session
+            since: Only episodes created at or after this ISO timestamp
+            until: Only episodes created before this ISO timestamp
+            include_archived: Also search archived partitions
         """
-        conn = persistence.get_connection()
-        try:
-            # Search in both summary (has [tag]) and payload (has context_tags)
-            cur = persistence.execute_query(
-                conn,
-                """SELECT * FROM episodic 
-                   WHERE summary LIKE ? OR payload_json LIKE ? 
-                   ORDER BY created_at DESC LIMIT ?""",
-                (f"%[{context_tag}]%", f'%"{context_tag}"%', limit)
-            )
-            rows = persistence.fetch_all(cur)
-            return [self._row_to_episode(row) for row in rows]
-        finally:
-            conn.close()
+        filters, params = _filter_clause(job_seed, since, until)
+        # Exact tag match through the tag index (any tag, not just the
+        # [primary] one in the summary)
+        return self._read_partitions(
+            f"""SELECT e.* FROM episodic_tags AS t
+               JOIN {{table}} AS e ON e.episodic_id = t.episodic_id
+               WHERE t.tag = ?{{tags}}{filters}
+               ORDER BY t.created_at DESC LIMIT ?""",
+            [context_tag] + params, limit, since, until, include_archived
+        )
+    
+    def search_by_tags(self, all_of: list = None, any_of: list = None, limit: int = 10,
+                       include_archived: bool = False) -> list:
+        """
+        Search episodes by a set of context tags, newest first.
+        
+        The id sets of the tags are intersected inside the tag index and
+        only the final page of episodes is read.
+        
+        Args:
+            all_of: Tags every result must have
+            any_of: Tags of which every result must have at least one
+            limit: Maximum results
+            include_archived: Also search archived partitions
+        """
+        all_of = list(dict.fromkeys(all_of or []))
+        any_of = list(dict.fromkeys(any_of or []))
+        if not all_of and not any_of:
+            return []
+        
+        parts, params = [], []
+        select = "SELECT t.episodic_id, t.created_at FROM episodic_tags AS t WHERE"
+        for tag in all_of:
+            parts.append(f"{select} t.tag = ?{{tags}}")
+            params.append(tag)
+        if any_of:
+            placeholders = ", ".join("?" * len(any_of))
+            parts.append(f"{select} t.tag IN ({placeholders}){{tags}}")
+            params.extend(any_of)
+        
+        return self._read_partitions(
+            f"""SELECT e.* FROM (
+                   {" INTERSECT ".join(parts)}
+                   ORDER BY created_at DESC, episodic_id LIMIT ?
+               ) AS t
+               JOIN {{table}} AS e ON e.episodic_id = t.episodic_id
+               ORDER BY t.created_at DESC, t.episodic_id""",
+            params, limit, include_archived=include_archived
+        )
     
     def record_session_end(self, cwm_items: list, job_seed: str = None) -> str:
         """
@@ -287,113 +480,137 @@ class EpisodicMemory:
         
         conn = persistence.get_connection()
         try:
-            persistence.execute_query(conn, """
-                INSERT OR REPLACE INTO episodic 
-                (episodic_id, job_seed, summary, payload_json, source_cwm_ids, interaction_type, created_at)
-                VALUES (?, ?, ?, ?, ?, ?, ?)
+            if config_loader.get_episodic_payload_dedup():
+                # Store the body once; the row keeps its hash and the per-occurrence fields
+                payload_hash, body_json, payload_json = episodic_payloads.split(payload)
+                episodic_payloads.store(conn, payload_hash, body_json, timestamp)
+            else:
+                payload_hash, payload_json = None, canonical.canonical_json_serialize(payload)
+            table = episodic_partitions.write_table(conn, episodic_partitions.month_of(timestamp))
+            fts = episodic_partitions.fts_for(table)
+            if _fts_enabled:
+                # INSERT OR REPLACE gives a replaced episode a new rowid
+                old = persistence.fetch_one(persistence.execute_query(
+                    conn, f"SELECT rowid FROM {table} WHERE episodic_id = ?", (episodic_id,)
+                ))
+                if old:
+                    persistence.execute_query(
+                        conn, f"DELETE FROM {fts} WHERE rowid = ?", (old["rowid"],)
+                    )
+            cur = persistence.execute_query(conn, f"""
+                INSERT OR REPLACE INTO {table} 
+                (episodic_id, job_seed, summary, payload_json, source_cwm_ids, interaction_type, created_at,
+                 payload_hash)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
             """, (
                 episodic_id,
                 job_seed,
                 summary,
-                canonical.canonical_json_serialize(payload),
+                payload_json,
                 json.dumps(source_cwm_ids),
                 interaction_type,
-                timestamp
+                timestamp,
+                payload_hash
             ))
+            persistence.execute_query(
+                conn, "DELETE FROM episodic_tags WHERE episodic_id = ?", (episodic_id,)
+            )
+            for tag in dict.fromkeys(payload.get("context_tags", [])):
+                persistence.execute_query(
+                    conn,
+                    "INSERT INTO episodic_tags (tag, episodic_id, created_at) VALUES (?, ?, ?)",
+                    (tag, episodic_id, timestamp)
+                )
+            if _fts_enabled:
+                persistence.execute_query(conn, f"""
+                    INSERT INTO {fts} (rowid, summary, percept_text, response_text, context_tags)
+                    VALUES (?, ?, ?, ?, ?)
+                """, (
+                    cur.lastrowid,
+                    summary,
+                    payload.get("percept_text"),
+                    payload.get("response_text"),
+                    " ".join(payload.get("context_tags", []))
+                ))
             conn.commit()
             return episodic_id
         finally:
             conn.close()
     
-    def get(self, episodic_id: str) -> dict:
-        """Get a specific episode by ID."""
-        conn = persistence.get_connection()
-        try:
-            cur = persistence.execute_query(
-                conn,
-                "SELECT * FROM episodic WHERE episodic_id = ?",
-                (episodic_id,)
-            )
-            row = persistence.fetch_one(cur)
-            if row:
-                return self._row_to_episode(row)
-            return None
-        finally:
-            conn.close()
+    def get(self, episodic_id: str, include_archived: bool = False) -> dict:
+        """Get a specific episode by ID (newest partition first)."""
+        rows = self._read_partitions(
+            "SELECT * FROM {table} AS e WHERE episodic_id = ? LIMIT ?",
+            [episodic_id], 1, include_archived=include_archived
+        )
+        return rows[0] if rows else None
     
-    def get_recent(self, n: int = 10, job_seed: str = None) -> list:
+    def get_recent(self, n: int = 10, job_seed: str = None, include_archived: bool = False) -> list:
         """
         Get the N most recent episodes.
         
         Args:
             n: Number of episodes to retrieve
             job_seed: Optional filter by session
+            include_archived: Also read archived partitions
         """
-        conn = persistence.get_connection()
-        try:
-            if job_seed:
-                cur = persistence.execute_query(
-                    conn,
-                    "SELECT * FROM episodic WHERE job_seed = ? ORDER BY created_at DESC LIMIT ?",
-                    (job_seed, n)
-                )
-            else:
-                cur = persistence.execute_query(
-                    conn,
-                    "SELECT * FROM episodic ORDER BY created_at DESC LIMIT ?",
-                    (n,)
-                )
-            rows = persistence.fetch_all(cur)
-            return [self._row_to_episode(row) for row in rows]
-        finally:
-            conn.close()
+        if job_seed:
+            return self._read_partitions(
+                "SELECT * FROM {table} AS e WHERE job_seed = ? ORDER BY created_at DESC LIMIT ?",
+                [job_seed], n, include_archived=include_archived
+            )
+        return self._read_partitions(
+            "SELECT * FROM {table} AS e ORDER BY created_at DESC LIMIT ?",
+            [], n, include_archived=include_archived
+        )
     
-    def search_by_summary(self, query: str, limit: int = 10) -> list:
+    def search_by_summary(self, query: str, limit: int = 10, include_archived: bool = False) -> list:
         """
         Search episodes by summary text (basic LIKE search).
         
         Args:
             query: Text to search for
             limit: Maximum results
+            include_archived: Also search archived partitions
         """
-        conn = persistence.get_connection()
-        try:
-            cur = persistence.execute_query(
-                conn,
-                "SELECT * FROM episodic WHERE summary LIKE ? ORDER BY created_at DESC LIMIT ?",
-                (f"%{query}%", limit)
-            )
-            rows = persistence.fetch_all(cur)
-            return [self._row_to_episode(row) for row in rows]
-        finally:
-            conn.close()
+        return self._read_partitions(
+            "SELECT * FROM {table} AS e WHERE summary LIKE ? ORDER BY created_at DESC LIMIT ?",
+            [f"%{query}%"], limit, include_archived=include_archived
+        )
     
-    def search_content(self, query: str, limit: int = 10) -> list:
+    def search_content(self, query: str, limit: int = 10, job_seed: str = None,
+                       since: str = None, until: str = None, include_archived: bool = False) -> list:
         """
-        Full-text search across summary AND payload content.
+        Full-text search across summary AND interaction content.
         
-        This searches both the summary and the raw payload JSON,
-        enabling recall by any word in the interaction.
+        Matches the words of `query` (in order, the last one as a prefix)
+        in the summary, percept text or response text, best BM25 match
+        first. Without the FTS index, substring-matches the summary and
+        raw payload JSON instead.
         
         Args:
             query: Text to search for (case-insensitive)
             limit: Maximum results
+            job_seed: Only episodes of this session
+            since: Only episodes created at or after this ISO timestamp
+            until: Only episodes created before this ISO timestamp
+            include_archived: Also search archived partitions
         """
-        conn = persistence.get_connection()
-        try:
-            cur = persistence.execute_query(
-                conn,
-                """SELECT * FROM episodic 
-                   WHERE summary LIKE ? OR payload_json LIKE ? 
-                   ORDER BY created_at DESC LIMIT ?""",
-                (f"%{query}%", f"%{query}%", limit)
-            )
-            rows = persistence.fetch_all(cur)
-            return [self._row_to_episode(row) for row in rows]
-        finally:
-            conn.close()
+        phrase = _fts_phrase(query) if _fts_enabled else None
+        if phrase is not None:
+            return self._search_fts(f"{_FTS_TEXT_COLUMNS} : {phrase}", limit, job_seed, since, until,
+                                    include_archived)
+        filters, params = _filter_clause(job_seed, since, until)
+        return self._read_partitions(
+            f"""SELECT * FROM {{table}} AS e
+               WHERE {_SQL_LIKE_EPISODE}{filters}
+               ORDER BY created_at DESC LIMIT ?""",
+            [f"%{query}%"] * 3 + params, limit, since, until, include_archived
+        )
     
-    def search_by_keywords(self, keywords: list, match_all: bool = False, limit: int = 10) -> list:
+    def search_by_keywords(self, keywords: list, match_all: bool = False, limit: int = 10,
+                           job_seed: str = None, since: str = None, until: str = None,
+                           include_archived: bool = False) -> list:
         """
         Search by multiple keywords.
         
@@ -401,53 +618,153 @@ class EpisodicMemory:
             keywords: List of keywords to search for
             match_all: If True, all keywords must match. If False, any keyword matches.
             limit: Maximum results
+            job_seed: Only episodes of this session
+            since: Only episodes created at or after this ISO timestamp
+            until: Only episodes created before this ISO timestamp
+            include_archived: Also search archived partitions
         """
         if not keywords:
             return []
         
+        phrases = [_fts_phrase(kw) for kw in keywords] if _fts_enabled else [None]
+        if all(phrases):
+            operator = " AND " if match_all else " OR "
+            match = f"{_FTS_TEXT_COLUMNS} : ({operator.join(phrases)})"
+            return self._search_fts(match, limit, job_seed, since, until, include_archived)
+        
+        filters, params = _filter_clause(job_seed, since, until)
+        # Build query conditions
+        conditions = []
+        like_params = []
+        for kw in keywords:
+            conditions.append(_SQL_LIKE_EPISODE)
+            like_params.extend([f"%{kw}%"] * 3)
+        
+        operator = " AND " if match_all else " OR "
+        where_clause = operator.join(conditions)
+        
+        return self._read_partitions(
+            f"SELECT * FROM {{table}} AS e WHERE ({where_clause}){filters} ORDER BY created_at DESC LIMIT ?",
+            like_params + params, limit, since, until, include_archived
+        )
+    
+    def _search_fts(self, match: str, limit: int, job_seed: str = None,
+                    since: str = None, until: str = None, include_archived: bool = False) -> list:
+        """Run an FTS5 MATCH expression on every partition in range, best BM25 match first."""
+        filters, params = _filter_clause(job_seed, since, until)
         conn = persistence.get_connection()
         try:
-            # Build query conditions
-            conditions = []
-            params = []
-            for kw in keywords:
-                conditions.append("(summary LIKE ? OR payload_json LIKE ?)")
-                params.extend([f"%{kw}%", f"%{kw}%"])
-            
-            operator = " AND " if match_all else " OR "
-            where_clause = operator.join(conditions)
-            
-            cur = persistence.execute_query(
-                conn,
-                f"SELECT * FROM episodic WHERE {where_clause} ORDER BY created_at DESC LIMIT ?",
-                params + [limit]
-            )
-            rows = persistence.fetch_all(cur)
-            return [self._row_to_episode(row) for row in rows]
+            rows = []
+            bodies = {}
+            for partition in episodic_partitions.partitions(conn, since, until, include_archived):
+                partition_conn = episodic_partitions.connection_for(partition, conn)
+                cur = persistence.execute_query(
+                    partition_conn,
+                    _SQL_FTS_SEARCH.format(
+                        fts=episodic_partitions.fts_for(partition.table), table=partition.table, filters=filters
+                    ),
+                    [match] + params + [limit]
+                )
+                found = persistence.fetch_all(cur)
+                bodies.update(episodic_payloads.preload(partition_conn, found))
+                rows.extend(found)
+            rows.sort(key=lambda row: row["created_at"] or "", reverse=True)
+            rows.sort(key=lambda row: row["score"])
+            return [self._row_to_episode(row, bodies) for row in rows[:limit]]
+        finally:
+            conn.close()
+    
+    def _read_partitions(self, sql: str, params: list, limit: int = None, since: str = None,
+                         until: str = None, include_archived: bool = False, newest_first: bool = True) -> list:
+        """
+        Run `sql` against the partitions the router picks, newest first,
+        stopping once `limit` rows are found.
+        
+        `sql` names the partition {table} and may restrict episodic_tags AS t
+        to the partition's month with {tags}; with a limit its last parameter
+        is a LIMIT ?, bound to the number of rows still missing.
+        """
+        conn = persistence.get_connection()
+        try:
+            rows = []
+            bodies = {}
+            for partition in episodic_partitions.partitions(conn, since, until, include_archived, newest_first):
+                args = params + [limit - len(rows)] if limit is not None else params
+                partition_conn = episodic_partitions.connection_for(partition, conn)
+                cur = persistence.execute_query(
+                    partition_conn, sql.format(table=partition.table, tags=_tag_range(partition)), args
+                )
+                found = persistence.fetch_all(cur)
+                bodies.update(episodic_payloads.preload(partition_conn, found))
+                rows.extend(found)
+                if limit is not None and len(rows) >= limit:
+                    break
+            return [self._row_to_episode(row, bodies) for row in rows]
         finally:
             conn.close()
     
-    def get_session_history(self, job_seed: str) -> list:
+    def get_session_history(self, job_seed: str, include_archived: bool = False) -> list:
         """Get all episodes for a specific session."""
+        return list(self.iter_session_history(job_seed, include_archived=include_archived))
+    
+    def iter_session_history(self, job_seed: str, batch_size: int = None,
+                             include_archived: bool = False, after: tuple = None) -> Iterator[dict]:
+        """
+        Stream the episodes of a session, oldest first, in constant memory.
+        
+        Partitions are read in order, each with keyset pagination on
+        (created_at, episodic_id), batch_size rows per query (default:
+        stream_batch_size in config/limits.yaml).
+        
+        Args:
+            after: (created_at, episodic_id) of an episode; resume the
+                   stream with the episodes after it
+        """
+        batch_size = batch_size or config_loader.get_stream_batch_size()
         conn = persistence.get_connection()
         try:
-            cur = persistence.execute_query(
-                conn,
-                "SELECT * FROM episodic WHERE job_seed = ? ORDER BY created_at ASC",
-                (job_seed,)
+            route = episodic_partitions.partitions(conn, include_archived=include_archived, newest_first=False)
+        finally:
+            conn.close()
+        if after is not None:
+            after = (after[0] or "", after[1])
+            start_month = episodic_partitions.month_of(after[0] or None)
+        for partition in route:
+            if after is not None and partition.month is not None and partition.month < start_month:
+                continue
+            created = "created_at"
+            if partition.month in (None, episodic_partitions.UNDATED_MONTH):
+                created = "COALESCE(created_at, '')"  # Undated rows: the key must not be NULL
+            archive_conn = episodic_partitions.connection_for(partition, None) if partition.archive else None
+            rows = persistence.iter_keyset(
+                partition.table, (created, "episodic_id"), "job_seed = ?", (job_seed,),
+                batch_size=batch_size, conn=archive_conn, after=after
             )
-            rows = persistence.fetch_all(cur)
-            return [self._row_to_episode(row) for row in rows]
+            while True:
+                page = list(itertools.islice(rows, batch_size))
+                if not page:
+                    break
+                bodies = self._preload_payloads(page, archive_conn)
+                for row in page:
+                    yield self._row_to_episode(row, bodies)
+    
+    def _preload_payloads(self, rows: list, conn=None) -> dict:
+        """Fetch the deduplicated payload bodies of `rows` in one query."""
+        if conn is not None:
+            return episodic_payloads.preload(conn, rows)
+        conn = persistence.get_connection()
+        try:
+            return episodic_payloads.preload(conn, rows)
         finally:
             conn.close()
     
-    def _row_to_episode(self, row: dict) -> dict:
-        """Convert DB row to episode dict."""
+    def _row_to_episode(self, row: dict, bodies: dict = None) -> dict:
+        """Convert DB row to episode dict (bodies: from episodic_payloads.preload)."""
         return {
             "episodic_id": row["episodic_id"],
             "job_seed": row["job_seed"],
             "summary": row["summary"],
-            "payload": json.loads(row["payload_json"]),
+            "payload": episodic_payloads.rehydrate(row, bodies),
             "source_cwm_ids": json.loads(row["source_cwm_ids"]) if row["source_cwm_ids"] else [],
             "interaction_type": row.get("interaction_type", "unknown"),
             "created_at": row["created_at"]
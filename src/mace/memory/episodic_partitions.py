@@ -0,0 +1,546 @@
+"""
+Module: episodic_partitions
+Stage: cross-stage
+Purpose: Monthly partitions and cold archives for episodic memory.
+
+         SQLite: one table per calendar month of created_at (UTC), named
+         episodic_pYYYYMM (episodic_p000000 holds rows without a usable
+         timestamp), each with its own FTS5 index episodic_fts_pYYYYMM.
+         The context-tag index (episodic_tags) stays global.
+         Postgres: `episodic` is a declaratively partitioned table
+         (PARTITION BY RANGE (created_at)) with the same monthly partitions,
+         so the planner prunes them itself.
+
+         Partitions older than `episodic_hot_months` (config/limits.yaml)
+         can be archived: the partition's rows, FTS index and tag rows are
+         written to a standalone SQLite database, gzip-compressed to
+         <episodic_archive_dir>/episodic_pYYYYMM.db.gz, and dropped from the
+         live database. Archives are read-only; EpisodicMemory queries them
+         only when asked to (include_archived=True), by decompressing them
+         to a temporary file and running the same SQL as for hot partitions.
+
+         The router (partitions()) lists partitions newest first and prunes
+         them by a since/until window, so recent-window queries only touch
+         the newest partitions.
+
+Part of MACE (Meta Aware Cognitive Engine).
+"""
+import atexit
+import collections
+import datetime
+import gzip
+import os
+import re
+import shutil
+import sqlite3
+import tempfile
+import threading
+
+from mace.config import config_loader
+from mace.core import persistence
+from mace.core.connection_pool import file_identity
+from mace.memory import episodic_payloads
+from mace.ops import metrics
+
+UNDATED_MONTH = "0000-00"
+
+_MONTH_RE = re.compile(r"^(\d{4})-(\d{2})")
+_TABLE_RE = re.compile(r"^episodic_p(\d{4})(\d{2})$")
+_ARCHIVE_RE = re.compile(r"^(episodic_p\d{6})\.db\.gz$")
+
+# Partition schema (the episodic columns; see episodic._ensure_table_exists)
+_SQL_TABLE = """
+    CREATE TABLE IF NOT EXISTS {table} (
+        episodic_id TEXT PRIMARY KEY,
+        job_seed TEXT,
+        summary TEXT,
+        payload_json TEXT,
+        source_cwm_ids TEXT,
+        interaction_type TEXT,
+        created_at TEXT,
+        payload_hash TEXT
+    )
+"""
+_LEGACY_COLUMNS = "episodic_id, job_seed, summary, payload_json, source_cwm_ids, interaction_type, created_at"
+_COLUMNS = f"{_LEGACY_COLUMNS}, payload_hash"
+# Stage-1 schema (migrations/0001) names for _LEGACY_COLUMNS
+_STAGE1_COLUMNS = {"payload_json": "payload", "created_at": "created_seeded_ts"}
+_SQL_TABLE_INDEXES = (
+    "CREATE INDEX IF NOT EXISTS idx_{table}_job_seed ON {table}(job_seed, created_at)",
+    "CREATE INDEX IF NOT EXISTS idx_{table}_created ON {table}(created_at)",
+)
+# '_' is a token character so context tags ("stored_name_context") stay
+# single tokens
+_SQL_FTS = """
+    CREATE VIRTUAL TABLE IF NOT EXISTS {fts} USING fts5(
+        summary, percept_text, response_text, context_tags,
+        tokenize = "unicode61 tokenchars '_'"
+    )
+"""
+# A deduplicated payload's body lives in episodic_payloads (see episodic_payloads)
+_SQL_FTS_FILL = """
+    INSERT INTO {fts} (rowid, summary, percept_text, response_text, context_tags)
+    SELECT e.rowid, e.summary,
+           json_extract(COALESCE(p.body_json, e.payload_json), '$.percept_text'),
+           json_extract(COALESCE(p.body_json, e.payload_json), '$.response_text'),
+           (SELECT group_concat(value, ' ')
+            FROM json_each(COALESCE(p.body_json, e.payload_json), '$.context_tags'))
+    FROM {table} AS e
+    LEFT JOIN episodic_payloads AS p ON p.payload_hash = e.payload_hash
+    WHERE json_valid(COALESCE(p.body_json, e.payload_json))
+"""
+# Postgres: the primary key has to include the partition key
+_SQL_PG_PARENT = """
+    CREATE TABLE IF NOT EXISTS episodic (
+        episodic_id TEXT NOT NULL,
+        job_seed TEXT,
+        summary TEXT,
+        payload_json TEXT,
+        source_cwm_ids TEXT,
+        interaction_type TEXT,
+        created_at TEXT NOT NULL,
+        payload_hash TEXT,
+        PRIMARY KEY (episodic_id, created_at)
+    ) PARTITION BY RANGE (created_at)
+"""
+# Tag index copied into archives (see episodic._SQL_TAGS_CREATE)
+_SQL_TAGS = """
+    CREATE TABLE IF NOT EXISTS episodic_tags (
+        tag TEXT NOT NULL,
+        episodic_id TEXT NOT NULL,
+        created_at TEXT,
+        PRIMARY KEY (tag, episodic_id)
+    )
+"""
+_SQL_TAGS_INDEX = """
+    CREATE INDEX IF NOT EXISTS idx_episodic_tags_tag_created
+    ON episodic_tags(tag, created_at, episodic_id)
+"""
+
+
+class Partition(collections.namedtuple("Partition", "month table archive")):
+    """
+    One monthly partition. `archive` is the archive file of a cold
+    partition, None for a partition in the live database.
+    """
+
+    def upper_bound(self):
+        """Smallest created_at after this month ('' for the undated partition)."""
+        return next_month(self.month) if self.month != UNDATED_MONTH else ""
+
+
+def month_of(created_at):
+    """'YYYY-MM' of an ISO timestamp, or UNDATED_MONTH."""
+    match = _MONTH_RE.match(created_at or "")
+    return f"{match.group(1)}-{match.group(2)}" if match else UNDATED_MONTH
+
+
+def next_month(month):
+    year, mon = int(month[:4]), int(month[5:7])
+    return f"{year + mon // 12:04d}-{mon % 12 + 1:02d}"
+
+
+def table_for(month):
+    return f"episodic_p{month[:4]}{month[5:7]}"
+
+
+def fts_for(table):
+    return table.replace("episodic_", "episodic_fts_", 1)
+
+
+def _month_of_table(table):
+    match = _TABLE_RE.match(table)
+    return f"{match.group(1)}-{match.group(2)}"
+
+
+def is_sqlite(conn):
+    return isinstance(conn, sqlite3.Connection)
+
+
+# =============================================================================
+# Live partitions
+# =============================================================================
+
+_created = set()  # Partition tables known to exist in the live database
+
+
+def forget_partitions():
+    """Drop the cache of existing partitions (the database was replaced or rolled back)."""
+    _created.clear()
+
+
+def ensure_partition(conn, month):
+    """Create the partition for `month` if missing; returns its table name."""
+    table = table_for(month)
+    if table in _created:
+        return table
+    if is_sqlite(conn):
+        persistence.execute_query(conn, _SQL_TABLE.format(table=table))
+        for sql in _SQL_TABLE_INDEXES:
+            persistence.execute_query(conn, sql.format(table=table))
+        try:
+            persistence.execute_query(conn, _SQL_FTS.format(fts=fts_for(table)))
+        except sqlite3.OperationalError:
+            pass  # SQLite built without FTS5: searches use LIKE
+    elif _pg_partitioned(conn):
+        if month == UNDATED_MONTH:
+            persistence.execute_query(conn, f"CREATE TABLE IF NOT EXISTS {table} PARTITION OF episodic DEFAULT")
+        else:
+            persistence.execute_query(
+                conn,
+                f"CREATE TABLE IF NOT EXISTS {table} PARTITION OF episodic "
+                f"FOR VALUES FROM ('{month}') TO ('{next_month(month)}')"
+            )
+    else:
+        return "episodic"  # Pre-partitioning Postgres table: written as is
+    _created.add(table)
+    persistence.on_rollback(forget_partitions)
+    return table
+
+
+def write_table(conn, month):
+    """Table an episode of `month` is inserted into."""
+    table = ensure_partition(conn, month)
+    return table if is_sqlite(conn) else "episodic"
+
+
+def ensure_schema(conn):
+    """
+    Create the partitioned layout.
+
+    SQLite: moves the rows of a pre-partitioning `episodic` table into
+    monthly partitions and drops it (and its episodic_fts index).
+    Postgres: creates `episodic` as a partitioned table if it does not
+    exist yet; an existing unpartitioned table is left alone and used as is.
+    Partitions created before payload deduplication get their
+    payload_hash column.
+    """
+    episodic_payloads.ensure_table(conn)
+    if not is_sqlite(conn):
+        persistence.execute_query(conn, _SQL_PG_PARENT)
+        persistence.execute_query(conn, "ALTER TABLE episodic ADD COLUMN IF NOT EXISTS payload_hash TEXT")
+        return
+    for table in live_tables(conn):
+        columns = [row["name"] for row in persistence.fetch_all(
+            persistence.execute_query(conn, f"PRAGMA table_info({table})")
+        )]
+        if "payload_hash" not in columns:
+            persistence.execute_query(conn, f"ALTER TABLE {table} ADD COLUMN payload_hash TEXT")
+    if not _has_table(conn, "episodic"):
+        return
+    cur = persistence.execute_query(conn, f"SELECT {_legacy_select(conn)} FROM episodic")
+    moved = 0
+    while True:
+        rows = cur.fetchmany(500)
+        if not rows:
+            break
+        by_month = collections.defaultdict(list)
+        for row in rows:
+            by_month[month_of(row["created_at"])].append(tuple(row))
+        for month, batch in by_month.items():
+            table = ensure_partition(conn, month)
+            conn.executemany(
+                f"INSERT OR REPLACE INTO {table} ({_LEGACY_COLUMNS}) VALUES ({_placeholders(_LEGACY_COLUMNS)})",
+                batch
+            )
+        moved += len(rows)
+    persistence.execute_query(conn, "DROP TABLE episodic")
+    persistence.execute_query(conn, "DROP TABLE IF EXISTS episodic_fts")
+    for table in live_tables(conn):
+        # Rowids of moved rows are new: reindex the partitions they went to
+        if _has_table(conn, fts_for(table)):
+            persistence.execute_query(conn, f"DELETE FROM {fts_for(table)}")
+            persistence.execute_query(conn, _SQL_FTS_FILL.format(fts=fts_for(table), table=table))
+    metrics.increment("episodic_legacy_rows_partitioned_total", moved)
+
+
+def ensure_search_index(conn):
+    """
+    Make sure every live SQLite partition has its FTS5 index, rebuilding
+    missing ones. Returns False where FTS5 is unavailable (Postgres,
+    SQLite builds without it).
+    """
+    if not is_sqlite(conn):
+        return False
+    try:
+        persistence.execute_query(conn, _SQL_FTS.format(fts="temp.episodic_fts_probe"))
+        persistence.execute_query(conn, "DROP TABLE temp.episodic_fts_probe")
+    except sqlite3.OperationalError:
+        return False
+    for table in live_tables(conn):
+        fts = fts_for(table)
+        if not _has_table(conn, fts):
+            persistence.execute_query(conn, _SQL_FTS.format(fts=fts))
+            persistence.execute_query(conn, _SQL_FTS_FILL.format(fts=fts, table=table))
+    return True
+
+
+def _legacy_select(conn):
+    """
+    Select list reading a legacy `episodic` table as _LEGACY_COLUMNS; tables
+    from the Stage-1 migrations name two of them differently.
+    """
+    present = {row["name"] for row in persistence.fetch_all(
+        persistence.execute_query(conn, "PRAGMA table_info(episodic)")
+    )}
+    select = []
+    for column in _LEGACY_COLUMNS.split(", "):
+        if column in present:
+            select.append(column)
+        elif _STAGE1_COLUMNS.get(column) in present:
+            select.append(f"{_STAGE1_COLUMNS[column]} AS {column}")
+        else:
+            select.append(f"NULL AS {column}")
+    return ", ".join(select)
+
+
+def _placeholders(columns):
+    return ", ".join("?" * len(columns.split(",")))
+
+
+def _has_table(conn, name):
+    return persistence.execute_query(
+        conn, "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (name,)
+    ).fetchone() is not None
+
+
+def _pg_partitioned(conn):
+    row = persistence.fetch_one(persistence.execute_query(
+        conn, "SELECT 1 AS found FROM pg_partitioned_table WHERE partrelid = 'episodic'::regclass"
+    ))
+    return row is not None
+
+
+def live_tables(conn):
+    """Names of the partitions in the live database, newest first."""
+    if is_sqlite(conn):
+        cur = persistence.execute_query(
+            conn,
+            "SELECT name FROM sqlite_master WHERE type = 'table' "
+            "AND name GLOB 'episodic_p[0-9][0-9][0-9][0-9][0-9][0-9]'"
+        )
+    else:
+        cur = persistence.execute_query(conn, """
+            SELECT c.relname AS name FROM pg_inherits AS i
+            JOIN pg_class AS c ON c.oid = i.inhrelid
+            WHERE i.inhparent = 'episodic'::regclass
+        """)
+    return sorted((row["name"] for row in persistence.fetch_all(cur)), reverse=True)
+
+
+def archive_dir():
+    return config_loader.get_episodic_archive_dir()
+
+
+def archived_tables(directory=None):
+    """{table: archive path} of every archived partition."""
+    directory = directory or archive_dir()
+    try:
+        names = os.listdir(directory)
+    except OSError:
+        return {}
+    return {m.group(1): os.path.join(directory, name) for name in names for m in [_ARCHIVE_RE.match(name)] if m}
+
+
+def partitions(conn, since=None, until=None, include_archived=False, newest_first=True):
+    """
+    Router: the partitions a query over [since, until) has to read.
+
+    On Postgres the partitioned parent table is returned as a single
+    partition (the planner prunes). Archived partitions are included only
+    with include_archived; a partition that is both live and archived
+    (archival interrupted before the drop) is read from the live database.
+    """
+    if not is_sqlite(conn):
+        found = [Partition(None, "episodic", None)]
+        if include_archived:
+            found += [Partition(_month_of_table(t), t, p) for t, p in archived_tables().items()]
+    else:
+        found = [Partition(_month_of_table(t), t, None) for t in live_tables(conn)]
+        if include_archived:
+            live = {p.table for p in found}
+            found += [Partition(_month_of_table(t), t, p)
+                      for t, p in archived_tables().items() if t not in live]
+    low = month_of(since) if since is not None else None
+    high = month_of(until) if until is not None else None
+    selected = [
+        p for p in found
+        if p.month is None or p.month == UNDATED_MONTH
+        or ((low is None or p.month >= low) and (high is None or p.month <= high))
+    ]
+    selected.sort(key=lambda p: (p.month is None, p.month or ""), reverse=newest_first)
+    return selected
+
+
+def connection_for(partition, conn):
+    """Connection to read `partition` through (`conn` unless it is archived)."""
+    if partition.archive is None:
+        return conn
+    metrics.increment("episodic_archive_reads_total")
+    return _archives.open(partition.archive)
+
+
+# =============================================================================
+# Archives
+# =============================================================================
+
+class _ArchiveCache:
+    """Decompressed, read-only archive databases, least recently used first out."""
+
+    def __init__(self, max_open=4):
+        self.max_open = max_open
+        self._open = collections.OrderedDict()  # path -> (identity, conn, tmp path)
+        self._lock = threading.Lock()
+
+    def open(self, path):
+        with self._lock:
+            entry = self._open.get(path)
+            if entry is not None and entry[0] == file_identity(path):
+                self._open.move_to_end(path)
+                return entry[1]
+            if entry is not None:
+                self._discard(path)
+            fd, tmp = tempfile.mkstemp(suffix=".db", prefix="episodic_archive_")
+            with os.fdopen(fd, "wb") as out, gzip.open(path, "rb") as src:
+                shutil.copyfileobj(src, out)
+            conn = sqlite3.connect(f"file:{tmp}?mode=ro", uri=True, check_same_thread=False)
+            conn.row_factory = sqlite3.Row
+            self._open[path] = (file_identity(path), conn, tmp)
+            while len(self._open) > self.max_open:
+                self._discard(next(iter(self._open)))
+            return conn
+
+    def _discard(self, path):
+        _, conn, tmp = self._open.pop(path)
+        conn.close()
+        try:
+            os.remove(tmp)
+        except OSError:
+            pass
+
+    def close_all(self):
+        with self._lock:
+            for path in list(self._open):
+                self._discard(path)
+
+
+_archives = _ArchiveCache()
+atexit.register(_archives.close_all)
+
+
+def close_archives():
+    """Close every decompressed archive (before replacing archive files)."""
+    _archives.close_all()
+
+
+def cold_months(hot_months=None, today=None):
+    """Months before which partitions count as cold ('YYYY-MM')."""
+    hot_months = hot_months if hot_months is not None else config_loader.get_episodic_hot_months()
+    today = today or datetime.datetime.now(datetime.timezone.utc).date()
+    index = today.year * 12 + (today.month - 1) - (hot_months - 1)
+    return f"{index // 12:04d}-{index % 12 + 1:02d}"
+
+
+def archive_partitions(before=None, directory=None):
+    """
+    Archive every live partition older than `before` ('YYYY-MM'; default:
+    outside the last episodic_hot_months months, see cold_months()).
+
+    Returns:
+        [(table, rows archived, archive path)]
+    """
+    before = before or cold_months()
+    if not re.match(r"^\d{4}-\d{2}$", before):
+        raise ValueError(f"Expected a YYYY-MM month, got {before!r}")
+    directory = directory or archive_dir()
+    conn = persistence.get_connection()
+    try:
+        tables = [t for t in live_tables(conn) if _month_of_table(t) < before]
+        if not is_sqlite(conn):
+            tables = [t for t in tables if t != table_for(UNDATED_MONTH)]
+        return [archive_partition(conn, table, directory) for table in sorted(tables)]
+    finally:
+        conn.close()
+
+
+def archive_partition(conn, table, directory):
+    """Move one live partition into a compressed archive file."""
+    os.makedirs(directory, exist_ok=True)
+    partition = Partition(_month_of_table(table), table, None)
+    tag_filter = _tag_filter(partition)
+    path = os.path.join(directory, f"{table}.db.gz")
+    fd, tmp_db = tempfile.mkstemp(suffix=".db", prefix=f"{table}_", dir=directory)
+    os.close(fd)
+    try:
+        archive = sqlite3.connect(tmp_db)
+        try:
+            archive.execute(_SQL_TABLE.format(table=table))
+            for sql in _SQL_TABLE_INDEXES:
+                archive.execute(sql.format(table=table))
+            archive.execute(_SQL_TAGS)
+            archive.execute(_SQL_TAGS_INDEX)
+
+            count = _copy_rows(
+                conn, f"SELECT {_COLUMNS} FROM {table} ORDER BY created_at, episodic_id",
+                archive, f"INSERT INTO {table} ({_COLUMNS}) VALUES ({_placeholders(_COLUMNS)})"
+            )
+            _copy_rows(
+                conn, f"SELECT t.tag, t.episodic_id, t.created_at FROM episodic_tags AS t WHERE {tag_filter}",
+                archive, "INSERT OR IGNORE INTO episodic_tags (tag, episodic_id, created_at) VALUES (?, ?, ?)"
+            )
+            # Deduplicated bodies stay live too: other partitions may share them
+            episodic_payloads.ensure_table(archive)
+            _copy_rows(
+                conn,
+                f"SELECT p.payload_hash, p.body_json, p.created_at FROM episodic_payloads AS p "
+                f"WHERE p.payload_hash IN (SELECT payload_hash FROM {table})",
+                archive,
+                "INSERT INTO episodic_payloads (payload_hash, body_json, created_at) VALUES (?, ?, ?)"
+            )
+            try:
+                archive.execute(_SQL_FTS.format(fts=fts_for(table)))
+                archive.execute(_SQL_FTS_FILL.format(fts=fts_for(table), table=table))
+            except sqlite3.OperationalError:
+                pass  # No FTS5: the archive is searched with LIKE
+            archive.commit()
+            archive.execute("VACUUM")
+        finally:
+            archive.close()
+
+        tmp_gz = f"{path}.tmp"
+        with open(tmp_db, "rb") as src, gzip.open(tmp_gz, "wb") as out:
+            shutil.copyfileobj(src, out)
+        with open(tmp_gz, "rb") as f:
+            os.fsync(f.fileno())
+        os.replace(tmp_gz, path)
+    finally:
+        os.remove(tmp_db)
+
+    # The archive is durable: drop the live copy
+    persistence.execute_query(conn, f"DELETE FROM episodic_tags WHERE episodic_id IN (SELECT t.episodic_id FROM episodic_tags AS t WHERE {tag_filter})")
+    persistence.execute_query(conn, f"DROP TABLE IF EXISTS {table}")
+    if is_sqlite(conn):
+        persistence.execute_query(conn, f"DROP TABLE IF EXISTS {fts_for(table)}")
+    conn.commit()
+    _created.discard(table)
+    metrics.increment("episodic_partitions_archived_total")
+    return table, count, path
+
+
+def _tag_filter(partition):
+    """WHERE condition on episodic_tags AS t selecting the tags of `partition`'s episodes."""
+    if partition.month == UNDATED_MONTH:
+        return f"t.episodic_id IN (SELECT episodic_id FROM {partition.table})"
+    return f"t.created_at >= '{partition.month}' AND t.created_at < '{partition.upper_bound()}'"
+
+
+def _copy_rows(conn, select_sql, archive, insert_sql):
+    cur = persistence.execute_query(conn, select_sql)
+    count = 0
+    while True:
+        rows = cur.fetchmany(500)
+        if not rows:
+            break
+        archive.executemany(insert_sql, [tuple(dict(row).values()) for row in rows])
+        count += len(rows)
+    return count
@@ -0,0 +1,136 @@
+"""
+Module: episodic_payloads
+Stage: cross-stage
+Purpose: Content-addressed storage of episodic payload bodies.
+
+         With `episodic_payload_dedup` enabled (config/limits.yaml), an
+         episode's payload is split in two: the body (everything but the
+         per-occurrence fields, e.g. the router metadata of an interaction)
+         is stored once in episodic_payloads under the SHA-256 of its
+         canonical JSON, and the episode row keeps only the hash
+         (payload_hash) and the per-occurrence fields (payload_json).
+         Repeated interactions (the same greeting, the same sum) then add
+         one small row each instead of a full payload.
+
+         Bodies never change once written, so their JSON is cached in
+         process by hash. Rows without a payload_hash hold their whole
+         payload in payload_json, as before.
+
+Part of MACE (Meta Aware Cognitive Engine).
+"""
+import collections
+import hashlib
+import json
+import threading
+
+from mace.core import persistence, canonical
+from mace.ops import metrics
+
+# Payload fields that differ between occurrences of the same interaction
+OCCURRENCE_FIELDS = ("metadata",)
+
+_SQL_CREATE = """
+    CREATE TABLE IF NOT EXISTS episodic_payloads (
+        payload_hash TEXT PRIMARY KEY,
+        body_json TEXT NOT NULL,
+        created_at TEXT
+    )
+"""
+
+_CACHE_MAX_ENTRIES = 4096
+_cache = collections.OrderedDict()  # payload_hash -> body JSON
+_cache_lock = threading.Lock()
+
+
+def ensure_table(conn):
+    persistence.execute_query(conn, _SQL_CREATE)
+
+
+def split(payload):
+    """
+    Split a payload into (payload_hash, body JSON, per-occurrence JSON).
+    """
+    body = {k: v for k, v in payload.items() if k not in OCCURRENCE_FIELDS}
+    occurrence = {k: v for k, v in payload.items() if k in OCCURRENCE_FIELDS}
+    body_json = canonical.canonical_json_serialize(body)
+    payload_hash = hashlib.sha256(body_json.encode("utf-8")).hexdigest()
+    return payload_hash, body_json, canonical.canonical_json_serialize(occurrence)
+
+
+def store(conn, payload_hash, body_json, created_at):
+    """Write a payload body unless the same body is already stored."""
+    cur = persistence.execute_query(
+        conn,
+        "INSERT OR IGNORE INTO episodic_payloads (payload_hash, body_json, created_at) VALUES (?, ?, ?)",
+        (payload_hash, body_json, created_at)
+    )
+    metrics.increment("episodic_payloads_written_total" if cur.rowcount else "episodic_payloads_deduplicated_total")
+
+
+def preload(conn, rows):
+    """
+    Fetch the bodies `rows` reference (one query) into the cache.
+
+    Returns {payload_hash: body JSON} for the bodies of `rows`; pass it to
+    rehydrate() so the rows can be read even if the cache evicted their
+    bodies in the meantime (archived bodies are only in their archive).
+    """
+    wanted = {row["payload_hash"] for row in rows if row.get("payload_hash")}
+    bodies = {}
+    with _cache_lock:
+        for payload_hash in wanted:
+            body = _cache.get(payload_hash)
+            if body is not None:
+                bodies[payload_hash] = body
+    missing = [payload_hash for payload_hash in wanted if payload_hash not in bodies]
+    for i in range(0, len(missing), 500):
+        chunk = missing[i:i + 500]
+        cur = persistence.execute_query(
+            conn,
+            f"SELECT payload_hash, body_json FROM episodic_payloads "
+            f"WHERE payload_hash IN ({', '.join('?' * len(chunk))})",
+            chunk
+        )
+        for row in persistence.fetch_all(cur):
+            bodies[row["payload_hash"]] = row["body_json"]
+            _remember(row["payload_hash"], row["body_json"])
+    return bodies
+
+
+def rehydrate(row, bodies=None):
+    """
+    The full payload dict of an episode row.
+
+    Args:
+        bodies: What preload() returned for the row's page; without it (or
+                if it lacks the body) the body comes from the cache, else
+                from the main database
+    """
+    payload = json.loads(row["payload_json"])
+    payload_hash = row.get("payload_hash")
+    if not payload_hash:
+        return payload
+    body = bodies.get(payload_hash) if bodies else None
+    if body is None:
+        with _cache_lock:
+            body = _cache.get(payload_hash)
+            if body is not None:
+                _cache.move_to_end(payload_hash)
+    if body is None:
+        conn = persistence.get_connection()
+        try:
+            body = preload(conn, [row]).get(payload_hash)
+        finally:
+            conn.close()
+        if body is None:
+            raise ValueError(f"Episode {row['episodic_id']} references missing payload {payload_hash}")
+    # Same key order as a payload stored whole (canonical JSON sorts keys)
+    return dict(sorted({**json.loads(body), **payload}.items()))
+
+
+def _remember(payload_hash, body_json):
+    with _cache_lock:
+        _cache[payload_hash] = body_json
+        _cache.move_to_end(payload_hash)
+        while len(_cache) > _CACHE_MAX_ENTRIES:
+            _cache.popitem(last=False)
@@ -20,6 +20,11 @@ from mace.core import persistence, deterministic, canonical
 _table_initialized = False
 
 
+def _reset_table_flag():
+    global _table_initialized
+    _table_initialized = False
+
+
 def _ensure_table_exists():
     """Create knowledge graph tables if they don't exist."""
     global _table_initialized
@@ -64,6 +69,7 @@ def _ensure_table_exists():
         
         conn.commit()
         _table_initialized = True
+        persistence.on_rollback(_reset_table_flag)
     finally:
         conn.close()
 
@@ -0,0 +1,201 @@
+"""
+Module: sem_bloom
+Stage: cross-stage
+Purpose: Optional per-namespace Bloom filters that let LiveSEMStore answer
+         definite misses without a SQLite round trip.
+
+         One filter per key namespace (the key minus its last segment, e.g.
+         "user/profile/user_123"). A namespace with no filter has never been
+         written. Filters are built from sem_kv when the store opens, updated
+         on every put, and saved next to the database ("<db>.bloom") together
+         with the database's random ID (sem_meta) and the SEM history version
+         they cover, so a warm start only replays the versions written since
+         (see storage_backend sem_versions). The ID, not the file's inode,
+         ties the filters to the database: inodes are reused once a database
+         is deleted. For a sharded store (see sem_shards) that version, the
+         ID and the data_version are tuples with one entry per shard.
+
+         Bloom filters never report a present key as absent as long as they
+         have seen every write. Writes from other connections are picked up
+         before a miss is trusted: PRAGMA data_version changes whenever another
+         connection commits, and the filters then catch up from sem_versions.
+
+         Enabled by `sem_bloom_enabled` in config/limits.yaml (default: off).
+
+Part of MACE (Meta Aware Cognitive Engine).
+"""
+import base64
+import hashlib
+import json
+import math
+import os
+
+from mace.ops import metrics
+
+
+def _json_form(value):
+    """`value` as it reads back from JSON (tuples become lists)."""
+    return json.loads(json.dumps(value))
+
+
+def _covers(current, watermark):
+    """True if the backend at `current` has every version up to `watermark`."""
+    if isinstance(current, tuple):
+        return len(watermark) == len(current) and all(w <= c for w, c in zip(watermark, current))
+    return watermark <= current
+
+
+def namespace_of(key):
+    """Namespace segment(s) of a canonical key: everything before the last '/'."""
+    return key.rsplit("/", 1)[0]
+
+
+class BloomFilter:
+    """Fixed-size Bloom filter over strings (double hashing on BLAKE2b)."""
+
+    def __init__(self, capacity, error_rate, bits=None, count=0):
+        self.capacity = max(int(capacity), 1)
+        self.error_rate = error_rate
+        self.num_bits = max(8, int(math.ceil(-self.capacity * math.log(error_rate) / (math.log(2) ** 2))))
+        self.num_hashes = max(1, int(round(self.num_bits / self.capacity * math.log(2))))
+        self.bits = bits if bits is not None else bytearray((self.num_bits + 7) // 8)
+        self.count = count
+
+    def _positions(self, item):
+        digest = hashlib.blake2b(item.encode("utf-8"), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        for i in range(self.num_hashes):
+            yield (h1 + i * h2) % self.num_bits
+
+    def add(self, item):
+        for pos in self._positions(item):
+            self.bits[pos >> 3] |= 1 << (pos & 7)
+        self.count += 1
+
+    def __contains__(self, item):
+        return all(self.bits[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(item))
+
+    def is_full(self):
+        return self.count > self.capacity
+
+
+class NamespaceBloom:
+    """Per-namespace Bloom filters for one SEM database."""
+
+    def __init__(self, error_rate=0.01, min_capacity=1024):
+        self.error_rate = error_rate
+        self.min_capacity = min_capacity
+        self.filters = {}
+        self.watermark = 0  # Newest sem_versions version reflected in the filters
+        self.data_version = None
+
+    def _new_filter(self, expected):
+        return BloomFilter(max(self.min_capacity, 2 * expected), self.error_rate)
+
+    def build(self, backend):
+        """Build every filter from the backend's sem_kv."""
+        self.filters = {}
+        self.watermark = backend.current_version()
+        counts = {}
+        keys = backend.all_keys()
+        for key in keys:
+            ns = namespace_of(key)
+            counts[ns] = counts.get(ns, 0) + 1
+        for key in keys:
+            ns = namespace_of(key)
+            bloom = self.filters.get(ns)
+            if bloom is None:
+                bloom = self.filters[ns] = self._new_filter(counts[ns])
+            bloom.add(key)
+        self.data_version = backend.data_version()
+        metrics.increment("sem_bloom_builds_total")
+
+    def add(self, key, backend):
+        ns = namespace_of(key)
+        bloom = self.filters.get(ns)
+        if bloom is None:
+            bloom = self.filters[ns] = self._new_filter(0)
+        elif key in bloom:
+            return
+        bloom.add(key)
+        if bloom.is_full():
+            # Past capacity the false-positive rate climbs; resize from the DB
+            keys = backend.namespace_keys(ns)
+            bloom = self.filters[ns] = self._new_filter(len(keys))
+            for k in keys:
+                bloom.add(k)
+            if key not in bloom:
+                bloom.add(key)
+
+    def might_contain(self, key, backend):
+        """
+        False only if `key` is definitely absent. Commits made through other
+        connections since the last check are folded in first.
+        """
+        if self._probe(key):
+            return True
+        version = backend.data_version()
+        if version != self.data_version:
+            self.catch_up(backend)
+            self.data_version = version
+            return self._probe(key)
+        return False
+
+    def _probe(self, key):
+        bloom = self.filters.get(namespace_of(key))
+        return bloom is not None and key in bloom
+
+    def catch_up(self, backend):
+        """Add every key written after the watermark."""
+        keys, watermark = backend.keys_since(self.watermark)
+        for key in keys:
+            self.add(key, backend)
+        self.watermark = watermark  # Never behind the watermark passed in
+
+    def save(self, path, database_id):
+        data = {
+            "database_id": _json_form(database_id),
+            "watermark": self.watermark,
+            "error_rate": self.error_rate,
+            "namespaces": {
+                ns: [b.capacity, b.count, base64.b64encode(bytes(b.bits)).decode("ascii")]
+                for ns, b in self.filters.items()
+            },
+        }
+        tmp = f"{path}.tmp"
+        with open(tmp, "w") as f:
+            json.dump(data, f)
+        os.replace(tmp, path)
+
+    def load(self, path, database_id):
+        """
+        Load filters saved for the same database. Returns False (and leaves
+        the filters empty) if the file is missing, unreadable or belongs to
+        another database.
+        """
+        try:
+            with open(path) as f:
+                data = json.load(f)
+            if data["database_id"] != _json_form(database_id):
+                return False
+            if data["error_rate"] != self.error_rate:
+                return False
+            filters = {}
+            for ns, (capacity, count, bits) in data["namespaces"].items():
+                filters[ns] = BloomFilter(capacity, self.error_rate,
+                                          bytearray(base64.b64decode(bits)), count)
+            self.filters = filters
+            self.watermark = data["watermark"]
+            return True
+        except (OSError, ValueError, KeyError, TypeError):
+            return False
+
+    def open(self, backend, path):
+        """Warm start from `path` if it matches the backend, else build from scratch."""
+        if self.load(path, backend.database_id()) and _covers(backend.current_version(), self.watermark):
+            self.catch_up(backend)
+            self.data_version = backend.data_version()
+            metrics.increment("sem_bloom_warm_starts_total")
+        else:
+            self.build(backend)
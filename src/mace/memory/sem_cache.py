@@ -0,0 +1,95 @@
+"""
+Module: sem_cache
+Stage: cross-stage
+Purpose: Bounded in-process read-through cache for semantic.get_sem.
+
+         Entries hold the parsed value and last_updated of a key, or a negative
+         entry for a key known to be missing. semantic.put_sem invalidates the
+         key it writes, and the whole cache is dropped whenever the live store
+         reports a different cache token (the DB file was replaced, or another
+         connection or process committed to it) or the active store changes.
+         Eviction is LRU.
+
+Part of MACE (Meta Aware Cognitive Engine).
+"""
+import copy
+import threading
+from collections import OrderedDict
+
+from mace.ops import metrics
+
+# Cached entry for a key that does not exist
+MISSING = object()
+
+
+class SEMReadCache:
+    """LRU cache of {key: (value | MISSING, last_updated)}."""
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._token = None
+        self._invalidations = 0
+
+    def validate(self, token):
+        """Drop every entry if `token` differs from the one the entries were read under."""
+        with self._lock:
+            if token != self._token:
+                self._invalidations += 1
+                self._entries.clear()
+                self._token = token
+
+    def lookup(self, key):
+        """
+        Return (value, last_updated) for a cached key, or None on a miss.
+
+        value is MISSING for negative entries. Mutable values are copied so
+        callers cannot corrupt the cached object.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                metrics.increment("sem_cache_misses_total")
+                return None
+            self._entries.move_to_end(key)
+        metrics.increment("sem_cache_hits_total")
+        value, last_updated = entry
+        if isinstance(value, (dict, list)):
+            value = copy.deepcopy(value)
+        return value, last_updated
+
+    def fill_ticket(self):
+        """
+        Take before reading the store on a miss and pass to store(). A write
+        invalidated in between makes store() drop the (possibly stale) read.
+        """
+        return self._invalidations
+
+    def store(self, key, value, last_updated, ticket):
+        if self.max_entries <= 0:
+            return
+        if isinstance(value, (dict, list)):
+            value = copy.deepcopy(value)
+        with self._lock:
+            if ticket != self._invalidations:
+                return
+            self._entries[key] = (value, last_updated)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                metrics.increment("sem_cache_evictions_total")
+
+    def invalidate(self, key):
+        with self._lock:
+            self._invalidations += 1
+            self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._invalidations += 1
+            self._entries.clear()
+            self._token = None
+
+    def __len__(self):
+        return len(self._entries)
@@ -22,18 +22,40 @@ class SemanticMemoryInterface:
         """Read a value from Semantic Memory."""
         return semantic.get_sem(key)
 
+    def put_many(self, items, source: str = "unknown") -> list:
+        """Write many values in one batch (see `put_sem_many`)."""
+        return semantic.put_sem_many(items, source)
+
+    def get_many(self, keys: list) -> dict:
+        """Read many values in one batch (see `get_sem_many`)."""
+        return semantic.get_sem_many(keys)
+
     def search(self, query: str, limit: int = 50) -> list:
         """
-        Search Semantic Memory by partial key or value match.
+        Search Semantic Memory by key or value text.
 
         Delegates to the canonical `search_sem` function in semantic.py
-        which performs a case-insensitive substring search across keys.
+        which performs a ranked, case-insensitive prefix search across keys
+        and values.
 
         Args:
-            query: Substring to search for.
+            query: Words to search for.
             limit: Maximum number of results to return.
 
         Returns:
             List of dicts with 'key', 'value', and 'last_updated'.
         """
         return semantic.search_sem(query, limit)
+
+    def scan(self, prefix: str, limit: int = 100, cursor: str = None) -> dict:
+        """
+        List one page of keys under a prefix (see `scan_sem`).
+
+        Returns:
+            Dict with 'items' and 'next_cursor' (None on the last page).
+        """
+        return semantic.scan_sem(prefix, limit, cursor)
+
+    def count(self, prefix: str) -> int:
+        """Number of keys under a prefix."""
+        return semantic.count_sem(prefix)
@@ -0,0 +1,315 @@
+"""
+Module: sem_journal
+Stage: cross-stage
+Purpose: Segmented, append-only SEM write journal.
+
+         Layout, for a journal at logs/sem_write_journal.jsonl:
+             logs/sem_write_journal.jsonl             active segment
+             logs/sem_write_journal.000001.jsonl      sealed segments (immutable)
+             logs/sem_write_journal.index.json        key -> latest sealed entry
+
+         Appends go through one long-lived buffered handle and reach the OS
+         once per append() call (one put_sem or one put_sem_many batch), so
+         the active segment can always be read by other tools. fsync follows
+         `sem_journal_fsync` in config/limits.yaml:
+             always - after every append
+             batch  - at most once per sem_journal_fsync_interval_ms, and on close
+             none   - only on roll and close
+
+         When the active segment reaches sem_journal_segment_max_bytes it is
+         renamed to the next sealed segment and the sidecar index is updated.
+         Sealed segments never change, so the sidecar only covers them and is
+         caught up one new segment at a time; the active segment (bounded by
+         the segment size) is rescanned when the index is loaded.
+
+         Positions are (segment_seq, byte_offset). The active segment's seq is
+         one past the last sealed segment and keeps that seq when sealed, so a
+         position saved by a checker stays valid across rolls and read(start)
+         streams only the entries written since.
+
+         One writer process per journal path is assumed.
+
+Part of MACE (Meta Aware Cognitive Engine).
+"""
+import atexit
+import json
+import os
+import re
+import threading
+import time
+
+from mace.config import config_loader
+from mace.core.connection_pool import file_identity
+from mace.ops import metrics
+
+FSYNC_POLICIES = ("always", "batch", "none")
+
+
+class SEMJournal:
+    """Writer, index and streaming reader for one segmented journal."""
+
+    def __init__(self, path, segment_max_bytes=None, fsync=None, fsync_interval_ms=None):
+        self.path = path
+        self.segment_max_bytes = (segment_max_bytes if segment_max_bytes is not None
+                                  else config_loader.get_sem_journal_segment_max_bytes())
+        self.fsync = fsync or config_loader.get_sem_journal_fsync()
+        if self.fsync not in FSYNC_POLICIES:
+            raise ValueError(f"Unknown journal fsync policy: {self.fsync}. Must be one of {FSYNC_POLICIES}")
+        self.fsync_interval_s = (fsync_interval_ms if fsync_interval_ms is not None
+                                 else config_loader.get_sem_journal_fsync_interval_ms()) / 1000.0
+
+        base, ext = os.path.splitext(path)
+        self._base, self._ext = base, ext
+        self.index_path = f"{base}.index.json"
+        self._segment_re = re.compile(re.escape(os.path.basename(base)) + r"\.(\d{6})" + re.escape(ext) + "$")
+
+        self._lock = threading.RLock()
+        self._handle = None
+        self._identity = None
+        self._size = 0
+        self._unsynced = False
+        self._last_fsync = 0.0
+        self._active = None  # seq of the open active segment
+        self._index = None  # {key: (seq, offset)}, loaded lazily
+        self._index_identity = None
+
+    # ------------------------------------------------------------------
+    # Segments
+    # ------------------------------------------------------------------
+
+    def segment_path(self, seq):
+        """Path of segment `seq` (the active segment if seq is the active seq)."""
+        if seq == self.active_seq():
+            return self.path
+        return f"{self._base}.{seq:06d}{self._ext}"
+
+    def sealed_seqs(self):
+        directory = os.path.dirname(os.path.abspath(self.path))
+        try:
+            names = os.listdir(directory)
+        except OSError:
+            return []
+        return sorted(int(m.group(1)) for m in map(self._segment_re.match, names) if m)
+
+    def active_seq(self):
+        sealed = self.sealed_seqs()
+        return (sealed[-1] + 1) if sealed else 1
+
+    def segments(self):
+        """[(seq, path)] of every existing segment, oldest first."""
+        result = [(seq, f"{self._base}.{seq:06d}{self._ext}") for seq in self.sealed_seqs()]
+        if os.path.exists(self.path):
+            result.append((self.active_seq(), self.path))
+        return result
+
+    # ------------------------------------------------------------------
+    # Writer
+    # ------------------------------------------------------------------
+
+    def _open_active(self):
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        self._handle = open(self.path, "ab")
+        self._identity = file_identity(self.path)
+        self._active = self.active_seq()
+        self._size = os.fstat(self._handle.fileno()).st_size
+
+    def _ensure_handle(self):
+        # The active file may have been removed or replaced under us
+        # (cleanup tools, tests); never keep appending to an unlinked inode.
+        if self._handle is not None and file_identity(self.path) != self._identity:
+            self._close_handle(sync=False)
+            self._index = None
+        if self._handle is None:
+            self._open_active()
+
+    def append(self, entries):
+        """Append journal entries (dicts with a canonical_key) in order."""
+        if not entries:
+            return
+        with self._lock:
+            self._ensure_handle()
+            seq = self._active
+            chunks = []
+            offset = self._size
+            for entry in entries:
+                line = (json.dumps(entry) + "\n").encode("utf-8")
+                if self._index is not None:
+                    self._index[entry.get("canonical_key")] = (seq, offset)
+                chunks.append(line)
+                offset += len(line)
+            self._handle.write(b"".join(chunks))
+            self._handle.flush()
+            self._size = offset
+            self._unsynced = True
+            metrics.increment("sem_journal_appends_total")
+
+            if self.fsync == "always":
+                self._fsync()
+            elif self.fsync == "batch" and time.monotonic() - self._last_fsync >= self.fsync_interval_s:
+                self._fsync()
+
+            if self._size >= self.segment_max_bytes:
+                self._roll()
+
+    def _fsync(self):
+        os.fsync(self._handle.fileno())
+        self._unsynced = False
+        self._last_fsync = time.monotonic()
+        metrics.increment("sem_journal_fsyncs_total")
+
+    def _roll(self):
+        seq = self._active
+        self._close_handle(sync=True)
+        os.replace(self.path, f"{self._base}.{seq:06d}{self._ext}")
+        metrics.increment("sem_journal_segments_rolled_total")
+        if self._index is not None:
+            self._write_sidecar(self.sealed_seqs())
+            self._index_identity = None
+        else:
+            self._load_index()
+
+    def flush(self):
+        """fsync any appended but unsynced entries."""
+        with self._lock:
+            if self._handle is not None and self._unsynced:
+                self._fsync()
+
+    def _close_handle(self, sync):
+        if self._handle is None:
+            return
+        try:
+            if sync and self._unsynced:
+                self._fsync()
+        finally:
+            self._handle.close()
+            self._handle = None
+            self._identity = None
+            self._active = None
+
+    def close(self):
+        with self._lock:
+            self._close_handle(sync=True)
+
+    # ------------------------------------------------------------------
+    # Index
+    # ------------------------------------------------------------------
+
+    def _scan_into(self, index, seq, path, start=0):
+        for (pos_seq, offset), entry in self._read_segment(seq, path, start):
+            index[entry.get("canonical_key")] = (pos_seq, offset)
+
+    def _write_sidecar(self, sealed):
+        covered = set(sealed)
+        keys = {k: list(v) for k, v in self._index.items() if v[0] in covered}
+        tmp = f"{self.index_path}.tmp"
+        with open(tmp, "w") as f:
+            json.dump({"sealed": sealed, "keys": keys}, f)
+        os.replace(tmp, self.index_path)
+
+    def _load_index(self):
+        sealed = self.sealed_seqs()
+        index, covered = {}, []
+        try:
+            with open(self.index_path) as f:
+                data = json.load(f)
+            if data["sealed"] == sealed[:len(data["sealed"])]:
+                index = {k: tuple(v) for k, v in data["keys"].items()}
+                covered = data["sealed"]
+        except (OSError, ValueError, KeyError, TypeError):
+            pass
+        # Catch the sidecar up with segments sealed since it was written
+        # (all of them if it is missing or does not match the directory)
+        missing = sealed[len(covered):]
+        for seq in missing:
+            self._scan_into(index, seq, f"{self._base}.{seq:06d}{self._ext}")
+        metrics.increment("sem_journal_index_segments_scanned_total", len(missing))
+        self._index = index
+        if missing:
+            self._write_sidecar(sealed)
+        self._index_identity = file_identity(self.path)
+        if self._index_identity is not None:
+            self._scan_into(index, self.active_seq(), self.path)
+
+    def index(self):
+        """{canonical_key: (seq, offset)} of each key's latest journal entry."""
+        with self._lock:
+            # Reload if the active segment was created, removed or replaced
+            # by anything other than this writer since the index was built
+            if self._index is None or file_identity(self.path) != self._index_identity:
+                self._load_index()
+            return dict(self._index)
+
+    def latest(self, key):
+        """Latest journal entry for `key`, or None if it was never journaled."""
+        position = self.index().get(key)
+        if position is None:
+            return None
+        seq, offset = position
+        with open(self.segment_path(seq), "rb") as f:
+            f.seek(offset)
+            return json.loads(f.readline())
+
+    # ------------------------------------------------------------------
+    # Reader
+    # ------------------------------------------------------------------
+
+    def end_position(self):
+        """Position just past the last appended entry (a checkpoint for read())."""
+        with self._lock:
+            seq = self.active_seq()
+            try:
+                return (seq, os.path.getsize(self.path))
+            except OSError:
+                return (seq, 0)
+
+    def read(self, start=None):
+        """
+        Stream ((seq, offset), entry) for every entry at or after `start`,
+        oldest first. A trailing partial line (interrupted write) is skipped.
+        """
+        start_seq, start_offset = start if start is not None else (0, 0)
+        for seq, path in self.segments():
+            if seq < start_seq:
+                continue
+            yield from self._read_segment(seq, path, start_offset if seq == start_seq else 0)
+
+    def _read_segment(self, seq, path, start=0):
+        try:
+            f = open(path, "rb")
+        except OSError:
+            return
+        with f:
+            f.seek(start)
+            offset = start
+            for line in f:
+                if not line.endswith(b"\n"):
+                    break
+                if line.strip():
+                    yield (seq, offset), json.loads(line)
+                offset += len(line)
+
+
+_journals = {}
+_journals_lock = threading.Lock()
+
+
+def get_journal(path):
+    """Shared SEMJournal for `path` (one writer per path per process)."""
+    with _journals_lock:
+        journal = _journals.get(path)
+        if journal is None:
+            journal = SEMJournal(path)
+            _journals[path] = journal
+        return journal
+
+
+def close_all():
+    """fsync and close every open journal."""
+    with _journals_lock:
+        journals = list(_journals.values())
+        _journals.clear()
+    for journal in journals:
+        journal.close()
+
+
+atexit.register(close_all)
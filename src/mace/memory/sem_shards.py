@@ -0,0 +1,436 @@
+"""
+Module: sem_shards
+Stage: cross-stage
+Purpose: Hash-sharded SEM storage across several SQLite files.
+
+         A key's shard is chosen by a stable hash (SHA-256, never Python's
+         salted hash()) of its namespace, the key minus its last segment
+         (e.g. "user/profile/user_123"), so every fact about one entity lives
+         in one file and each shard has its own writer lock. Single-key
+         operations, namespace scans and history go to one shard; search_keys,
+         cross-namespace scans, counts and exports fan out and merge.
+
+         Layout, for a database at mace_memory.db split 4 ways:
+             mace_memory.shard-0-of-4.db ... mace_memory.shard-3-of-4.db
+             mace_memory.db.shards.json      {"shards": 4}
+         A single shard is the plain mace_memory.db (the unsharded layout).
+         The manifest is authoritative once written; `sem_shards` in
+         config/limits.yaml only chooses the layout of a new database.
+         Change the layout of an existing one with reshard() (see
+         tools/reshard_sem.py).
+
+         Each shard keeps its own sem_versions history, so a sharded
+         backend's version is a tuple with one version per shard. Journal
+         entries and deterministic IDs are produced above the storage layer
+         (semantic.put_sem) and do not depend on the layout.
+
+Part of MACE (Meta Aware Cognitive Engine).
+"""
+import hashlib
+import heapq
+import itertools
+import json
+import os
+import sqlite3
+import time
+
+from mace.config import config_loader
+from mace.core.connection_pool import file_identity
+from mace.memory import sem_snapshot_file
+from mace.memory.sem_bloom import namespace_of
+from mace.memory.storage_backend import StorageBackend
+from mace.ops import metrics
+
+
+def namespace_shard(namespace, shards):
+    """Shard index of a namespace (stable across processes and platforms)."""
+    digest = hashlib.sha256(namespace.encode("utf-8")).digest()
+    return int.from_bytes(digest[:8], "big") % shards
+
+
+def shard_index(key, shards):
+    """Shard index of a canonical key."""
+    return namespace_shard(namespace_of(key), shards)
+
+
+def shard_paths(db_path, shards):
+    """Database file of every shard of `db_path` split `shards` ways."""
+    if shards == 1:
+        return [db_path]
+    base, ext = os.path.splitext(db_path)
+    return [f"{base}.shard-{i}-of-{shards}{ext}" for i in range(shards)]
+
+
+def manifest_path(db_path):
+    return f"{db_path}.shards.json"
+
+
+def layout_identity(db_path):
+    """Identity of the shard manifest; changes when the database is resharded."""
+    return file_identity(manifest_path(db_path))
+
+
+def read_manifest(db_path):
+    """Shard count recorded for `db_path`, or None if there is no manifest."""
+    try:
+        with open(manifest_path(db_path)) as f:
+            return int(json.load(f)["shards"])
+    except (OSError, ValueError, KeyError, TypeError):
+        return None
+
+
+def write_manifest(db_path, shards):
+    path = manifest_path(db_path)
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    tmp = f"{path}.tmp"
+    with open(tmp, "w") as f:
+        json.dump({"shards": shards}, f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+
+def shard_count(db_path):
+    """Shard count of `db_path`: its manifest, else `sem_shards` from config."""
+    shards = read_manifest(db_path)
+    return shards if shards is not None else max(int(config_loader.get_sem_shards()), 1)
+
+
+def exists(db_path):
+    """True if any shard file of `db_path` exists."""
+    return any(os.path.exists(p) for p in shard_paths(db_path, shard_count(db_path)))
+
+
+def open_backend(db_path, shards=None, check_same_thread=True):
+    """
+    Open the SEM storage of `db_path`: a StorageBackend for one shard, a
+    ShardedStorageBackend for more.
+
+    Without an explicit `shards` the layout comes from shard_count(), and a
+    new sharded layout is recorded in the manifest so a later config change
+    cannot silently re-route existing keys.
+    """
+    if shards is None:
+        shards = shard_count(db_path)
+        if shards > 1 and read_manifest(db_path) is None:
+            write_manifest(db_path, shards)
+    if shards == 1:
+        return StorageBackend(db_path, check_same_thread=check_same_thread)
+    return ShardedStorageBackend(shard_paths(db_path, shards), check_same_thread=check_same_thread)
+
+
+def backend_shards(backend):
+    """The StorageBackend of every shard of `backend` (itself if unsharded)."""
+    return backend.shards if isinstance(backend, ShardedStorageBackend) else [backend]
+
+
+class ShardedStorageBackend:
+    """
+    StorageBackend interface over several shard files.
+
+    Versions are tuples with one sem_versions version per shard.
+    put_many commits each shard's rows in its own transaction, after every
+    shard has written its part; a crash between those commits can leave a
+    batch applied to some shards only (the write journal still has it).
+    BM25 scores are computed per shard, so the order of search results
+    from different shards is approximate.
+    """
+
+    def __init__(self, paths, check_same_thread=True):
+        self.paths = list(paths)
+        self.shards = [StorageBackend(p, check_same_thread=check_same_thread) for p in self.paths]
+        self.identity = tuple(s.identity for s in self.shards)
+
+    # ------------------------------------------------------------------
+    # Routing
+    # ------------------------------------------------------------------
+
+    def _shard(self, key):
+        return self.shards[shard_index(key, len(self.shards))]
+
+    def _group(self, keys_or_rows, key_of):
+        """{shard index: items} preserving the order of items within a shard."""
+        groups = {}
+        for item in keys_or_rows:
+            groups.setdefault(shard_index(key_of(item), len(self.shards)), []).append(item)
+        return groups
+
+    def _prefix_shards(self, prefix):
+        """(index, shard) pairs that can hold keys starting with `prefix`."""
+        segments = prefix.split("/")
+        if len(segments) > 3:
+            # The prefix fixes the namespace, so one shard holds every match
+            i = namespace_shard("/".join(segments[:3]), len(self.shards))
+            return [(i, self.shards[i])]
+        return list(enumerate(self.shards))
+
+    def _versions(self, version):
+        if not isinstance(version, (tuple, list)) or len(version) != len(self.shards):
+            raise ValueError(f"Expected a version per shard ({len(self.shards)}), got {version!r}")
+        return tuple(version)
+
+    # ------------------------------------------------------------------
+    # Lifecycle
+    # ------------------------------------------------------------------
+
+    @property
+    def fts_enabled(self):
+        for shard in self.shards:
+            shard._ensure_schema()
+        return all(shard.fts_enabled for shard in self.shards)
+
+    def is_stale(self):
+        return any(shard.is_stale() for shard in self.shards)
+
+    def close(self):
+        for shard in self.shards:
+            shard.close()
+
+    def rebuild_search_index(self):
+        return sum(shard.rebuild_search_index() for shard in self.shards)
+
+    # ------------------------------------------------------------------
+    # Writes
+    # ------------------------------------------------------------------
+
+    def put(self, key, value, timestamp, write_counter=None):
+        return self._shard(key).put(key, value, timestamp, write_counter)
+
+    def put_many(self, rows):
+        groups = self._group(rows, lambda row: row[0])
+        if len(groups) == 1:
+            (i, group), = groups.items()
+            return self.shards[i].put_many(group)
+        touched = []
+        try:
+            for i, group in groups.items():
+                shard = self.shards[i]
+                shard._ensure_schema()
+                touched.append(shard)
+                shard._write_rows(group)
+            for shard in touched:
+                shard.conn.commit()
+            metrics.increment("sem_shard_fanout_writes_total")
+            return True
+        except sqlite3.Error:
+            for shard in touched:
+                shard.conn.rollback()
+            return False
+
+    def clear(self):
+        for shard in self.shards:
+            shard.clear()
+
+    # ------------------------------------------------------------------
+    # Single-key reads
+    # ------------------------------------------------------------------
+
+    def get(self, key):
+        return self._shard(key).get(key)
+
+    def get_many(self, keys):
+        found = {}
+        for i, group in self._group(dict.fromkeys(keys), lambda key: key).items():
+            found.update(self.shards[i].get_many(group))
+        return found
+
+    def history(self, key):
+        return self._shard(key).history(key)
+
+    def get_as_of(self, key, version):
+        i = shard_index(key, len(self.shards))
+        return self.shards[i].get_as_of(key, self._versions(version)[i])
+
+    # ------------------------------------------------------------------
+    # Fan-out reads
+    # ------------------------------------------------------------------
+
+    def scan(self, prefix, limit=100, after=None):
+        targets = self._prefix_shards(prefix)
+        if len(targets) == 1:
+            return targets[0][1].scan(prefix, limit, after)
+        metrics.increment("sem_shard_fanout_reads_total")
+        # Every shard returns its first `limit` keys in order; the merged
+        # first `limit` are among them
+        merged = heapq.merge(*(shard.scan(prefix, limit, after) for _, shard in targets))
+        return list(itertools.islice(merged, limit))
+
+    def scan_as_of(self, prefix, version, limit=100, after=None):
+        version = self._versions(version)
+        targets = self._prefix_shards(prefix)
+        merged = heapq.merge(*(shard.scan_as_of(prefix, version[i], limit, after) for i, shard in targets))
+        return list(itertools.islice(merged, limit))
+
+    def count(self, prefix):
+        return sum(shard.count(prefix) for _, shard in self._prefix_shards(prefix))
+
+    def search_keys(self, query, limit=50, prefix=True, ranked=True):
+        metrics.increment("sem_shard_fanout_reads_total")
+        rows = []
+        for shard in self.shards:
+            rows.extend(shard._search(query, limit, prefix, ranked))
+        # Same order as one shard: score, then newest first
+        rows.sort(key=lambda row: row[2], reverse=True)
+        rows.sort(key=lambda row: row[3])
+        return [row[:3] for row in rows[:limit]]
+
+    def all_keys(self):
+        return list(heapq.merge(*(shard.all_keys() for shard in self.shards)))
+
+    def namespace_keys(self, namespace):
+        return self.shards[namespace_shard(namespace, len(self.shards))].namespace_keys(namespace)
+
+    # ------------------------------------------------------------------
+    # Versions
+    # ------------------------------------------------------------------
+
+    def current_version(self):
+        return tuple(shard.current_version() for shard in self.shards)
+
+    def data_version(self):
+        return tuple(shard.data_version() for shard in self.shards)
+
+    def database_id(self):
+        return tuple(shard.database_id() for shard in self.shards)
+
+    def keys_since(self, version):
+        keys, newest = [], []
+        for shard, v in zip(self.shards, self._versions(version)):
+            shard_keys, shard_newest = shard.keys_since(v)
+            keys.extend(shard_keys)
+            newest.append(shard_newest)
+        return keys, tuple(newest)
+
+    def compact_versions(self, horizon, keep_per_key=1):
+        return sum(shard.compact_versions(v, keep_per_key)
+                   for shard, v in zip(self.shards, self._versions(horizon)))
+
+    def export_snapshot(self, path, version=None):
+        """
+        Merge every shard into one snapshot file. The file's sem_version is
+        0: a version vector does not fit the single-version header.
+        """
+        versions = self._versions(version) if version is not None else (None,) * len(self.shards)
+        begun, cursors, count = [], [], 0
+        try:
+            for shard, v in zip(self.shards, versions):
+                _, n, rows = shard._begin_export(v)
+                begun.append(shard)
+                cursors.append(rows)
+                count += n
+            return sem_snapshot_file.write_snapshot(path, heapq.merge(*cursors), count, 0)
+        finally:
+            for shard in begun:
+                shard.conn.rollback()
+
+
+def _remove_db_files(path):
+    for suffix in ("", "-wal", "-shm", "-journal"):
+        if os.path.exists(path + suffix):
+            os.remove(path + suffix)
+
+
+def _versions_since(backend, key, version):
+    """How many versions of `key` `backend` holds after `version` (one of its versions)."""
+    shards = backend_shards(backend)
+    i = shard_index(key, len(shards))
+    since = version[i] if isinstance(version, tuple) else version
+    return sum(1 for row in shards[i].history(key) if row[0] > since)
+
+
+def reshard(db_path, shards, batch_size=1000, grace_s=2.0, keep_source=False, force=False, log=None):
+    """
+    Move `db_path` to a layout of `shards` shards while it stays in use.
+
+    1. Copy every source shard's version history, in version order, into
+       the new shard files (each key's history stays in order, so the new
+       sem_kv head matches the old one).
+    2. Repeat with the versions written meanwhile until a pass is small.
+    3. Write the manifest: LiveSEMStores reopen on the new layout at their
+       next operation.
+    4. After `grace_s` seconds, copy whatever reached the old layout before
+       every writer switched, then clear the old layout (unless keep_source).
+       A straggler is skipped if its key was written in the new layout
+       since the switch: that write is the newer one.
+
+    Versions are renumbered in the new layout, so SEMSnapshots and
+    version numbers taken before the switch do not carry over.
+
+    Returns:
+        {"from": old shard count, "to": shards, "versions_copied": n, "keys": n}
+
+    Raises:
+        ValueError: If the new layout already holds SEM data (force=True
+                    clears it first) or shards < 1.
+        RuntimeError: If a batch cannot be written to the new layout.
+    """
+    log = log or (lambda msg: None)
+    if shards < 1:
+        raise ValueError(f"Shard count must be at least 1, got {shards}")
+    current = shard_count(db_path)
+    if current == shards:
+        return {"from": current, "to": shards, "versions_copied": 0, "keys": None}
+
+    source = open_backend(db_path, current)
+    target = open_backend(db_path, shards)
+    try:
+        if target.count(""):
+            if not force:
+                raise ValueError(f"{db_path} already has SEM data in the {shards}-shard layout "
+                                 "(rerun with force to replace it)")
+            target.clear()
+
+        watermarks = [0] * current
+
+        def copy_pass(switched=None):
+            copied = 0
+            for i, shard in enumerate(backend_shards(source)):
+                while True:
+                    rows = shard.versions_since(watermarks[i], batch_size)
+                    if not rows:
+                        break
+                    watermarks[i] = rows[-1][0]
+                    if switched is not None:
+                        rows = [row for row in rows if not newer_in_target(row[1], switched)]
+                    if rows and not target.put_many([(key, value, ts, wc) for _, key, value, wc, ts in rows]):
+                        raise RuntimeError(f"Failed to write {len(rows)} versions to the new layout")
+                    copied += len(rows)
+            return copied
+
+        copied_since_switch = {}  # key -> versions this call wrote to the target after the switch
+
+        def newer_in_target(key, switched):
+            # Any version of `key` in the target since the switch that is not
+            # one of ours came from a writer already on the new layout
+            if _versions_since(target, key, switched) > copied_since_switch.get(key, 0):
+                return True
+            copied_since_switch[key] = copied_since_switch.get(key, 0) + 1
+            return False
+
+        total = copy_pass()
+        log(f"Copied {total} versions from {current} to {shards} shard(s)")
+        while True:
+            copied = copy_pass()
+            total += copied
+            if copied <= batch_size:
+                break
+        switched = target.current_version()
+        write_manifest(db_path, shards)
+        log(f"Switched {db_path} to {shards} shard(s); waiting {grace_s}s for writers")
+        time.sleep(grace_s)
+        total += copy_pass(switched)
+        keys = target.count("")
+        metrics.increment("sem_reshards_total")
+
+        if not keep_source:
+            if current == 1:
+                # Other tables share the unsharded file; only drop SEM data
+                source.clear()
+            else:
+                source.close()
+                for path in shard_paths(db_path, current):
+                    _remove_db_files(path)
+        return {"from": current, "to": shards, "versions_copied": total, "keys": keys}
+    finally:
+        source.close()
+        target.close()
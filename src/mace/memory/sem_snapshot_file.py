@@ -0,0 +1,197 @@
+"""
+Module: sem_snapshot_file
+Stage: cross-stage
+Purpose: Compact, read-only, memory-mapped SEM snapshot files.
+
+         Layout (little-endian):
+             header   magic "MACESNP1" | format u32 | flags u32 | count u64 | sem_version u64
+             table    count x (key_offset u64, key_len u32, value_offset u64, value_len u32)
+             data     UTF-8 keys and their JSON-serialized values
+
+         Table entries are sorted by key bytes (the same order as sem_kv's
+         primary key), so lookups are a binary search over the mmap and
+         values are returned as zero-copy memoryview slices. Values are
+         stored exactly as sem_kv holds them, so replay never re-serializes.
+
+         Files are written once (StorageBackend.export_snapshot) and then only
+         mapped read-only, so any number of replay worker processes can share
+         one snapshot through the OS page cache.
+
+Part of MACE (Meta Aware Cognitive Engine).
+"""
+import json
+import mmap
+import os
+import struct
+from collections.abc import Mapping
+
+MAGIC = b"MACESNP1"
+FORMAT_VERSION = 1
+
+_HEADER = struct.Struct("<8sIIQQ")
+_ENTRY = struct.Struct("<QIQI")
+
+
+def write_snapshot(path, rows, count, sem_version=0):
+    """
+    Write a snapshot file atomically.
+
+    Args:
+        path: Destination file
+        rows: Iterable of (canonical_key, value_json) sorted by key
+        count: Number of rows `rows` yields
+        sem_version: SEM history version the rows were read at
+
+    Returns:
+        Number of entries written
+
+    Raises:
+        ValueError: If rows are not strictly sorted or do not match `count`.
+    """
+    tmp = f"{path}.tmp"
+    table = bytearray()
+    data_start = _HEADER.size + count * _ENTRY.size
+    written = 0
+    previous = None
+    with open(tmp, "wb") as f:
+        f.seek(data_start)
+        offset = data_start
+        for key, value in rows:
+            key_bytes = key.encode("utf-8")
+            value_bytes = value.encode("utf-8")
+            if previous is not None and key_bytes <= previous:
+                raise ValueError(f"Snapshot rows must be sorted by key: {key!r}")
+            previous = key_bytes
+            table += _ENTRY.pack(offset, len(key_bytes), offset + len(key_bytes), len(value_bytes))
+            f.write(key_bytes)
+            f.write(value_bytes)
+            offset += len(key_bytes) + len(value_bytes)
+            written += 1
+        if written != count:
+            raise ValueError(f"Expected {count} snapshot rows, got {written}")
+        f.seek(_HEADER.size)
+        f.write(table)
+        f.seek(0)
+        f.write(_HEADER.pack(MAGIC, FORMAT_VERSION, 0, count, sem_version))
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+    return written
+
+
+def _upper_bound(prefix):
+    """Smallest byte string greater than every one starting with `prefix` (None: no bound)."""
+    prefix = prefix.rstrip(b"\xff")
+    if not prefix:
+        return None
+    return prefix[:-1] + bytes([prefix[-1] + 1])
+
+
+class SEMSnapshotFile(Mapping):
+    """
+    Read-only Mapping {canonical_key: value} over a memory-mapped snapshot.
+
+    Lookups and prefix ranges are O(log n) binary searches; serialized()
+    returns the stored JSON text and raw() a zero-copy memoryview of it.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, "rb") as f:
+            size = os.fstat(f.fileno()).st_size
+            if size < _HEADER.size:
+                raise ValueError(f"Not a SEM snapshot file: {path}")
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, fmt, _flags, self._count, self.sem_version = _HEADER.unpack_from(self._mm, 0)
+        if magic != MAGIC or fmt != FORMAT_VERSION:
+            self._mm.close()
+            raise ValueError(f"Not a SEM snapshot file (or unsupported format): {path}")
+        self._view = memoryview(self._mm)
+
+    def _entry(self, i):
+        return _ENTRY.unpack_from(self._mm, _HEADER.size + i * _ENTRY.size)
+
+    def _key_bytes(self, i):
+        key_off, key_len, _, _ = self._entry(i)
+        return self._mm[key_off:key_off + key_len]
+
+    def _bisect(self, target, right=False):
+        """Index of the first entry whose key bytes are >= `target` (> with right)."""
+        lo, hi = 0, self._count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            key = self._key_bytes(mid)
+            if key < target or (right and key == target):
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    def _find(self, key):
+        target = key.encode("utf-8")
+        lo = self._bisect(target)
+        if lo < self._count and self._key_bytes(lo) == target:
+            return lo
+        return None
+
+    def _prefix_range(self, prefix, after=None):
+        """(first, end) entry indexes of the keys starting with `prefix` (and after `after`)."""
+        target = prefix.encode("utf-8")
+        first = self._bisect(target)
+        if after is not None:
+            first = max(first, self._bisect(after.encode("utf-8"), right=True))
+        upper = _upper_bound(target)
+        return first, (self._bisect(upper) if upper is not None else self._count)
+
+    def keys_with_prefix(self, prefix, after=None):
+        """Keys starting with `prefix`, in order (only those after `after`), read lazily."""
+        first, end = self._prefix_range(prefix, after)
+        for i in range(first, end):
+            yield self._key_bytes(i).decode("utf-8")
+
+    def count_prefix(self, prefix):
+        """Number of keys starting with `prefix` (two binary searches)."""
+        first, end = self._prefix_range(prefix)
+        return end - first
+
+    def raw(self, key):
+        """
+        Zero-copy memoryview of the stored JSON value, or None.
+        Release the view before close() (mmap cannot close while exported).
+        """
+        i = self._find(key) if isinstance(key, str) else None
+        if i is None:
+            return None
+        _, _, value_off, value_len = self._entry(i)
+        return self._view[value_off:value_off + value_len]
+
+    def serialized(self, key):
+        """Stored JSON text of `key` (as sem_kv holds it), or None."""
+        value = self.raw(key)
+        return None if value is None else str(value, "utf-8")
+
+    def __getitem__(self, key):
+        value = self.raw(key)
+        if value is None:
+            raise KeyError(key)
+        return json.loads(str(value, "utf-8"))
+
+    def __contains__(self, key):
+        return isinstance(key, str) and self._find(key) is not None
+
+    def __iter__(self):
+        for i in range(self._count):
+            yield self._key_bytes(i).decode("utf-8")
+
+    def __len__(self):
+        return self._count
+
+    def close(self):
+        self._view.release()
+        self._mm.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
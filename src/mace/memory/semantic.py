@@ -2,15 +2,29 @@
 import re
 import json
 import os
+import bisect
 import hashlib
+import heapq
+import itertools
+import atexit
+import logging
+import threading
+import weakref
+from collections import Counter
+from collections.abc import Mapping
 from mace.core import deterministic
-from mace.memory import storage_backend
+from mace.memory import storage_backend, sem_cache, sem_journal, sem_snapshot_file, sem_bloom, sem_shards
+from mace.config import config_loader
 from mace.governance import amendment
 from mace.ops import metrics
 
 # Regex for canonical key validation (Strict 4-segment)
 CANONICAL_KEY_REGEX = re.compile(r"^([a-z0-9_]+)\/([a-z0-9_]+)\/([a-z0-9_\-]+)\/([a-z0-9_]+)$")
 
+# PII patterns (credit card, SSN), compiled once for _check_pii
+_PII_CARD_REGEX = re.compile(r"\b\d{4}[- ]?\d{4}[- ]?\d{4}[- ]?\d{4}\b")
+_PII_SSN_REGEX = re.compile(r"\b\d{3}-\d{2}-\d{4}\b")
+
 # Global journal file
 JOURNAL_FILE = "logs/sem_write_journal.jsonl"
 SYNONYMS_FILE = "sem_synonyms.json"
@@ -20,38 +34,211 @@ _capture_context = None
 
 # Storage Abstraction
 class LiveSEMStore:
+    """
+    SEM store backed by one long-lived StorageBackend per process and DB path.
+
+    All LiveSEMStore instances share the backend; it is opened on first use,
+    reopened if the database file is removed or replaced, and closed by
+    close_live_stores() (registered with atexit).
+
+    With sem_bloom_enabled, each backend also gets per-namespace Bloom
+    filters (see sem_bloom) so definite misses never reach SQLite.
+
+    The backend is sharded if the database's layout says so (see
+    sem_shards); it is also reopened when the database is resharded.
+    """
+    _backends = {}
+    _blooms = {}
+    _layouts = {}  # db_path -> shard manifest identity the backend was opened with
+    _lock = threading.RLock()
+
+    def __init__(self, db_path="mace_memory.db"):
+        self.db_path = db_path
+
+    def _backend(self):
+        backend = LiveSEMStore._backends.get(self.db_path)
+        if backend is not None and (
+            backend.is_stale()
+            or sem_shards.layout_identity(self.db_path) != LiveSEMStore._layouts.get(self.db_path)
+        ):
+            backend.close()
+            backend = None
+        if backend is None:
+            # Agents run on executor worker threads; access is serialized by _lock
+            backend = sem_shards.open_backend(self.db_path, check_same_thread=False)
+            LiveSEMStore._backends[self.db_path] = backend
+            LiveSEMStore._layouts[self.db_path] = sem_shards.layout_identity(self.db_path)
+            LiveSEMStore._blooms.pop(self.db_path, None)
+            if config_loader.get_sem_bloom_enabled():
+                bloom = sem_bloom.NamespaceBloom(
+                    config_loader.get_sem_bloom_error_rate(),
+                    config_loader.get_sem_bloom_min_capacity(),
+                )
+                bloom.open(backend, self.bloom_path())
+                LiveSEMStore._blooms[self.db_path] = bloom
+        return backend
+
+    def bloom_path(self):
+        return f"{self.db_path}.bloom"
+
+    def _definitely_missing(self, backend, key):
+        bloom = LiveSEMStore._blooms.get(self.db_path)
+        if bloom is None or bloom.might_contain(key, backend):
+            return False
+        metrics.increment("sem_bloom_skipped_reads_total")
+        return True
+
+    def _bloom_add(self, backend, keys):
+        bloom = LiveSEMStore._blooms.get(self.db_path)
+        if bloom is not None:
+            for key in keys:
+                bloom.add(key, backend)
+
     def get(self, key):
-        backend = storage_backend.StorageBackend()
-        val_str, ts = backend.get(key)
-        backend.close()
-        return val_str, ts
-
-    def put(self, key, value_str, timestamp):
-        backend = storage_backend.StorageBackend()
-        success = backend.put(key, value_str, timestamp)
-        backend.close()
-        return success
-
-    def search_keys(self, query, limit=50):
-        backend = storage_backend.StorageBackend()
-        results = backend.search_keys(query, limit)
-        backend.close()
-        return results
+        with LiveSEMStore._lock:
+            backend = self._backend()
+            if self._definitely_missing(backend, key):
+                return None, None
+            return backend.get(key)
+
+    def put(self, key, value_str, timestamp, write_counter=None):
+        with LiveSEMStore._lock:
+            backend = self._backend()
+            success = backend.put(key, value_str, timestamp, write_counter)
+            if success:
+                self._bloom_add(backend, [key])
+            return success
+
+    def get_many(self, keys):
+        with LiveSEMStore._lock:
+            backend = self._backend()
+            return backend.get_many([k for k in keys if not self._definitely_missing(backend, k)])
+
+    def put_many(self, rows):
+        with LiveSEMStore._lock:
+            backend = self._backend()
+            success = backend.put_many(rows)
+            if success:
+                self._bloom_add(backend, [row[0] for row in rows])
+            return success
+
+    def save_bloom(self):
+        """Persist this database's Bloom filters for the next warm start."""
+        with LiveSEMStore._lock:
+            bloom = LiveSEMStore._blooms.get(self.db_path)
+            backend = LiveSEMStore._backends.get(self.db_path)
+            if bloom is not None and backend is not None and not backend.is_stale():
+                bloom.catch_up(backend)  # Advance the watermark past our own writes
+                bloom.save(self.bloom_path(), backend.database_id())
+
+    def search_keys(self, query, limit=50, prefix=True):
+        with LiveSEMStore._lock:
+            return self._backend().search_keys(query, limit, prefix=prefix)
+
+    def scan(self, prefix, limit=100, after=None):
+        with LiveSEMStore._lock:
+            return self._backend().scan(prefix, limit, after)
+
+    def count(self, prefix):
+        with LiveSEMStore._lock:
+            return self._backend().count(prefix)
+
+    def rebuild_search_index(self):
+        with LiveSEMStore._lock:
+            return self._backend().rebuild_search_index()
+
+    def current_version(self):
+        with LiveSEMStore._lock:
+            return self._backend().current_version()
+
+    def get_as_of(self, key, version):
+        with LiveSEMStore._lock:
+            return self._backend().get_as_of(key, version)
+
+    def scan_as_of(self, prefix, version, limit=100, after=None):
+        with LiveSEMStore._lock:
+            return self._backend().scan_as_of(prefix, version, limit, after)
+
+    def history(self, key):
+        with LiveSEMStore._lock:
+            return self._backend().history(key)
+
+    def compact_versions(self, horizon, keep_per_key=1):
+        with LiveSEMStore._lock:
+            return self._backend().compact_versions(horizon, keep_per_key)
+
+    def export_snapshot(self, path, version=None):
+        with LiveSEMStore._lock:
+            return self._backend().export_snapshot(path, version)
+
+    def cache_token(self):
+        """
+        Identity and data_version of the open DB file; cached reads are only
+        valid under the same token, so commits from other connections or
+        processes drop the cache.
+        """
+        with LiveSEMStore._lock:
+            backend = self._backend()
+            return (self.db_path, backend.identity, backend.data_version())
 
     def is_sandbox(self):
         return False
 
+def close_live_stores():
+    """
+    Close the shared LiveSEMStore backends and write journals
+    (shutdown, or before deleting the DB / journal).
+    """
+    with LiveSEMStore._lock:
+        for db_path in list(LiveSEMStore._blooms):
+            try:
+                LiveSEMStore(db_path).save_bloom()
+            except OSError as e:
+                logging.getLogger(__name__).warning("Failed to save SEM Bloom filters for %s: %s", db_path, e)
+        LiveSEMStore._blooms.clear()
+        backends = list(LiveSEMStore._backends.values())
+        LiveSEMStore._backends.clear()
+        LiveSEMStore._layouts.clear()
+        for backend in backends:
+            backend.close()
+    sem_journal.close_all()
+    _read_cache.clear()
+
+atexit.register(close_live_stores)
+
+def _sorted_range(keys, prefix, after=None):
+    """The keys of `keys` starting with `prefix` (and after `after`), sorted."""
+    keys = sorted(keys)
+    lo = bisect.bisect_left(keys, prefix)
+    if after is not None:
+        lo = max(lo, bisect.bisect_right(keys, after))
+    hi = bisect.bisect_left(keys, storage_backend.prefix_upper_bound(prefix))
+    return keys[lo:hi]
+
 class ReplaySEMStore:
     def __init__(self, snapshot=None):
-        self.snapshot = snapshot if snapshot else {}
+        # snapshot: {key: value} dict, SEMSnapshot, or a memory-mapped SEMSnapshotFile
+        self.snapshot = snapshot if snapshot is not None else {}
         self.writes = {} # Ephemeral writes {key: val_str}
 
+    @classmethod
+    def from_snapshot_file(cls, path):
+        """Replay store over a snapshot file written by StorageBackend.export_snapshot."""
+        return cls(sem_snapshot_file.SEMSnapshotFile(path))
+
     def get(self, key):
         # 1. Check writes (read-your-writes)
         if key in self.writes:
             return self.writes[key], deterministic.deterministic_timestamp()
         
         # 2. Check snapshot
+        if isinstance(self.snapshot, sem_snapshot_file.SEMSnapshotFile):
+            # Values are stored pre-serialized; no decode/encode round trip
+            val_str = self.snapshot.serialized(key)
+            if val_str is None:
+                return None, None
+            return val_str, "REPLAY_SNAPSHOT"
+
         if key in self.snapshot:
             # Snapshot values are already objects, need to serialize to match LiveStore interface
             # or handle object return. LiveStore returns string.
@@ -61,19 +248,137 @@ class ReplaySEMStore:
             
         return None, None
 
-    def put(self, key, value_str, timestamp):
+    def put(self, key, value_str, timestamp, write_counter=None):
         self.writes[key] = value_str
         return True
 
+    def get_many(self, keys):
+        found = {}
+        for key in keys:
+            val_str, last_updated = self.get(key)
+            if val_str is not None:
+                found[key] = (val_str, last_updated)
+        return found
+
+    def put_many(self, rows):
+        for key, value_str, *_ in rows:
+            self.writes[key] = value_str
+        return True
+
+    def _snapshot_keys(self, prefix, after=None):
+        """Snapshot keys starting with `prefix` (after `after`), in order."""
+        if isinstance(self.snapshot, (sem_snapshot_file.SEMSnapshotFile, SEMSnapshot)):
+            # Binary search in the file / a range scan of the version history
+            return self.snapshot.keys_with_prefix(prefix, after)
+        return _sorted_range(self.snapshot, prefix, after)
+
+    def scan(self, prefix, limit=100, after=None):
+        # Only the sandbox writes are merged in; the snapshot is read in order
+        merged = heapq.merge(self._snapshot_keys(prefix, after), _sorted_range(self.writes, prefix, after))
+        rows = []
+        for key, _ in itertools.groupby(merged):
+            if len(rows) == limit:
+                break
+            val_str, last_updated = self.get(key)
+            rows.append((key, val_str, last_updated))
+        return rows
+
+    def count(self, prefix):
+        if isinstance(self.snapshot, sem_snapshot_file.SEMSnapshotFile):
+            count = self.snapshot.count_prefix(prefix)
+        else:
+            count = sum(1 for _ in self._snapshot_keys(prefix))
+        return count + sum(1 for key in _sorted_range(self.writes, prefix) if key not in self.snapshot)
+
     def is_sandbox(self):
         return True
 
+# Versions pinned by open SEMSnapshots {version: open handles}; compaction
+# never removes a version an open snapshot can still see.
+_pinned_versions = Counter()
+_pinned_lock = threading.Lock()
+
+def _older_version(a, b):
+    """
+    The older of two versions. Sharded versions (tuples) are compared per
+    shard; a version from another layout (e.g. before resharding) is ignored.
+    """
+    if isinstance(a, tuple) or isinstance(b, tuple):
+        if isinstance(a, tuple) and isinstance(b, tuple) and len(a) == len(b):
+            return tuple(map(min, a, b))
+        return a
+    return min(a, b)
+
+def _unpin(version):
+    with _pinned_lock:
+        _pinned_versions[version] -= 1
+        if _pinned_versions[version] <= 0:
+            del _pinned_versions[version]
+
+class SEMSnapshot(Mapping):
+    """
+    Read-only view of Semantic Memory as of one version.
+
+    Taking a snapshot only records a version number; reads go to the
+    store's version history, so nothing is copied. Values are the parsed
+    JSON values. Being a Mapping, a snapshot can be passed wherever a
+    sem_state dict is expected, including ReplaySEMStore(snapshot).
+
+    Open snapshots pin their version against compact_sem(); call release()
+    (or use the snapshot as a context manager) when done.
+    """
+
+    def __init__(self, store, version):
+        self.store = store
+        self.version = version
+        with _pinned_lock:
+            _pinned_versions[version] += 1
+        self._finalizer = weakref.finalize(self, _unpin, version)
+
+    def __getitem__(self, key):
+        val_str, _ = self.store.get_as_of(key, self.version)
+        if val_str is None:
+            raise KeyError(key)
+        return json.loads(val_str)
+
+    def __iter__(self):
+        return self.keys_with_prefix("")
+
+    def keys_with_prefix(self, prefix, after=None):
+        """Keys starting with `prefix`, in order (only those after `after`), read in pages."""
+        while True:
+            rows = self.store.scan_as_of(prefix, self.version, 500, after)
+            for key, _, _ in rows:
+                yield key
+            if len(rows) < 500:
+                return
+            after = rows[-1][0]
+
+    def __len__(self):
+        return sum(1 for _ in self)
+
+    def release(self):
+        self._finalizer()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.release()
+
+    def __repr__(self):
+        return f"SEMSnapshot(version={self.version})"
+
 # Active Store
 _active_store = LiveSEMStore()
 
+# Read-through cache for get_sem on the live store (never used for sandboxes)
+_read_cache = sem_cache.SEMReadCache(config_loader.get_sem_cache_max_entries())
+
 def set_store(store):
     global _active_store
     _active_store = store
+    _read_cache.clear()
 
 def start_capture():
     global _capture_context
@@ -135,11 +440,25 @@ def _validate_key(key):
     return True
 
 def _append_to_journal(entry):
+    _append_many_to_journal([entry])
+
+def _append_many_to_journal(entries):
     if _active_store.is_sandbox():
         return # No journaling in sandbox
-    os.makedirs(os.path.dirname(JOURNAL_FILE), exist_ok=True)
-    with open(JOURNAL_FILE, "a") as f:
-        f.write(json.dumps(entry) + "\n")
+    sem_journal.get_journal(JOURNAL_FILE).append(entries)
+
+def _journal_entry(key, value, value_hash, source, ts, write_counter):
+    return {
+        "write_id": deterministic.deterministic_id("sem_write", key, write_counter),
+        "canonical_key": key,
+        "value_hash": value_hash,
+        "source": source,
+        "last_updated": ts,
+        "seed": deterministic.get_seed(),
+        "write_counter": write_counter,
+        "op": "PUT",
+        "value_snapshot": value
+    }
 
 def _check_pii(value_str):
     # Simple regex for PII (e.g. CC, SSN)
@@ -147,10 +466,10 @@ def _check_pii(value_str):
     if "PII" in value_str:
         return True
     # Credit Card (simple)
-    if re.search(r"\b\d{4}[- ]?\d{4}[- ]?\d{4}[- ]?\d{4}\b", value_str):
+    if _PII_CARD_REGEX.search(value_str):
         return True
     # SSN
-    if re.search(r"\b\d{3}-\d{2}-\d{4}\b", value_str):
+    if _PII_SSN_REGEX.search(value_str):
         return True
     return False
 
@@ -274,24 +593,13 @@ def put_sem(key, value, source="unknown"):
         value_hash = hashlib.sha256(val_str.encode('utf-8')).hexdigest()
         
         # 5. Write to Active Store
-        success = _active_store.put(key, val_str, ts)
+        success = _active_store.put(key, val_str, ts, write_counter)
+        _read_cache.invalidate(key)
         
         if success:
             metrics.increment("sem_writes_total")
             
-            write_id = deterministic.deterministic_id("sem_write", key, write_counter)
-            
-            entry = {
-                "write_id": write_id,
-                "canonical_key": key,
-                "value_hash": value_hash,
-                "source": source,
-                "last_updated": ts,
-                "seed": deterministic.get_seed(),
-                "write_counter": write_counter,
-                "op": "PUT",
-                "value_snapshot": value
-            }
+            entry = _journal_entry(key, value, value_hash, source, ts, write_counter)
             _append_to_journal(entry)
             
             if _capture_context is not None:
@@ -304,49 +612,329 @@ def put_sem(key, value, source="unknown"):
     except Exception as e:
         return {"success": False, "error": str(e)}
 
-def get_sem(key):
+def put_sem_many(items, source="unknown"):
+    """
+    Write many values to Semantic Memory as one batch.
+
+    Equivalent to calling put_sem(key, value, source) for each item in order
+    (same per-item results, write counters, timestamps and journal entries),
+    but amendments are loaded once, all rows are written in one transaction
+    and the journal entries are appended in one write. The DB write is
+    all-or-nothing: if it fails, every item that passed validation reports
+    DB_WRITE_FAILED.
+
+    Args:
+        items: Iterable of (key, value) pairs, or a dict
+        source: Source recorded in each journal entry
+
+    Returns:
+        List of put_sem-style result dicts, one per item, in order
+    """
+    if isinstance(items, dict):
+        items = items.items()
+    items = list(items)
+    results = [None] * len(items)
+    try:
+        blocked = amendment.blocked_targets("block_key")
+    except Exception as e:
+        return [{"success": False, "error": str(e)} for _ in items]
+
+    pending = []  # (index, key, value, val_str, value_hash, ts, write_counter)
+    for i, (key, value) in enumerate(items):
+        try:
+            try:
+                _validate_key(key)
+            except ValueError:
+                results[i] = {"success": False, "error": "INVALID_KEY_FORMAT"}
+                continue
+            if key in blocked:
+                results[i] = {"success": False, "error": "POLICY_BLOCKED"}
+                continue
+            val_str = json.dumps(value)
+            if _check_pii(val_str):
+                results[i] = {"success": False, "error": "PRIVACY_BLOCKED"}
+                continue
+            write_counter = deterministic.increment_counter("sem_write")
+            ts = deterministic.deterministic_timestamp(write_counter)
+            value_hash = hashlib.sha256(val_str.encode('utf-8')).hexdigest()
+            pending.append((i, key, value, val_str, value_hash, ts, write_counter))
+        except Exception as e:
+            results[i] = {"success": False, "error": str(e)}
+
+    if not pending:
+        return results
+
+    try:
+        success = _active_store.put_many(
+            [(key, val_str, ts, wc) for _, key, _, val_str, _, ts, wc in pending]
+        )
+    except Exception as e:
+        success = False
+    for _, key, *_ in pending:
+        _read_cache.invalidate(key)
+
+    if not success:
+        for i, *_ in pending:
+            results[i] = {"success": False, "error": "DB_WRITE_FAILED"}
+        return results
+
+    metrics.increment("sem_writes_total", len(pending))
+    entries = []
+    for i, key, value, _, value_hash, ts, write_counter in pending:
+        entries.append(_journal_entry(key, value, value_hash, source, ts, write_counter))
+        if _capture_context is not None:
+            _capture_context["writes"].append(key)
+        results[i] = {"success": True, "last_updated": ts}
+    _append_many_to_journal(entries)
+    return results
+
+def get_sem(key, as_of=None):
     """
     Read a value from Semantic Memory.
+
+    Live-store reads go through a bounded read-through cache (hits, misses
+    and negative entries alike); sandbox stores are always read directly.
+    Capture tracing is identical either way.
+
+    Args:
+        key: Canonical key
+        as_of: Optional SEMSnapshot or version number (a tuple of per-shard
+               versions for a sharded store); reads the value the key had
+               at that version instead of the current one
+    """
+    if as_of is not None:
+        return _get_sem_as_of(key, as_of)
+    try:
+        store = _active_store
+        use_cache = not store.is_sandbox() and hasattr(store, "cache_token")
+        cached = None
+        if use_cache:
+            _read_cache.validate(store.cache_token())
+            cached = _read_cache.lookup(key)
+
+        if cached is not None:
+            val, last_updated = cached
+            exists = val is not sem_cache.MISSING
+        else:
+            ticket = _read_cache.fill_ticket()
+            # Delegate to Active Store
+            val_str, last_updated = store.get(key)
+            exists = val_str is not None
+            val = json.loads(val_str) if exists else None
+            if use_cache:
+                _read_cache.store(key, val if exists else sem_cache.MISSING, last_updated, ticket)
+
+        return _read_result(key, val, last_updated, exists)
+            
+    except Exception as e:
+        return {"exists": False, "value": None, "last_updated": None}
+
+def _get_sem_as_of(key, as_of):
+    try:
+        if isinstance(as_of, SEMSnapshot):
+            store, version = as_of.store, as_of.version
+        else:
+            # A sharded store's versions are tuples (one version per shard)
+            store = _active_store
+            version = tuple(as_of) if isinstance(as_of, (tuple, list)) else int(as_of)
+        val_str, last_updated = store.get_as_of(key, version)
+        exists = val_str is not None
+        return _read_result(key, json.loads(val_str) if exists else None, last_updated, exists)
+    except Exception as e:
+        return {"exists": False, "value": None, "last_updated": None}
+
+def sem_snapshot():
+    """
+    Snapshot handle for the current state of the active (live) store.
+
+    Raises:
+        ValueError: If the active store keeps no version history (sandbox stores).
+    """
+    if not hasattr(_active_store, "current_version"):
+        raise ValueError("Active SEM store has no version history")
+    return SEMSnapshot(_active_store, _active_store.current_version())
+
+def sem_history(key):
+    """
+    Retained versions of a key, oldest first.
+
+    Returns:
+        List of {"version", "value", "write_counter", "last_updated"}
     """
     try:
-        # Delegate to Active Store
-        val_str, last_updated = _active_store.get(key)
+        return [
+            {
+                "version": version,
+                "value": json.loads(val_str),
+                "write_counter": write_counter,
+                "last_updated": last_updated
+            }
+            for version, val_str, write_counter, last_updated in _active_store.history(key)
+        ]
+    except Exception as e:
+        return []
+
+def compact_sem(before_version=None, keep_per_key=None):
+    """
+    Remove old SEM versions under the retention policy.
+
+    A version is removed only if a newer version of its key is already
+    visible at the horizon, so every snapshot at or after the horizon reads
+    exactly what it did before. The horizon is `before_version` (default:
+    the current version), lowered to the oldest open SEMSnapshot. The newest
+    keep_per_key versions of every key (default: sem_version_keep_per_key in
+    config/limits.yaml) are always kept.
+
+    Returns:
+        Number of versions removed
+    """
+    horizon = before_version if before_version is not None else _active_store.current_version()
+    with _pinned_lock:
+        for pinned in _pinned_versions:
+            horizon = _older_version(horizon, pinned)
+    if keep_per_key is None:
+        keep_per_key = config_loader.get_sem_version_keep_per_key()
+    removed = _active_store.compact_versions(horizon, keep_per_key)
+    metrics.increment("sem_versions_compacted_total", removed)
+    return removed
+
+def get_sem_many(keys):
+    """
+    Read many values from Semantic Memory.
+
+    Same per-key results, cache behaviour and capture tracing as calling
+    get_sem for each key, but cache misses are fetched from the store in
+    batched queries instead of one query per key.
+
+    Returns:
+        {key: get_sem-style result dict}
+    """
+    keys = list(dict.fromkeys(keys))
+    try:
+        store = _active_store
+        use_cache = not store.is_sandbox() and hasattr(store, "cache_token")
+        found = {}  # key -> (val, last_updated, exists)
+        misses = []
+        if use_cache:
+            _read_cache.validate(store.cache_token())
+        for key in keys:
+            cached = _read_cache.lookup(key) if use_cache else None
+            if cached is not None:
+                val, last_updated = cached
+                found[key] = (val, last_updated, val is not sem_cache.MISSING)
+            else:
+                misses.append(key)
+
+        if misses:
+            ticket = _read_cache.fill_ticket()
+            rows = store.get_many(misses)
+            for key in misses:
+                val_str, last_updated = rows.get(key, (None, None))
+                exists = val_str is not None
+                val = json.loads(val_str) if exists else None
+                found[key] = (val, last_updated, exists)
+                if use_cache:
+                    _read_cache.store(key, val if exists else sem_cache.MISSING, last_updated, ticket)
+
+        return {key: _read_result(key, *found[key]) for key in keys}
+
+    except Exception as e:
+        return {key: {"exists": False, "value": None, "last_updated": None} for key in keys}
+
+def _read_result(key, val, last_updated, exists):
+    """Build a get_sem result, counting the read and recording it in the capture context."""
+    if exists:
+        metrics.increment("sem_reads_total")
         
-        if val_str is not None:
-            val = json.loads(val_str)
-            metrics.increment("sem_reads_total")
+        if _capture_context is not None:
+            _capture_context["reads"][key] = {"value": val, "exists": True}
+            
+        return {
+            "exists": True,
+            "value": val,
+            "last_updated": last_updated
+        }
+    else:
+        if _capture_context is not None:
+            _capture_context["reads"][key] = {"value": None, "exists": False}
             
+        return {"exists": False, "value": None, "last_updated": None}
+
+
+def scan_sem(prefix, limit=100, cursor=None):
+    """
+    List one page of Semantic Memory keys under a prefix, in key order.
+
+    Uses a range scan on the primary key, so listing a namespace such as
+    "user/profile/user_123/" costs the size of the namespace, not the table.
+    Scanned keys are recorded as reads in the capture context, so a replay
+    snapshot reproduces the same page.
+
+    Args:
+        prefix: Key prefix (a partial canonical key)
+        limit: Maximum items in the page
+        cursor: next_cursor of the previous page, or None for the first page
+
+    Returns:
+        {"items": [{"key", "value", "last_updated"}], "next_cursor": str | None}
+    """
+    try:
+        rows = _active_store.scan(prefix, limit, cursor)
+        items = []
+        for canonical_key, val_str, last_updated in rows:
+            val = json.loads(val_str)
             if _capture_context is not None:
-                _capture_context["reads"][key] = {"value": val, "exists": True}
-                
-            return {
-                "exists": True,
+                _capture_context["reads"][canonical_key] = {"value": val, "exists": True}
+            items.append({
+                "key": canonical_key,
                 "value": val,
                 "last_updated": last_updated
-            }
-        else:
-            if _capture_context is not None:
-                _capture_context["reads"][key] = {"value": None, "exists": False}
-                
-            return {"exists": False, "value": None, "last_updated": None}
-            
+            })
+        metrics.increment("sem_scans_total")
+        next_cursor = items[-1]["key"] if len(items) == limit and items else None
+        return {"items": items, "next_cursor": next_cursor}
     except Exception as e:
-        return {"exists": False, "value": None, "last_updated": None}
+        return {"items": [], "next_cursor": None}
+
+def iter_sem(prefix, page_size=100):
+    """
+    Iterate over every Semantic Memory entry under a prefix, in key order.
 
+    Pages through scan_sem; yields {"key", "value", "last_updated"} dicts.
+    """
+    cursor = None
+    while True:
+        page = scan_sem(prefix, page_size, cursor)
+        yield from page["items"]
+        cursor = page["next_cursor"]
+        if cursor is None:
+            return
 
-def search_sem(query, limit=50):
+def count_sem(prefix):
+    """Number of Semantic Memory keys starting with `prefix`."""
+    try:
+        return _active_store.count(prefix)
+    except Exception as e:
+        return 0
+
+def search_sem(query, limit=50, prefix=True):
     """
-    Search Semantic Memory by partial key or value match.
+    Search Semantic Memory by key or value text.
+
+    Every word of the query must appear in the key or value (case-insensitive);
+    with prefix=True words also match as prefixes ("sar" finds "sarah").
+    Results are ranked by relevance (BM25, key matches first), then recency.
     
     Args:
-        query: Substring to search for (case-insensitive in keys/values)
+        query: Words to search for in keys/values
         limit: Maximum results
+        prefix: Match query words as prefixes
         
     Returns:
         List of {"key": str, "value": any, "last_updated": str}
     """
     try:
-        rows = _active_store.search_keys(query.lower(), limit)
+        rows = _active_store.search_keys(query.lower(), limit, prefix=prefix)
         results = []
         for canonical_key, val_str, last_updated in rows:
             try:
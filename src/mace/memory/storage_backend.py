@@ -1,25 +1,198 @@
 import sqlite3
 import os
+import re
 import json
+import uuid
+from mace.core import durability
+from mace.core.connection_pool import file_identity
+from mace.memory import sem_snapshot_file
+
+# Statement text is kept constant so sqlite3's per-connection statement cache
+# reuses the prepared statement across calls on a long-lived backend.
+# Upsert (not INSERT OR REPLACE) keeps the row's rowid stable, which the
+# external-content FTS index below is keyed on.
+_SQL_PUT = """
+    INSERT INTO sem_kv (canonical_key, value, last_updated)
+    VALUES (?, ?, ?)
+    ON CONFLICT(canonical_key) DO UPDATE SET
+        value = excluded.value,
+        last_updated = excluded.last_updated
+"""
+_SQL_GET = """
+    SELECT value, last_updated FROM sem_kv WHERE canonical_key = ?
+"""
+_SQL_GET_ROW = """
+    SELECT rowid, value FROM sem_kv WHERE canonical_key = ?
+"""
+# Keys per IN (...) query in get_many (below SQLite's bound-parameter limit)
+_GET_MANY_CHUNK = 500
+_SQL_SEARCH = """
+    SELECT canonical_key, value, last_updated, 0.0
+    FROM sem_kv
+    WHERE canonical_key LIKE ? OR value LIKE ?
+    ORDER BY last_updated DESC
+    LIMIT ?
+"""
+
+# Namespace listing: range scan on the canonical_key primary-key index.
+# Parameters: prefix (inclusive lower bound), cursor (exclusive, '' for the
+# first page), prefix upper bound (exclusive), limit.
+_SQL_SCAN = """
+    SELECT canonical_key, value, last_updated
+    FROM sem_kv
+    WHERE canonical_key >= ? AND canonical_key > ? AND canonical_key < ?
+    ORDER BY canonical_key
+    LIMIT ?
+"""
+_SQL_COUNT = """
+    SELECT COUNT(*) FROM sem_kv WHERE canonical_key >= ? AND canonical_key < ?
+"""
+
+# Version history (MVCC). sem_kv holds the head of every key; sem_versions
+# holds every write, numbered by a global, monotonically increasing version,
+# so state "as of version v" is the newest row per key with version <= v.
+_SQL_VERSION_INSERT = """
+    INSERT INTO sem_versions (canonical_key, value, write_counter, last_updated)
+    VALUES (?, ?, ?, ?)
+"""
+_SQL_VERSION_BACKFILL = """
+    INSERT INTO sem_versions (canonical_key, value, write_counter, last_updated)
+    SELECT canonical_key, value, NULL, last_updated FROM sem_kv ORDER BY canonical_key
+"""
+_SQL_GET_AS_OF = """
+    SELECT value, last_updated FROM sem_versions
+    WHERE canonical_key = ? AND version <= ?
+    ORDER BY version DESC
+    LIMIT 1
+"""
+_SQL_SCAN_AS_OF = """
+    SELECT v.canonical_key, v.value, v.last_updated
+    FROM sem_versions AS v
+    WHERE v.canonical_key >= ? AND v.canonical_key > ? AND v.canonical_key < ?
+      AND v.version = (
+          SELECT MAX(version) FROM sem_versions
+          WHERE canonical_key = v.canonical_key AND version <= ?
+      )
+    ORDER BY v.canonical_key
+    LIMIT ?
+"""
+_SQL_STATE_AS_OF = """
+    SELECT v.canonical_key, v.value
+    FROM sem_versions AS v
+    WHERE v.version = (
+        SELECT MAX(version) FROM sem_versions
+        WHERE canonical_key = v.canonical_key AND version <= ?
+    )
+    ORDER BY v.canonical_key
+"""
+_SQL_VERSIONS_SINCE = """
+    SELECT version, canonical_key, value, write_counter, last_updated FROM sem_versions
+    WHERE version > ?
+    ORDER BY version
+    LIMIT ?
+"""
+_SQL_HISTORY = """
+    SELECT version, value, write_counter, last_updated FROM sem_versions
+    WHERE canonical_key = ?
+    ORDER BY version
+"""
+# A version can go once a newer version of the same key is visible at the
+# horizon (no snapshot at or after the horizon can see it) and it is not
+# among the newest keep_per_key versions of its key.
+_SQL_COMPACT = """
+    DELETE FROM sem_versions WHERE version IN (
+        SELECT version FROM (
+            SELECT s.version,
+                   ROW_NUMBER() OVER (PARTITION BY s.canonical_key ORDER BY s.version DESC) AS rn,
+                   (SELECT MAX(version) FROM sem_versions
+                    WHERE canonical_key = s.canonical_key AND version <= ?) AS visible
+            FROM sem_versions AS s
+        )
+        WHERE rn > ? AND version < visible
+    )
+"""
+
+# Full-text index over SEM keys and values (SQLite FTS5, external content).
+# Keys are weighted above values when ranking.
+_SQL_FTS_CREATE = """
+    CREATE VIRTUAL TABLE IF NOT EXISTS sem_fts USING fts5(
+        canonical_key, value, content='sem_kv', content_rowid='rowid'
+    )
+"""
+_SQL_FTS_DELETE = """
+    INSERT INTO sem_fts (sem_fts, rowid, canonical_key, value) VALUES ('delete', ?, ?, ?)
+"""
+_SQL_FTS_INSERT = """
+    INSERT INTO sem_fts (rowid, canonical_key, value) VALUES (?, ?, ?)
+"""
+_SQL_FTS_REBUILD = """
+    INSERT INTO sem_fts (sem_fts) VALUES ('rebuild')
+"""
+_SQL_FTS_SEARCH = """
+    SELECT k.canonical_key, k.value, k.last_updated, bm25(sem_fts, 2.0, 1.0) AS score
+    FROM sem_fts
+    JOIN sem_kv AS k ON k.rowid = sem_fts.rowid
+    WHERE sem_fts MATCH ?
+    ORDER BY score, k.last_updated DESC
+    LIMIT ?
+"""
+
+_FTS_TOKEN = re.compile(r"[a-z0-9]+")
+
+
+def fts_query(query, prefix=True):
+    """
+    Build an FTS5 MATCH expression from free text.
+
+    Every alphanumeric token must match (AND); with prefix=True each token
+    also matches as a prefix, so "user_12" finds "user/profile/user_123/name".
+    Returns None if the query has no indexable tokens.
+    """
+    tokens = _FTS_TOKEN.findall(query.lower())
+    if not tokens:
+        return None
+    suffix = "*" if prefix else ""
+    return " AND ".join(f'"{tok}"{suffix}' for tok in tokens)
+
+
+def prefix_upper_bound(prefix):
+    """
+    Smallest string greater than every string starting with `prefix`.
+
+    Canonical keys are ASCII, so the empty prefix is bounded by U+10FFFF.
+    """
+    if not prefix:
+        return chr(0x10FFFF)
+    return prefix[:-1] + chr(ord(prefix[-1]) + 1)
+
 
 class StorageBackend:
-    def __init__(self, db_path="mace_memory.db"):
+    def __init__(self, db_path="mace_memory.db", check_same_thread=True):
         self.db_path = db_path
+        self._check_same_thread = check_same_thread
+        self._schema_ready = False
+        self.fts_enabled = False
         self._init_db()
 
     def _init_db(self):
         """
-        Initialize the SQLite database with deterministic settings.
+        Open the SQLite database with deterministic settings.
+        Tables are created lazily on first use (see _ensure_schema).
         """
         # Ensure directory exists
         os.makedirs(os.path.dirname(os.path.abspath(self.db_path)), exist_ok=True)
-        
-        self.conn = sqlite3.connect(self.db_path, timeout=10.0)
-        
-        # Enforce deterministic behavior
-        self.conn.execute("PRAGMA synchronous=FULL")
-        self.conn.execute("PRAGMA journal_mode=DELETE")
-        
+
+        # Journal mode / fsync policy come from the active durability profile
+        # (strict = synchronous=FULL + journal_mode=DELETE)
+        self.conn = durability.connect(
+            self.db_path, timeout=10.0, check_same_thread=self._check_same_thread
+        )
+        self.identity = file_identity(self.db_path)
+
+    def _ensure_schema(self):
+        if self._schema_ready:
+            return
+
         # Create table if not exists
         self.conn.execute("""
             CREATE TABLE IF NOT EXISTS sem_kv (
@@ -28,7 +201,7 @@ class StorageBackend:
                 last_updated TEXT
             )
         """)
-        
+
         # BrainState snapshots table (required by executor)
         self.conn.execute("""
             CREATE TABLE IF NOT EXISTS brainstate_snapshots (
@@ -39,7 +212,7 @@ class StorageBackend:
                 tick_count INTEGER
             )
         """)
-        
+
         # CWM (Contextual Working Memory) table
         self.conn.execute("""
             CREATE TABLE IF NOT EXISTS cwm_items (
@@ -52,7 +225,7 @@ class StorageBackend:
                 expires_at TEXT
             )
         """)
-        
+
         # Episodic Memory table
         self.conn.execute("""
             CREATE TABLE IF NOT EXISTS episodic (
@@ -64,56 +237,338 @@ class StorageBackend:
                 created_at TEXT
             )
         """)
+
+        # Random ID of this database, so sidecar files (e.g. sem_bloom's) can
+        # tell it from a later database that reuses the same inode
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS sem_meta (
+                name TEXT PRIMARY KEY,
+                value TEXT
+            )
+        """)
+        self.conn.execute(
+            "INSERT OR IGNORE INTO sem_meta (name, value) VALUES ('database_id', ?)",
+            (uuid.uuid4().hex,)
+        )
+
+        self._ensure_version_table()
+        self._ensure_search_index()
         self.conn.commit()
+        self._schema_ready = True
 
-    def put(self, key, value, timestamp):
+    def _ensure_version_table(self):
+        """Create sem_versions, seeding it with the current head if sem_kv predates it."""
+        existed = self.conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'sem_versions'"
+        ).fetchone() is not None
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS sem_versions (
+                version INTEGER PRIMARY KEY AUTOINCREMENT,
+                canonical_key TEXT NOT NULL,
+                value TEXT,
+                write_counter INTEGER,
+                last_updated TEXT
+            )
+        """)
+        self.conn.execute("""
+            CREATE INDEX IF NOT EXISTS idx_sem_versions_key
+            ON sem_versions (canonical_key, version)
+        """)
+        if not existed:
+            self.conn.execute(_SQL_VERSION_BACKFILL)
+
+    def _ensure_search_index(self):
+        """Create the FTS5 index, backfilling it if sem_kv predates the index."""
+        existed = self.conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'sem_fts'"
+        ).fetchone() is not None
+        try:
+            self.conn.execute(_SQL_FTS_CREATE)
+        except sqlite3.OperationalError:
+            # SQLite built without FTS5: search_keys falls back to LIKE
+            self.fts_enabled = False
+            return
+        self.fts_enabled = True
+        if not existed:
+            self.conn.execute(_SQL_FTS_REBUILD)
+
+    def rebuild_search_index(self):
+        """Rebuild the SEM full-text index from sem_kv. Returns rows indexed."""
+        self._ensure_schema()
+        if not self.fts_enabled:
+            return 0
+        self.conn.execute(_SQL_FTS_REBUILD)
+        self.conn.commit()
+        return self.conn.execute("SELECT COUNT(*) FROM sem_kv").fetchone()[0]
+
+    def database_id(self):
+        """Random ID created with the database file (see sem_meta)."""
+        self._ensure_schema()
+        return self.conn.execute("SELECT value FROM sem_meta WHERE name = 'database_id'").fetchone()[0]
+
+    def is_stale(self):
+        """
+        True if the database file was removed or replaced since this backend
+        opened it (a long-lived handle would keep reading the old file).
+        """
+        return file_identity(self.db_path) != self.identity
+
+    def put(self, key, value, timestamp, write_counter=None):
         """
         Write a key-value pair to the database.
         value is expected to be a JSON string.
         """
+        return self.put_many([(key, value, timestamp, write_counter)])
+
+    def put_many(self, rows):
+        """
+        Write (key, value, timestamp[, write_counter]) rows in one transaction,
+        in order (a key repeated in the batch ends with its last value). Each
+        row also becomes a new version in sem_versions.
+        All-or-nothing: returns False and writes nothing on error.
+        """
         try:
-            self.conn.execute("""
-                INSERT OR REPLACE INTO sem_kv (canonical_key, value, last_updated)
-                VALUES (?, ?, ?)
-            """, (key, value, timestamp))
+            self._ensure_schema()
+            self._write_rows(rows)
             self.conn.commit()
             return True
         except sqlite3.Error as e:
+            self.conn.rollback()
             # Log error? For now just return False as per spec F5
             return False
 
+    def _write_rows(self, rows):
+        """Write rows inside the current transaction (the caller commits)."""
+        for key, value, timestamp, *write_counter in rows:
+            self._put_row(key, value, timestamp, write_counter[0] if write_counter else None)
+
+    def _put_row(self, key, value, timestamp, write_counter):
+        self.conn.execute(_SQL_VERSION_INSERT, (key, value, write_counter, timestamp))
+        if self.fts_enabled:
+            old = self.conn.execute(_SQL_GET_ROW, (key,)).fetchone()
+            if old:
+                self.conn.execute(_SQL_FTS_DELETE, (old[0], key, old[1]))
+        cursor = self.conn.execute(_SQL_PUT, (key, value, timestamp))
+        if self.fts_enabled:
+            rowid = old[0] if old else cursor.lastrowid
+            self.conn.execute(_SQL_FTS_INSERT, (rowid, key, value))
+
     def get(self, key):
         """
         Retrieve a value by key.
         Returns (value, last_updated) or (None, None) if not found.
         """
-        cursor = self.conn.execute("""
-            SELECT value, last_updated FROM sem_kv WHERE canonical_key = ?
-        """, (key,))
+        self._ensure_schema()
+        cursor = self.conn.execute(_SQL_GET, (key,))
         row = cursor.fetchone()
         if row:
             return row[0], row[1]
         return None, None
 
-    def search_keys(self, query, limit=50):
+    def get_many(self, keys):
+        """
+        Retrieve several keys with batched IN queries.
+        Returns {key: (value, last_updated)} for the keys that exist.
+        """
+        self._ensure_schema()
+        keys = list(dict.fromkeys(keys))
+        found = {}
+        for i in range(0, len(keys), _GET_MANY_CHUNK):
+            chunk = keys[i:i + _GET_MANY_CHUNK]
+            placeholders = ", ".join("?" * len(chunk))
+            cursor = self.conn.execute(
+                f"SELECT canonical_key, value, last_updated FROM sem_kv "
+                f"WHERE canonical_key IN ({placeholders})",
+                chunk,
+            )
+            for key, value, last_updated in cursor.fetchall():
+                found[key] = (value, last_updated)
+        return found
+
+    def all_keys(self):
+        """Every canonical key in sem_kv, in key order."""
+        self._ensure_schema()
+        return [row[0] for row in self.conn.execute(
+            "SELECT canonical_key FROM sem_kv ORDER BY canonical_key"
+        )]
+
+    def namespace_keys(self, namespace):
+        """Keys in one namespace (the key minus its last segment)."""
+        self._ensure_schema()
+        prefix = namespace + "/"
+        return [row[0] for row in self.conn.execute(
+            "SELECT canonical_key FROM sem_kv WHERE canonical_key >= ? AND canonical_key < ?",
+            (prefix, prefix_upper_bound(prefix)),
+        )]
+
+    def keys_since(self, version):
+        """
+        Keys written after `version` and the newest version seen:
+        ([canonical_key], max_version).
+        """
+        self._ensure_schema()
+        rows = self.conn.execute(
+            "SELECT canonical_key, version FROM sem_versions WHERE version > ? ORDER BY version",
+            (version,),
+        ).fetchall()
+        return [row[0] for row in rows], (rows[-1][1] if rows else version)
+
+    def versions_since(self, version, limit=1000):
+        """
+        Versions written after `version`, oldest first:
+        [(version, canonical_key, value, write_counter, last_updated)].
+        """
+        self._ensure_schema()
+        return [tuple(row) for row in self.conn.execute(_SQL_VERSIONS_SINCE, (version, limit))]
+
+    def data_version(self):
+        """PRAGMA data_version: changes when another connection commits to the file."""
+        return self.conn.execute("PRAGMA data_version").fetchone()[0]
+
+    def current_version(self):
+        """Newest version number (0 if nothing was ever written)."""
+        self._ensure_schema()
+        return self.conn.execute("SELECT COALESCE(MAX(version), 0) FROM sem_versions").fetchone()[0]
+
+    def get_as_of(self, key, version):
+        """
+        Value of `key` as of `version`.
+        Returns (value, last_updated) or (None, None) if it did not exist yet.
+        """
+        self._ensure_schema()
+        row = self.conn.execute(_SQL_GET_AS_OF, (key, version)).fetchone()
+        if row:
+            return row[0], row[1]
+        return None, None
+
+    def scan_as_of(self, prefix, version, limit=100, after=None):
+        """scan() over the state as of `version`."""
+        self._ensure_schema()
+        cursor = self.conn.execute(
+            _SQL_SCAN_AS_OF,
+            (prefix, after or "", prefix_upper_bound(prefix), version, limit),
+        )
+        return [tuple(row) for row in cursor.fetchall()]
+
+    def history(self, key):
+        """All retained versions of `key`: [(version, value, write_counter, last_updated)]."""
+        self._ensure_schema()
+        return [tuple(row) for row in self.conn.execute(_SQL_HISTORY, (key,)).fetchall()]
+
+    def compact_versions(self, horizon, keep_per_key=1):
+        """
+        Drop versions no snapshot at or after `horizon` can see, keeping at
+        least the newest keep_per_key versions of every key.
+        Returns the number of versions removed.
+        """
+        self._ensure_schema()
+        cursor = self.conn.execute(_SQL_COMPACT, (horizon, max(keep_per_key, 1)))
+        self.conn.commit()
+        return cursor.rowcount
+
+    def export_snapshot(self, path, version=None):
+        """
+        Write the SEM state (current, or as of `version`) to a read-only
+        snapshot file (see sem_snapshot_file). Returns the entries written.
         """
-        Search for keys containing the query string.
-        
+        version, count, rows = self._begin_export(version)
+        try:
+            return sem_snapshot_file.write_snapshot(path, rows, count, version)
+        finally:
+            self.conn.rollback()
+
+    def _begin_export(self, version=None):
+        """
+        Open a read transaction and return (version, count, rows) for an
+        export; rows yields (canonical_key, value) in key order. The caller
+        ends the transaction with conn.rollback().
+        """
+        self._ensure_schema()
+        if self.conn.in_transaction:
+            self.conn.commit()
+        # One read transaction, so the row count and the rows agree
+        self.conn.execute("BEGIN")
+        try:
+            if version is None:
+                version = self.conn.execute(
+                    "SELECT COALESCE(MAX(version), 0) FROM sem_versions"
+                ).fetchone()[0]
+                count = self.conn.execute("SELECT COUNT(*) FROM sem_kv").fetchone()[0]
+                rows = self.conn.execute(
+                    "SELECT canonical_key, value FROM sem_kv ORDER BY canonical_key"
+                )
+            else:
+                count = self.conn.execute(
+                    f"SELECT COUNT(*) FROM ({_SQL_STATE_AS_OF})", (version,)
+                ).fetchone()[0]
+                rows = self.conn.execute(_SQL_STATE_AS_OF, (version,))
+            return version, count, rows
+        except sqlite3.Error:
+            self.conn.rollback()
+            raise
+
+    def scan(self, prefix, limit=100, after=None):
+        """
+        List keys starting with `prefix` in key order, via an index range scan.
+
         Args:
-            query: Substring to search for in canonical keys and values
+            prefix: Key prefix, e.g. "user/profile/user_123/"
+            limit: Maximum rows
+            after: Only return keys greater than this one (pagination cursor)
+
+        Returns:
+            List of (canonical_key, value, last_updated) tuples
+        """
+        self._ensure_schema()
+        cursor = self.conn.execute(
+            _SQL_SCAN, (prefix, after or "", prefix_upper_bound(prefix), limit)
+        )
+        return [tuple(row) for row in cursor.fetchall()]
+
+    def count(self, prefix):
+        """Number of keys starting with `prefix`."""
+        self._ensure_schema()
+        return self.conn.execute(_SQL_COUNT, (prefix, prefix_upper_bound(prefix))).fetchone()[0]
+
+    def search_keys(self, query, limit=50, prefix=True, ranked=True):
+        """
+        Search for keys and values matching the query.
+
+        Uses the FTS5 index when available: tokens of `query` must all match
+        (as prefixes unless prefix=False), results ranked by BM25 with keys
+        weighted above values. Falls back to a substring LIKE scan when FTS5
+        is unavailable, the query has no alphanumeric tokens, or ranked=False.
+
+        Args:
+            query: Text to search for in canonical keys and values
             limit: Maximum results
-            
+            prefix: Match tokens as prefixes (FTS only)
+            ranked: Use the ranked FTS index (False forces the LIKE scan)
+
         Returns:
             List of (canonical_key, value, last_updated) tuples
         """
-        cursor = self.conn.execute("""
-            SELECT canonical_key, value, last_updated
-            FROM sem_kv
-            WHERE canonical_key LIKE ? OR value LIKE ?
-            ORDER BY last_updated DESC
-            LIMIT ?
-        """, (f"%{query}%", f"%{query}%", limit))
-        return cursor.fetchall()
+        return [row[:3] for row in self._search(query, limit, prefix, ranked)]
+
+    def _search(self, query, limit, prefix, ranked):
+        """search_keys rows with their BM25 score appended (0.0 for LIKE scans)."""
+        self._ensure_schema()
+        match = fts_query(query, prefix) if ranked and self.fts_enabled else None
+        if match is not None:
+            cursor = self.conn.execute(_SQL_FTS_SEARCH, (match, limit))
+        else:
+            cursor = self.conn.execute(_SQL_SEARCH, (f"%{query}%", f"%{query}%", limit))
+        return [tuple(row) for row in cursor.fetchall()]
+
+    def clear(self):
+        """Remove every SEM row, version and index entry (other tables are kept)."""
+        self._ensure_schema()
+        self.conn.execute("DELETE FROM sem_kv")
+        self.conn.execute("DELETE FROM sem_versions")
+        self.conn.execute("DELETE FROM sqlite_sequence WHERE name = 'sem_versions'")
+        if self.fts_enabled:
+            self.conn.execute(_SQL_FTS_REBUILD)
+        self.conn.commit()
 
     def close(self):
         self.conn.close()
@@ -0,0 +1,105 @@
+"""
+Module: ttl_wheel
+Stage: cross-stage
+Purpose: TTL engine behind WorkingMemory.
+
+         A hashed timing wheel: every item is filed under the tick it
+         expires on, so advancing one tick only touches the items that
+         expire on it. Live items are kept in insertion order in an
+         OrderedDict (O(1) lookup, removal and oldest-first eviction), with
+         an index from the caller's key (memory_id) to its items.
+
+         Items keep their remaining TTL in item["ttl"], as before. The
+         wheel only stores deadlines; the field is written when an item
+         leaves the wheel or is read through values()/get().
+
+         Ordering is the one the per-tick TTL walk produced: items expiring
+         on the same tick come out in insertion order.
+
+         brainstate.tick keeps its own per-tick walk: snapshots carry (and
+         hash) every item's remaining TTL, so that path rewrites all live
+         items each tick whatever engine picks the expired ones.
+
+Part of MACE (Meta Aware Cognitive Engine).
+"""
+import collections
+
+TTL_FIELD = "ttl"
+
+
+class TTLWheel:
+    """Items with a TTL in ticks, filed by the tick they expire on."""
+
+    def __init__(self, now: int = 0):
+        self.now = now
+        self._entries = collections.OrderedDict()  # handle -> (key, item, deadline)
+        self._buckets = {}  # expiry tick -> [handle, ...], insertion order
+        self._by_key = {}   # key -> [handle, ...], insertion order
+        self._next_handle = 0
+
+    def schedule(self, item: dict, ttl: int, key=None) -> int:
+        """
+        Add an item that expires `ttl` ticks from now.
+
+        An item with ttl <= 0 expires on the next tick, like any other
+        item whose TTL has run out.
+        """
+        handle = self._next_handle
+        self._next_handle += 1
+        deadline = self.now + ttl
+        item[TTL_FIELD] = ttl
+        self._entries[handle] = (key, item, deadline)
+        self._buckets.setdefault(max(deadline, self.now + 1), []).append(handle)
+        if key is not None:
+            self._by_key.setdefault(key, []).append(handle)
+        return handle
+
+    def get(self, key):
+        """The oldest live item filed under `key`, or None."""
+        handles = self._by_key.get(key)
+        if not handles:
+            return None
+        return self._sync(self._entries[handles[0]])
+
+    def pop_oldest(self) -> dict:
+        """Remove and return the oldest live item."""
+        handle, entry = self._entries.popitem(last=False)
+        self._unindex(handle, entry[0])
+        return self._sync(entry)
+
+    def advance(self) -> list:
+        """Advance one tick; remove and return the items that expire on it."""
+        self.now += 1
+        expired = []
+        for handle in self._buckets.pop(self.now, ()):
+            entry = self._entries.pop(handle, None)
+            if entry is None:
+                continue  # Evicted or cleared since it was filed
+            self._unindex(handle, entry[0])
+            expired.append(self._sync(entry))
+        return expired
+
+    def values(self) -> list:
+        """All live items, oldest first."""
+        return [self._sync(entry) for entry in self._entries.values()]
+
+    def clear(self):
+        self._entries.clear()
+        self._buckets.clear()
+        self._by_key.clear()
+
+    def _sync(self, entry) -> dict:
+        _, item, deadline = entry
+        item[TTL_FIELD] = deadline - self.now
+        return item
+
+    def _unindex(self, handle, key):
+        if key is None:
+            return
+        handles = self._by_key[key]
+        handles.remove(handle)
+        if not handles:
+            del self._by_key[key]
+
+    def __len__(self):
+        return len(self._entries)
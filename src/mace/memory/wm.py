@@ -5,10 +5,14 @@ Purpose: Short-term memory for the current request/tick.
 Capacity: 7 items (configurable via wm_capacity)
 TTL: 10 ticks (configurable via wm_ttl_ticks)
 Eviction: FIFO when full, TTL expiry promotes to CWM
+
+TTLs are kept by a timing wheel (memory/ttl_wheel.py): a tick only touches
+the items that expire on it, lookups by memory_id and eviction are O(1).
 """
 import datetime
 from mace.core import deterministic, canonical
 from mace.config import config_loader
+from mace.memory.ttl_wheel import TTLWheel
 
 
 class WorkingMemory:
@@ -27,7 +31,7 @@ class WorkingMemory:
             on_expire_callback: Function(item) called when items expire (for CWM promotion)
         """
         self.job_seed = job_seed
-        self.items = []
+        self._wheel = TTLWheel()
         self.max_capacity = config_loader.get_wm_capacity()
         self.default_ttl = config_loader.get_wm_ttl()
         self.on_expire_callback = on_expire_callback
@@ -56,8 +60,8 @@ class WorkingMemory:
             ttl = self.default_ttl
         
         # Evict oldest if at capacity
-        while len(self.items) >= self.max_capacity:
-            evicted = self.items.pop(0)
+        while len(self._wheel) >= self.max_capacity:
+            evicted = self._wheel.pop_oldest()
             if self.on_expire_callback:
                 self.on_expire_callback(evicted)
         
@@ -70,23 +74,25 @@ class WorkingMemory:
             "job_seed": self.job_seed
         }
         
-        self.items.append(item)
+        self._wheel.schedule(item, ttl, key=memory_id)
         return memory_id
     
+    @property
+    def items(self) -> list:
+        """Live items, oldest first."""
+        return self._wheel.values()
+    
     def get(self, memory_id: str) -> dict:
         """Get a specific item by ID."""
-        for item in self.items:
-            if item["memory_id"] == memory_id:
-                return item
-        return None
+        return self._wheel.get(memory_id)
     
     def get_all(self) -> list:
         """Get all active items."""
-        return self.items.copy()
+        return self._wheel.values()
     
     def get_active(self) -> list:
         """Get items with TTL > 0."""
-        return [item for item in self.items if item["ttl"] > 0]
+        return [item for item in self._wheel.values() if item["ttl"] > 0]
     
     def tick(self) -> list:
         """
@@ -95,30 +101,24 @@ class WorkingMemory:
         Returns:
             List of expired items (already promoted via callback)
         """
-        expired = []
-        active = []
+        # Same order as a walk over the items: oldest first
+        expired = self._wheel.advance()
         
-        for item in self.items:
-            item["ttl"] -= 1
-            if item["ttl"] <= 0:
-                expired.append(item)
-                if self.on_expire_callback:
-                    self.on_expire_callback(item)
-            else:
-                active.append(item)
+        if self.on_expire_callback:
+            for item in expired:
+                self.on_expire_callback(item)
         
-        self.items = active
         return expired
     
     def clear(self):
         """Clear all items (with expiry callbacks)."""
-        for item in self.items:
+        for item in self._wheel.values():
             if self.on_expire_callback:
                 self.on_expire_callback(item)
-        self.items = []
+        self._wheel.clear()
     
     def __len__(self):
-        return len(self.items)
+        return len(self._wheel)
     
     def __repr__(self):
-        return f"WorkingMemory(items={len(self.items)}, capacity={self.max_capacity})"
+        return f"WorkingMemory(items={len(self._wheel)}, capacity={self.max_capacity})"
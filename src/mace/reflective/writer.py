@@ -5,6 +5,10 @@ from mace.core import persistence, deterministic, canonical, signing
 
 _table_initialized = False
 
+def _reset_table_flag():
+    global _table_initialized
+    _table_initialized = False
+
 def _ensure_table_exists():
     """Create reflective_logs table if it doesn't exist."""
     global _table_initialized
@@ -25,6 +29,7 @@ def _ensure_table_exists():
         """)
         conn.commit()
         _table_initialized = True
+        persistence.on_rollback(_reset_table_flag)
     finally:
         conn.close()
 
@@ -1,7 +1,7 @@
 import traceback
 import json
 import datetime
-from mace.core import structures, deterministic, canonical
+from mace.core import structures, deterministic, canonical, persistence
 from mace.router import stage1_router
 from mace.brainstate import brainstate
 from mace.reflective import writer as reflective_writer
@@ -11,7 +11,7 @@ from mace.ops import metrics
 from mace.memory import semantic
 from mace.memory.wm import WorkingMemory
 from mace.memory.cwm import ContextualWorkingMemory
-from mace.memory.episodic import EpisodicMemory
+from mace.memory.episodic import EpisodicMemory, prepare_partitions
 from mace.brainstate import persistence as bs_persistence
 import logging
 
@@ -249,78 +249,90 @@ def execute(percept_text, intent="unknown", seed=None, log_enabled=True, entitie
     brainstate.tick(bs_before)
     bs_after = bs_before # In-place update
     
-    # Persist promoted WM items to Episodic Memory (Rule 4.1)
-    promoted = bs_after.pop("_promoted_items", [])
-    if promoted:
-        try:
-            episodic_promo = EpisodicMemory(job_seed=next_seed)
-            for promo_item in promoted:
-                episodic_promo.record_interaction(
-                    percept_text=f"[WM_PROMOTION] {promo_item.get('content', '')}",
-                    response_text="promoted_from_wm",
-                    agent_id="brainstate",
-                    job_seed=next_seed,
-                    metadata={
-                        "memory_id": promo_item.get("memory_id", "unknown"),
-                        "promoted_at_tick": promo_item.get("promoted_at_tick"),
-                        "source": "wm_promotion"
-                    }
-                )
-        except Exception as e:
-            logger.warning("WM promotion episodic write failed: %s", e)
+    # Episodic DDL cannot run inside the request's savepoints (see
+    # episodic.prepare_partitions)
+    try:
+        prepare_partitions()
+    except Exception as e:
+        logger.warning("Episodic partition setup failed: %s", e)
+
+    # Steps 7-9 write through one request-scoped transaction: a single commit,
+    # and the promotions, reflective log, snapshot and episode are durable together.
+    with persistence.unit_of_work():
+        # Persist promoted WM items to Episodic Memory (Rule 4.1)
+        promoted = bs_after.pop("_promoted_items", [])
+        if promoted:
+            try:
+                with persistence.savepoint("wm_promotion"):
+                    episodic_promo = EpisodicMemory(job_seed=next_seed)
+                    for promo_item in promoted:
+                        episodic_promo.record_interaction(
+                            percept_text=f"[WM_PROMOTION] {promo_item.get('content', '')}",
+                            response_text="promoted_from_wm",
+                            agent_id="brainstate",
+                            job_seed=next_seed,
+                            metadata={
+                                "memory_id": promo_item.get("memory_id", "unknown"),
+                                "promoted_at_tick": promo_item.get("promoted_at_tick"),
+                                "source": "wm_promotion"
+                            }
+                        )
+            except Exception as e:
+                logger.warning("WM promotion episodic write failed: %s", e)
     
-    if errors:
-        bs_after["last_error"] = errors[-1]
+        if errors:
+            bs_after["last_error"] = errors[-1]
 
-    # 8. Reflective Log
-    # We need to ensure log_id is deterministic
-    ts = deterministic.deterministic_timestamp(deterministic.increment_counter("executor_log_time"))
-    log_payload = {
-        "percept_id": percept["percept_id"],
-        "timestamp": ts
-    }
-    log_id = deterministic.deterministic_id("reflective_log", canonical.canonical_json_serialize(log_payload))
+        # 8. Reflective Log
+        # We need to ensure log_id is deterministic
+        ts = deterministic.deterministic_timestamp(deterministic.increment_counter("executor_log_time"))
+        log_payload = {
+            "percept_id": percept["percept_id"],
+            "timestamp": ts
+        }
+        log_id = deterministic.deterministic_id("reflective_log", canonical.canonical_json_serialize(log_payload))
     
-    log_entry = structures.create_reflective_log_entry(
-        percept=percept,
-        router_decision=router_decision,
-        council_votes=council_votes,
-        final_output=final_output,
-        brainstate_before=bs_before, # Note: this is actually mutated, ideally we should have deepcopied before
-        brainstate_after=bs_after,
-        agent_outputs=agent_outputs,
-        errors=errors,
-        memory_reads=list(memory_reads.keys()),
-        memory_writes=memory_writes,
-        evidence_items=evidence_items
-    )
-    log_entry["log_id"] = log_id
+        log_entry = structures.create_reflective_log_entry(
+            percept=percept,
+            router_decision=router_decision,
+            council_votes=council_votes,
+            final_output=final_output,
+            brainstate_before=bs_before, # Note: this is actually mutated, ideally we should have deepcopied before
+            brainstate_after=bs_after,
+            agent_outputs=agent_outputs,
+            errors=errors,
+            memory_reads=list(memory_reads.keys()),
+            memory_writes=memory_writes,
+            evidence_items=evidence_items
+        )
+        log_entry["log_id"] = log_id
     
-    if log_enabled:
-        reflective_writer.write_log(log_entry)
-        metrics.increment("reflective_logs_written_total")
-        metrics.save()
+        if log_enabled:
+            reflective_writer.write_log(log_entry)
+            metrics.increment("reflective_logs_written_total")
+            metrics.save()
     
-    # Save updated BrainState for next execution
-    bs_persistence.save_snapshot(bs_after)
+        # Save updated BrainState for next execution
+        bs_persistence.save_snapshot(bs_after)
     
-    # 9. Record interaction to Episodic Memory
-    try:
-        episodic = EpisodicMemory(job_seed=next_seed)
-        episodic.record_interaction(
-            percept_text=percept_text,
-            response_text=final_output["text"],
-            agent_id=agent_id,
-            job_seed=next_seed,
-            metadata={
-                "confidence": final_output["confidence"],
-                "router_explain": router_decision.get("explain", ""),
-                "had_errors": len(errors) > 0
-            }
-        )
-    except Exception as e:
-        # Episodic recording failure should not break execution but MUST be logged
-        logger.warning("Episodic recording failed for percept '%s': %s", percept_text, e)
+        # 9. Record interaction to Episodic Memory
+        try:
+            with persistence.savepoint("episodic_interaction"):
+                episodic = EpisodicMemory(job_seed=next_seed)
+                episodic.record_interaction(
+                    percept_text=percept_text,
+                    response_text=final_output["text"],
+                    agent_id=agent_id,
+                    job_seed=next_seed,
+                    metadata={
+                        "confidence": final_output["confidence"],
+                        "router_explain": router_decision.get("explain", ""),
+                        "had_errors": len(errors) > 0
+                    }
+                )
+        except Exception as e:
+            # Episodic recording failure should not break execution but MUST be logged
+            logger.warning("Episodic recording failed for percept '%s': %s", percept_text, e)
         
     return final_output, log_entry
 
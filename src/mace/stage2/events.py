@@ -15,7 +15,7 @@ All events are:
 
 import json
 import datetime
-from typing import List, Optional, Dict, Any
+from typing import Iterator, List, Optional, Dict, Any
 
 from mace.core import deterministic, canonical, signing, persistence
 
@@ -287,32 +287,38 @@ def log_amendment(
 
 def get_events_by_type(event_type: str) -> List[Dict[str, Any]]:
     """Get all events of a specific type."""
+    return list(iter_events_by_type(event_type))
+
+
+def iter_events_by_type(event_type: str, batch_size: int = None) -> Iterator[Dict[str, Any]]:
+    """
+    Stream the events of a specific type in (created_at, event_id) order,
+    batch_size rows per query (see persistence.iter_keyset).
+    """
     if event_type not in EVENT_TYPES:
         raise ValueError(f"Invalid event_type: {event_type}")
-    
-    conn = persistence.get_connection()
-    try:
-        cur = persistence.execute_query(conn,
-            "SELECT event_json FROM stage2_events WHERE event_type = ? ORDER BY created_at",
-            (event_type,)
-        )
-        rows = persistence.fetch_all(cur)
-        return [json.loads(row["event_json"]) for row in rows]
-    finally:
-        conn.close()
+    return _iter_events("event_type = ?", (event_type,), batch_size)
 
 
 def get_all_events() -> List[Dict[str, Any]]:
     """Get all Stage-2 events (for replay verification)."""
-    conn = persistence.get_connection()
-    try:
-        cur = persistence.execute_query(conn,
-            "SELECT event_json FROM stage2_events ORDER BY created_at"
-        )
-        rows = persistence.fetch_all(cur)
-        return [json.loads(row["event_json"]) for row in rows]
-    finally:
-        conn.close()
+    return list(iter_all_events())
+
+
+def iter_all_events(batch_size: int = None) -> Iterator[Dict[str, Any]]:
+    """
+    Stream all Stage-2 events in (created_at, event_id) order, for replay
+    verification and training extraction over logs too large for memory.
+    """
+    return _iter_events("1 = 1", (), batch_size)
+
+
+def _iter_events(where, params, batch_size):
+    rows = persistence.iter_keyset(
+        "stage2_events", ("created_at", "event_id"), where, params,
+        columns="event_json", batch_size=batch_size
+    )
+    return (json.loads(row["event_json"]) for row in rows)
 
 
 def verify_event_signature(event: Dict[str, Any]) -> bool:
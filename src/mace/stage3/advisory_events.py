@@ -10,7 +10,7 @@ Spec: docs/phase3/advisory_system_spec.md § 3.1, 3.3.8
 """
 
 import json
-from typing import List, Dict, Any, Optional
+from typing import Iterator, List, Dict, Any, Optional
 
 from mace.core import deterministic, canonical, signing, persistence
 
@@ -123,19 +123,21 @@ def _persist_event(event: Dict[str, Any]) -> str:
 
 def get_events_by_type(event_type: str) -> List[Dict[str, Any]]:
     """Get all events of a specific type from Stage 3 log."""
+    return list(iter_events_by_type(event_type))
+
+def iter_events_by_type(event_type: str, batch_size: Optional[int] = None) -> Iterator[Dict[str, Any]]:
+    """
+    Stream the events of a specific type from the Stage 3 log in
+    (created_at, event_id) order, batch_size rows per query
+    (see persistence.iter_keyset).
+    """
     if event_type not in EVENT_TYPES:
         raise ValueError(f"Invalid event_type: {event_type}")
-    
-    conn = persistence.get_connection()
-    try:
-        cur = persistence.execute_query(conn,
-            "SELECT event_json FROM stage3_advice_events WHERE event_type = ? ORDER BY created_at",
-            (event_type,)
-        )
-        rows = persistence.fetch_all(cur)
-        return [json.loads(row["event_json"]) for row in rows]
-    finally:
-        conn.close()
+    rows = persistence.iter_keyset(
+        "stage3_advice_events", ("created_at", "event_id"), "event_type = ?", (event_type,),
+        columns="event_json", batch_size=batch_size
+    )
+    return (json.loads(row["event_json"]) for row in rows)
 
 def append_advisory_event(
     event_type: str,
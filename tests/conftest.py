@@ -2,12 +2,26 @@ import pytest
 import os
 import time
 
+def _close_pooled_connections():
+    """Release pooled DB handles so the files below can be removed (Windows)."""
+    try:
+        from mace.core import persistence
+        from mace.memory import semantic, cwm
+        cwm.close_sessions()
+        persistence.close_all()
+        semantic.close_live_stores()
+    except ImportError:
+        pass
+
+
 @pytest.fixture(autouse=True)
 def db_cleanup():
     """
     Fixture to clean up the database and journal after each test, AND reset module init flags 
     so subsequent tests correctly recreate the database tables.
     """
+    _close_pooled_connections()
+
     # Teardown & Setup - always clear before starting a test
     for db_file in ["mace_memory.db", "mace_stage1.db", "mace.db", "lr01_training.db"]:
         for _ in range(5):
@@ -34,18 +48,21 @@ def db_cleanup():
         from mace.memory import semantic
         import mace.memory.episodic as eps
         import mace.memory.cwm as cwm_module
+        import mace.core.rehydrate as rehydrate_module
         
         writer._table_initialized = False
         bs_persistence._table_initialized = False
         semantic._tables_initialized = False
         eps._table_initialized = False
         cwm_module._table_initialized = False
+        rehydrate_module._table_initialized = False
     except ImportError:
         pass
         
     yield
     
     # Also clean up after test finishes (some tests might not tearDown cleanly if exceptions happen)
+    _close_pooled_connections()
     for db_file in ["mace_memory.db", "mace_stage1.db", "mace.db", "lr01_training.db"]:
         for _ in range(5):
             try:
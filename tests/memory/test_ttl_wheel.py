@@ -0,0 +1,70 @@
+"""
+TTL Wheel Tests
+
+The timing wheel must expire exactly what the per-tick TTL walk expired,
+in the same order, for WorkingMemory.
+"""
+import random
+import unittest
+
+from mace.memory.ttl_wheel import TTLWheel
+from mace.memory.wm import WorkingMemory
+
+
+def legacy_wm_tick(items, on_expire):
+    """The per-item TTL walk WorkingMemory.tick used to do."""
+    active = []
+    for item in items:
+        item["ttl"] -= 1
+        if item["ttl"] <= 0:
+            on_expire(item)
+        else:
+            active.append(item)
+    return active
+
+
+class TestTTLWheel(unittest.TestCase):
+
+    def test_expires_only_due_items_in_insertion_order(self):
+        wheel = TTLWheel()
+        for name, ttl in [("a", 3), ("b", 1), ("c", 3), ("d", 0)]:
+            wheel.schedule({"memory_id": name}, ttl, key=name)
+        self.assertEqual([i["memory_id"] for i in wheel.advance()], ["b", "d"])
+        self.assertEqual(wheel.get("a")["ttl"], 2)
+        self.assertEqual(wheel.advance(), [])
+        self.assertEqual([(i["memory_id"], i["ttl"]) for i in wheel.advance()], [("a", 0), ("c", 0)])
+        self.assertEqual(len(wheel), 0)
+
+    def test_evicted_items_do_not_expire(self):
+        wheel = TTLWheel()
+        wheel.schedule({"memory_id": "a"}, 1, key="a")
+        wheel.schedule({"memory_id": "b"}, 1, key="b")
+        self.assertEqual(wheel.pop_oldest()["memory_id"], "a")
+        self.assertIsNone(wheel.get("a"))
+        self.assertEqual([i["memory_id"] for i in wheel.advance()], ["b"])
+
+    def test_working_memory_matches_ttl_walk(self):
+        rng = random.Random(7)
+        new_order, old_order = [], []
+        wm = WorkingMemory(job_seed="ttl_wheel_test", on_expire_callback=lambda i: new_order.append(i["memory_id"]))
+        legacy = []
+        for step in range(300):
+            if rng.random() < 0.6:
+                memory_id, ttl = f"m{step % 40}", rng.randint(-1, 6)
+                while len(legacy) >= wm.max_capacity:
+                    old_order.append(legacy.pop(0)["memory_id"])
+                wm.add({"step": step}, memory_id=memory_id, ttl=ttl)
+                legacy.append({"memory_id": memory_id, "ttl": ttl})
+            else:
+                wm.tick()
+                legacy = legacy_wm_tick(legacy, lambda i: old_order.append(i["memory_id"]))
+            self.assertEqual([(i["memory_id"], i["ttl"]) for i in wm.get_all()],
+                             [(i["memory_id"], i["ttl"]) for i in legacy])
+            for item in legacy:
+                self.assertEqual(wm.get(item["memory_id"])["ttl"],
+                                 next(i["ttl"] for i in legacy if i["memory_id"] == item["memory_id"]))
+        self.assertEqual(new_order, old_order)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,69 @@
+import unittest
+import copy
+import random
+from unittest import mock
+from mace.brainstate import brainstate, state_hash
+from mace.core import canonical
+
+
+def _legacy(state):
+    content = copy.deepcopy(state)
+    content.pop("snapshot_id", None)
+    return canonical.canonical_json_serialize(content)
+
+
+class TestStateHash(unittest.TestCase):
+
+    def _state(self, rng):
+        bs = brainstate.create_snapshot("state_hash_seed")
+        bs["goals"] = [{"goal": "Café ﬁle", "priority": rng.choice([1, 1.0, 0.333333333333, True])},
+                       "plain goal", ["nested", {"k": None}]]
+        bs["resource_load"] = {"cpu": rng.random(), "memory": 0.0}
+        bs["last_error"] = rng.choice([None, "timeout", {"code": 3}])
+        for i in range(rng.randint(0, 5)):
+            bs["working_memory"].append({"memory_id": f"m{i}", "ttl": rng.randint(1, 10),
+                                         "content": {"text": f"item {i}", "n": [i, i / 3], "by_id": {i: "x"}}})
+        return bs
+
+    def test_payload_is_byte_identical_to_canonical_json(self):
+        rng = random.Random(3)
+        for _ in range(50):
+            bs = self._state(rng)
+            self.assertEqual(state_hash.state_payload(bs), _legacy(bs))
+            self.assertEqual(state_hash.state_payload(bs, exclude=()), canonical.canonical_json_serialize(bs))
+
+    def test_in_place_changes_are_seen(self):
+        bs = brainstate.create_snapshot("state_hash_seed")
+        brainstate.add_wm_item(bs, {"memory_id": "m1", "content": {"priority": 1}})
+        before = state_hash.state_payload(bs)
+        bs["working_memory"][0]["content"]["priority"] = 1.0  # Equal, but serializes differently
+        self.assertNotEqual(state_hash.state_payload(bs), before)
+        self.assertEqual(state_hash.state_payload(bs), _legacy(bs))
+        bs["resource_load"]["cpu"] = 0.5
+        self.assertEqual(state_hash.state_payload(bs), _legacy(bs))
+
+    def test_snapshot_ids_match_legacy_path(self):
+        def run(mode):
+            with mock.patch.object(state_hash.config_loader, "get_brainstate_hash_mode", return_value=mode):
+                bs = brainstate.create_snapshot("state_hash_seed")
+                ids = []
+                for step in range(15):
+                    if step % 4 == 0:
+                        brainstate.push_goal(bs, {"goal": f"g{step}"})
+                        brainstate.add_wm_item(bs, {"memory_id": f"m{step}", "content": {"step": step}})
+                    ids.append(brainstate.tick(bs)["snapshot_id"])
+                return ids
+
+        self.assertEqual(run("verify"), run("legacy"))
+        self.assertEqual(run("direct"), run("legacy"))
+
+    def test_verify_mode_raises_on_mismatch(self):
+        bs = brainstate.create_snapshot("state_hash_seed")
+        with mock.patch.object(state_hash.config_loader, "get_brainstate_hash_mode", return_value="verify"), \
+                mock.patch.object(state_hash, "_direct_payload", return_value="{}"):
+            with self.assertRaises(RuntimeError):
+                state_hash.state_payload(bs)
+
+
+if __name__ == "__main__":
+    unittest.main()
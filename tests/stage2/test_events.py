@@ -15,6 +15,7 @@ import unittest
 import os
 import sys
 import sqlite3
+from unittest import mock
 
 # Set test DB path
 DB_PATH = "stage2_test.db"
@@ -271,6 +272,23 @@ class TestEventLogging(unittest.TestCase):
         )
         self.assertIsNotNone(event_id)
 
+    def test_iter_all_events_pages_by_key(self):
+        """Verify streaming reads return the same events as the list APIs."""
+        deterministic.init_seed("streaming_test_seed")
+        for i in range(5):
+            events.log_wm_insert(item_id=f"wm_stream_{i}", content_summary="Streamed", job_seed="stream_test")
+        with mock.patch.object(persistence, "execute_query", wraps=persistence.execute_query) as spy:
+            streamed = list(events.iter_all_events(batch_size=2))
+        self.assertEqual(streamed, events.get_all_events())
+        self.assertGreaterEqual(len(streamed), 5)
+        self.assertEqual(spy.call_count, len(streamed) // 2 + 1)
+        self.assertEqual(len({e["event_id"] for e in streamed}), len(streamed))
+
+        inserts = list(events.iter_events_by_type("wm_insert", batch_size=3))
+        self.assertEqual(inserts, events.get_events_by_type("wm_insert"))
+        with self.assertRaises(ValueError):
+            events.iter_events_by_type("invalid_type")
+
 
 if __name__ == "__main__":
     unittest.main(verbosity=2)
@@ -4,7 +4,7 @@ Tests for Stage 3 Advisory Events.
 
 import pytest
 from mace.core import deterministic, signing
-from mace.stage3.advisory_events import append_advisory_event, EVENT_TYPES
+from mace.stage3.advisory_events import append_advisory_event, get_events_by_type, iter_events_by_type, EVENT_TYPES
 
 def test_append_advisory_event_success():
     """Ensure we can generate and persist an event with valid type."""
@@ -39,3 +39,21 @@ def test_append_advisory_event_invalid_type():
             source_module="test",
             payload={}
         )
+
+def test_iter_events_by_type_streams_in_pages():
+    """Streaming reads page through the log and match the list API."""
+    deterministic.init_seed("test_stream_seed")
+    for i in range(5):
+        append_advisory_event(
+            event_type="DISAGREEMENT_LOG",
+            source_module="test_runner",
+            payload={"i": i},
+            evidence_ids=[f"stream_ev{i}"]
+        )
+
+    streamed = list(iter_events_by_type("DISAGREEMENT_LOG", batch_size=2))
+    assert streamed == get_events_by_type("DISAGREEMENT_LOG")
+    assert len(streamed) >= 5
+    assert len({e["event_id"] for e in streamed}) == len(streamed)
+    with pytest.raises(ValueError):
+        iter_events_by_type("BOGUS_EVENT")
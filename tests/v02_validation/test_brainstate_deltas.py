@@ -0,0 +1,149 @@
+import unittest
+import os
+import random
+import sqlite3
+import importlib.util
+from unittest import mock
+from mace.core import persistence
+from mace.brainstate import brainstate, delta
+from mace.brainstate import persistence as bs_persistence
+
+DB_PATH = "brainstate_deltas_test.db"
+MIGRATIONS = os.path.join(os.path.dirname(__file__), "..", "..", "migrations")
+
+
+def run_migration(name):
+    spec = importlib.util.spec_from_file_location("migrate_template", os.path.join(MIGRATIONS, "migrate_template.py"))
+    migrate = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(migrate)
+    migrate.run_migration_sqlite(DB_PATH, os.path.join(MIGRATIONS, name))
+
+
+class TestBrainStateDeltas(unittest.TestCase):
+    def setUp(self):
+        persistence.close_all()
+        if os.path.exists(DB_PATH):
+            os.remove(DB_PATH)
+        self._patches = [
+            mock.patch.object(persistence, "_DB_URL", f"sqlite:///{DB_PATH}"),
+            mock.patch.object(bs_persistence.config_loader, "get_brainstate_keyframe_interval", return_value=4),
+        ]
+        for p in self._patches:
+            p.start()
+        bs_persistence._table_initialized = False
+
+    def tearDown(self):
+        for p in reversed(self._patches):
+            p.stop()
+        persistence.close_all()
+        bs_persistence._table_initialized = False
+        if os.path.exists(DB_PATH):
+            os.remove(DB_PATH)
+
+    def _run(self, ticks, job_seed="delta_seed"):
+        bs = brainstate.create_snapshot(job_seed)
+        bs["job_seed"] = job_seed
+        saved = []
+        for step in range(ticks):
+            if step % 3 == 0:
+                brainstate.push_goal(bs, {"goal": f"goal {step}", "priority": step / 7})
+                brainstate.add_wm_item(bs, {"memory_id": f"m{step}", "content": {"text": "ﬁ" * step}})
+            if step % 5 == 4:
+                brainstate.pop_goal(bs)
+            brainstate.tick(bs)
+            bs["created_at"] = f"2026-01-01T00:00:{step:02d}"
+            bs_persistence.save_snapshot(bs)
+            saved.append(bs_persistence.state_hash.state_payload(bs, exclude=()))
+        return bs, saved
+
+    def _rows(self):
+        conn = sqlite3.connect(DB_PATH)
+        try:
+            return conn.execute("SELECT snapshot_id, brainstate_json IS NOT NULL, chain_length "
+                                "FROM brainstate_snapshots ORDER BY created_at").fetchall()
+        finally:
+            conn.close()
+
+    def test_chain_of_keyframes_and_deltas(self):
+        _, saved = self._run(10)
+        rows = self._rows()
+        self.assertEqual([(full, length) for _, full, length in rows],
+                         [(1, 0), (0, 1), (0, 2), (0, 3)] * 2 + [(1, 0), (0, 1)])
+        for (snapshot_id, _, _), expected in zip(rows, saved):
+            restored = bs_persistence.get_snapshot_by_id(snapshot_id)
+            self.assertEqual(bs_persistence.state_hash.state_payload(restored, exclude=()), expected)
+        self.assertEqual(bs_persistence.state_hash.state_payload(
+            bs_persistence.load_latest_snapshot("delta_seed"), exclude=()), saved[-1])
+
+    def test_new_process_starts_with_a_keyframe(self):
+        bs, _ = self._run(2)
+        bs_persistence._forget_sessions()
+        brainstate.tick(bs)
+        bs_persistence.save_snapshot(bs)
+        self.assertEqual(self._rows()[-1][1:], (1, 0))
+
+    def test_overwriting_a_base_keeps_its_deltas(self):
+        bs, saved = self._run(3)
+        first = self._rows()[0][0]
+        restored = bs_persistence.get_snapshot_by_id(first)
+        restored["last_error"] = "rewritten"
+        bs_persistence.save_snapshot(restored)
+        self.assertEqual(bs_persistence.get_snapshot_by_id(first)["last_error"], "rewritten")
+        second = self._rows()[1][0]
+        self.assertEqual(bs_persistence.state_hash.state_payload(
+            bs_persistence.get_snapshot_by_id(second), exclude=()), saved[1])
+
+    def test_compaction_rekeyframes_long_chains(self):
+        with mock.patch.object(bs_persistence.config_loader, "get_brainstate_keyframe_interval", return_value=100):
+            _, saved = self._run(9)
+        self.assertEqual(bs_persistence.compact_snapshots(interval=3), 2)
+        rows = self._rows()
+        self.assertEqual([length for _, _, length in rows], [0, 1, 2] * 3)
+        for (snapshot_id, _, _), expected in zip(rows, saved):
+            self.assertEqual(bs_persistence.state_hash.state_payload(
+                bs_persistence.get_snapshot_by_id(snapshot_id), exclude=()), expected)
+
+    def test_patch_round_trip(self):
+        old = {"a": [1, {"b": 2}, 3], "c": "x", "d/e": {"~": True}}
+        new = {"a": [1, {"b": 2.0}], "c": "x", "d/e": {"~": False}, "f": None}
+        ops = delta.diff(old, new)
+        self.assertEqual(delta.apply(old, ops), new)
+        self.assertEqual(type(delta.apply(old, ops)["a"][1]["b"]), float)
+        self.assertEqual(delta.diff(new, new), [])
+
+    def test_expiring_the_oldest_item_is_one_remove(self):
+        old = {"working_memory": [{"memory_id": f"m{i}", "content": {"text": "x" * 50}, "ttl": 5 - i}
+                                  for i in range(5)],
+               "goals": ["a", {"goal": "b"}, "c"]}
+        new = {"working_memory": [dict(item, ttl=item["ttl"] - 1) for item in old["working_memory"][1:]]
+                                 + [{"memory_id": "m5", "content": {}, "ttl": 5}],
+               "goals": [{"goal": "b"}, "c"]}
+        ops = delta.diff(old, new)
+        self.assertEqual([op for op in ops if op["op"] == "remove"],
+                         [{"op": "remove", "path": "/working_memory/0"}, {"op": "remove", "path": "/goals/0"}])
+        self.assertEqual({op["path"].rsplit("/", 1)[-1] for op in ops if op["op"] == "replace"}, {"ttl"})
+        self.assertEqual(delta.apply(old, ops), new)
+
+    def test_random_list_edits_round_trip(self):
+        rng = random.Random(7)
+        for _ in range(300):
+            old = [{"memory_id": f"m{i}", "v": rng.randint(0, 2)} for i in rng.sample(range(8), rng.randint(0, 6))]
+            new = [dict(item, v=rng.randint(0, 2)) for item in old if rng.random() < 0.7]
+            for i in range(rng.randint(0, 3)):
+                new.insert(rng.randint(0, len(new)), {"memory_id": f"n{i}", "v": 0})
+            if rng.random() < 0.2:
+                rng.shuffle(new)
+            plain_old, plain_new = [item["v"] for item in old], [item["v"] for item in new]
+            self.assertEqual(delta.apply(old, delta.diff(old, new)), new)
+            self.assertEqual(delta.apply(plain_old, delta.diff(plain_old, plain_new)), plain_new)
+
+    def test_migration_runs_on_a_table_the_app_created(self):
+        self._run(2)
+        persistence.close_all()
+        run_migration("0010_brainstate_deltas.sql")
+        run_migration("0010_brainstate_deltas.sql")
+        self.assertEqual([length for _, _, length in self._rows()], [0, 1])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,131 @@
+import unittest
+import os
+import sqlite3
+import importlib.util
+from unittest import mock
+from mace.core import persistence, deterministic
+from mace.brainstate import brainstate
+from mace.brainstate import persistence as bs_persistence
+from mace.runtime import executor
+
+DB_PATH = "brainstate_sessions_test.db"
+MIGRATIONS = os.path.join(os.path.dirname(__file__), "..", "..", "migrations")
+
+
+class TestBrainStateSessionCache(unittest.TestCase):
+    def setUp(self):
+        persistence.close_all()
+        if os.path.exists(DB_PATH):
+            os.remove(DB_PATH)
+        self._patch = mock.patch.object(persistence, "_DB_URL", f"sqlite:///{DB_PATH}")
+        self._patch.start()
+        bs_persistence._table_initialized = False
+
+    def tearDown(self):
+        self._patch.stop()
+        persistence.close_all()
+        bs_persistence._table_initialized = False
+        if os.path.exists(DB_PATH):
+            os.remove(DB_PATH)
+
+    def _save(self, job_seed, ticks):
+        bs = brainstate.create_snapshot(job_seed)
+        bs["job_seed"] = job_seed
+        for _ in range(ticks):
+            brainstate.tick(bs)
+            bs_persistence.save_snapshot(bs)  # created_at stays empty
+        return bs
+
+    def _query(self, sql, params=()):
+        conn = sqlite3.connect(DB_PATH)
+        try:
+            return conn.execute(sql, params).fetchall()
+        finally:
+            conn.close()
+
+    def test_latest_is_the_highest_session_seq(self):
+        bs = self._save("seq_seed", 5)
+        self._save("other_seed", 2)
+        self.assertEqual([r[0] for r in self._query(
+            "SELECT session_seq FROM brainstate_snapshots WHERE job_seed = 'seq_seed' ORDER BY session_seq")],
+            [1, 2, 3, 4, 5])
+
+        bs_persistence._forget_sessions()
+        self.assertEqual(bs_persistence.load_latest_snapshot("seq_seed")["tick_count"], 5)
+        plan = " ".join(r[-1] for r in self._query(
+            "EXPLAIN QUERY PLAN SELECT snapshot_id FROM brainstate_snapshots "
+            "WHERE job_seed = ? AND session_seq IS NOT NULL ORDER BY session_seq DESC LIMIT 1", ("seq_seed",)))
+        self.assertIn("idx_brainstate_job_seed_seq", plan)
+
+        # Numbering continues after a restart
+        bs_persistence._forget_sessions()
+        brainstate.tick(bs)
+        bs_persistence.save_snapshot(bs)
+        self.assertEqual(self._query("SELECT MAX(session_seq) FROM brainstate_snapshots WHERE job_seed = 'seq_seed'"),
+                         [(6,)])
+
+    def test_cached_session_is_served_without_the_db(self):
+        bs = self._save("cached_seed", 3)
+        with mock.patch.object(persistence, "get_connection", side_effect=AssertionError("DB read")):
+            latest = bs_persistence.load_latest_snapshot("cached_seed")
+        self.assertEqual(latest["snapshot_id"], bs["snapshot_id"])
+
+        # Callers get a copy of the cached state
+        latest["goals"].append("scratch")
+        self.assertEqual(bs_persistence.load_latest_snapshot("cached_seed")["goals"], [])
+
+    def test_cache_is_bounded(self):
+        with mock.patch.object(bs_persistence.config_loader, "get_brainstate_session_cache_size", return_value=2):
+            for job_seed in ("s1", "s2", "s3"):
+                self._save(job_seed, 1)
+            self.assertEqual(list(bs_persistence._sessions), ["s2", "s3"])
+            self.assertEqual(bs_persistence.load_latest_snapshot("s1")["tick_count"], 1)
+            self.assertEqual(list(bs_persistence._sessions), ["s3", "s1"])
+
+    def test_executor_looks_up_a_new_session_once(self):
+        deterministic.set_mode("DETERMINISTIC")
+        executor.execute("4 + 4", intent="math", seed="exec_session_seed", log_enabled=False)
+        self.assertIs(bs_persistence._sessions["exec_session_seed"], bs_persistence._NO_SNAPSHOT)
+
+        with mock.patch.object(persistence, "execute_query", wraps=persistence.execute_query) as queries:
+            output, _ = executor.execute("4 + 4", intent="math", seed="exec_session_seed", log_enabled=False)
+        self.assertEqual(output["text"], "8")
+        self.assertFalse([c for c in queries.call_args_list
+                          if "FROM brainstate_snapshots WHERE job_seed" in c.args[1]
+                          and c.args[2] == ("exec_session_seed",)])
+
+    def test_missing_session_is_cached_until_saved(self):
+        self.assertIsNone(bs_persistence.load_latest_snapshot("new_seed"))
+        with mock.patch.object(persistence, "get_connection", side_effect=AssertionError("DB read")):
+            self.assertIsNone(bs_persistence.load_latest_snapshot("new_seed"))
+
+        self._save("new_seed", 2)
+        self.assertEqual(self._query("SELECT session_seq, chain_length FROM brainstate_snapshots "
+                                     "WHERE job_seed = 'new_seed' ORDER BY session_seq"), [(1, 0), (2, 1)])
+        self.assertEqual(bs_persistence.load_latest_snapshot("new_seed")["tick_count"], 2)
+
+    def test_rollback_drops_cached_sessions(self):
+        self._save("rolled_back", 1)
+        bs = bs_persistence.load_latest_snapshot("rolled_back")
+        with self.assertRaises(RuntimeError):
+            with persistence.unit_of_work():
+                brainstate.tick(bs)
+                bs_persistence.save_snapshot(bs)
+                raise RuntimeError("request failed")
+        self.assertEqual(bs_persistence.load_latest_snapshot("rolled_back")["tick_count"], 1)
+
+    def test_migration_runs_on_a_table_the_app_created(self):
+        self._save("migrated", 2)
+        persistence.close_all()
+        spec = importlib.util.spec_from_file_location("migrate_template",
+                                                      os.path.join(MIGRATIONS, "migrate_template.py"))
+        migrate = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(migrate)
+        for _ in range(2):
+            migrate.run_migration_sqlite(DB_PATH, os.path.join(MIGRATIONS, "0011_brainstate_session_seq.sql"))
+        self.assertEqual(self._query("SELECT session_seq FROM brainstate_snapshots ORDER BY session_seq"),
+                         [(1,), (2,)])
+
+
+if __name__ == '__main__':
+    unittest.main()
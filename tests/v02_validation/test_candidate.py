@@ -105,5 +105,18 @@ class TestCandidateGenerator(unittest.TestCase):
         conflict_candidates = [c for c in candidates if c["features"]["governance_conflict_flag"]]
         self.assertGreater(len(conflict_candidates), 0, "No governance conflict detected")
 
+    def test_candidates_for_tags(self):
+        """Candidates can be built from the tag index for selected tags only."""
+        self.em.record_interaction("what is 2+2", "4", "math_agent")
+        self.em.record_interaction("what is 3*3", "9", "math_agent")
+        self.em.record_interaction("store my name as Alice", "Stored name as Alice", "profile_agent")
+
+        cg = CandidateGenerator(self.em)
+        candidates = cg.generate_candidates(max_episodes=10, tags=["math_calculation"])
+
+        self.assertEqual([c["cluster_key"] for c in candidates], ["math_calculation"])
+        # Other math episodes may share the database when the whole suite runs
+        self.assertGreaterEqual(candidates[0]["episodes_count"], 2)
+
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,96 @@
+import unittest
+import os
+import sqlite3
+import threading
+from mace.core import connection_pool
+from mace.ops import metrics
+
+DB_PATH = "pool_test.db"
+
+
+class TestSQLiteConnectionPool(unittest.TestCase):
+    def setUp(self):
+        connection_pool.close_all()
+        if os.path.exists(DB_PATH):
+            os.remove(DB_PATH)
+
+    def tearDown(self):
+        connection_pool.close_all()
+        if os.path.exists(DB_PATH):
+            os.remove(DB_PATH)
+
+    def test_close_returns_connection_for_reuse(self):
+        conn = connection_pool.get_sqlite_connection(DB_PATH)
+        self.assertIsInstance(conn, sqlite3.Connection)
+        conn.close()
+
+        reused_before = metrics.MetricsRegistry().get("db_pool_reused_total")
+        again = connection_pool.get_sqlite_connection(DB_PATH)
+        self.assertIs(again, conn)
+        self.assertEqual(metrics.MetricsRegistry().get("db_pool_reused_total"), reused_before + 1)
+        again.close()
+
+    def test_nested_checkouts_get_distinct_connections(self):
+        outer = connection_pool.get_sqlite_connection(DB_PATH)
+        inner = connection_pool.get_sqlite_connection(DB_PATH)
+        self.assertIsNot(outer, inner)
+        inner.close()
+        outer.close()
+
+    def test_uncommitted_work_rolled_back_on_close(self):
+        conn = connection_pool.get_sqlite_connection(DB_PATH)
+        conn.execute("CREATE TABLE t (v TEXT)")
+        conn.commit()
+        conn.execute("INSERT INTO t VALUES ('dirty')")
+        conn.close()
+
+        conn = connection_pool.get_sqlite_connection(DB_PATH)
+        try:
+            self.assertEqual(conn.execute("SELECT COUNT(*) FROM t").fetchone()[0], 0)
+        finally:
+            conn.close()
+
+    def test_deleted_file_is_not_reused(self):
+        conn = connection_pool.get_sqlite_connection(DB_PATH)
+        conn.execute("CREATE TABLE t (v TEXT)")
+        conn.commit()
+        conn.close()
+
+        os.remove(DB_PATH)
+
+        fresh = connection_pool.get_sqlite_connection(DB_PATH)
+        try:
+            self.assertIsNot(fresh, conn)
+            tables = fresh.execute("SELECT name FROM sqlite_master WHERE type='table'").fetchall()
+            self.assertEqual(tables, [])
+        finally:
+            fresh.close()
+
+    def test_connections_are_per_thread(self):
+        conn = connection_pool.get_sqlite_connection(DB_PATH)
+        conn.close()
+
+        seen = []
+        def worker():
+            c = connection_pool.get_sqlite_connection(DB_PATH)
+            seen.append(c)
+            c.close()
+
+        t = threading.Thread(target=worker)
+        t.start()
+        t.join()
+        self.assertIsNot(seen[0], conn)
+
+    def test_close_all_discards_idle(self):
+        conn = connection_pool.get_sqlite_connection(DB_PATH)
+        conn.close()
+        connection_pool.close_all()
+
+        fresh = connection_pool.get_sqlite_connection(DB_PATH)
+        self.assertIsNot(fresh, conn)
+        self.assertEqual(connection_pool.stats()["sqlite"]["in_use"], 1)
+        fresh.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
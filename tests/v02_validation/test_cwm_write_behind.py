@@ -0,0 +1,135 @@
+import unittest
+import os
+import sqlite3
+from unittest import mock
+from mace.core import persistence, deterministic
+from mace.memory import cwm
+from mace.memory.cwm import ContextualWorkingMemory
+
+DB_PATH = "cwm_write_behind_test.db"
+
+
+class TestCWMWriteBehind(unittest.TestCase):
+    def setUp(self):
+        cwm.close_sessions()
+        persistence.close_all()
+        if os.path.exists(DB_PATH):
+            os.remove(DB_PATH)
+        # A flush interval long enough that only barriers write during a test
+        self._patches = [
+            mock.patch.object(persistence, "_DB_URL", f"sqlite:///{DB_PATH}"),
+            mock.patch.object(cwm.config_loader, "get_cwm_flush_interval_ms", return_value=60000),
+        ]
+        for p in self._patches:
+            p.start()
+        cwm._table_initialized = False
+        deterministic.init_seed("cwm_write_behind_seed")
+
+    def tearDown(self):
+        cwm.close_sessions()
+        for p in reversed(self._patches):
+            p.stop()
+        persistence.close_all()
+        cwm._table_initialized = False
+        if os.path.exists(DB_PATH):
+            os.remove(DB_PATH)
+
+    def _stored(self, job_seed):
+        conn = sqlite3.connect(DB_PATH)
+        try:
+            rows = conn.execute("SELECT content_json FROM cwm_items WHERE job_seed = ? ORDER BY created_at",
+                                (job_seed,)).fetchall()
+        finally:
+            conn.close()
+        return [r[0] for r in rows]
+
+    def test_instances_share_the_session_buffer(self):
+        first = ContextualWorkingMemory(job_seed="shared")
+        second = ContextualWorkingMemory(job_seed="shared")
+        other = ContextualWorkingMemory(job_seed="other")
+        first.add({"turn": 1})
+        second.add({"turn": 2})
+        self.assertEqual([i["content"]["turn"] for i in first.get_all()], [1, 2])
+        self.assertEqual(len(second), 2)
+        self.assertEqual(len(other), 0)
+
+    def test_writes_are_batched_until_flush(self):
+        memory = ContextualWorkingMemory(job_seed="batched")
+        with mock.patch.object(persistence, "execute_many", wraps=persistence.execute_many) as spy:
+            for i in range(5):
+                memory.add({"turn": i})
+            self.assertEqual(self._stored("batched"), [])
+            cwm.flush()
+            self.assertEqual(spy.call_count, 1)
+        self.assertEqual(len(self._stored("batched")), 5)
+
+        # A process that has not seen the session loads it from the DB
+        cwm.close_sessions()
+        self.assertEqual([i["content"]["turn"] for i in ContextualWorkingMemory(job_seed="batched").get_all()],
+                         list(range(5)))
+
+    def test_eviction_deletes_flushed_rows(self):
+        memory = ContextualWorkingMemory(job_seed="evicting")
+        memory.max_capacity = 3
+        for i in range(5):
+            memory.add({"turn": i})
+        self.assertEqual([i["content"]["turn"] for i in memory.get_recent(3)], [2, 3, 4])
+        cwm.flush()
+        self.assertEqual(self._stored("evicting"), ['{"turn":2}', '{"turn":3}', '{"turn":4}'])
+
+    def test_end_session_is_a_flush_barrier(self):
+        promoted = []
+        memory = ContextualWorkingMemory(job_seed="ending", on_session_end_callback=promoted.extend)
+        memory.add({"turn": 1})
+        kept = ContextualWorkingMemory(job_seed="kept")
+        kept.add({"turn": 1})
+        self.assertEqual(len(memory.end_session()), 1)
+        self.assertEqual(len(promoted), 1)
+        self.assertEqual(self._stored("ending"), [])
+        self.assertEqual(len(self._stored("kept")), 1)
+        self.assertEqual(len(ContextualWorkingMemory(job_seed="ending")), 0)
+
+    def test_flush_inside_unit_of_work_survives_rollback(self):
+        memory = ContextualWorkingMemory(job_seed="in_request")
+        with self.assertRaises(RuntimeError):
+            with persistence.unit_of_work():
+                memory.add({"turn": 1})
+                memory.add({"turn": 2})
+                cwm.flush()  # Runs once the unit of work has ended
+                self.assertEqual(self._stored("in_request"), [])
+                raise RuntimeError("request failed")
+        self.assertEqual(self._stored("in_request"), ['{"turn":1}', '{"turn":2}'])
+        cwm.close_sessions()
+        self.assertEqual([i["content"]["turn"] for i in memory.get_all()], [1, 2])
+
+    def test_item_ids_are_unique_across_instances(self):
+        # Same content from two instances, with an ID counter that does not move
+        def fixed_counter_id(namespace, payload, counter=None):
+            return deterministic_id(namespace, payload, counter=0)
+
+        deterministic_id = deterministic.deterministic_id
+        with mock.patch.object(cwm.deterministic, "deterministic_id", side_effect=fixed_counter_id):
+            first = ContextualWorkingMemory(job_seed="ids")
+            second = ContextualWorkingMemory(job_seed="ids")
+            first.add({"turn": 1})
+            second.add({"turn": 1})
+            self.assertEqual(len({i["item_id"] for i in first.get_all()}), 2)
+
+            cwm.close_sessions()
+            self.assertEqual(len(self._stored("ids")), 2)
+            ContextualWorkingMemory(job_seed="ids").add({"turn": 1})
+            cwm.flush()
+            self.assertEqual(len(self._stored("ids")), 3)
+
+    def test_job_seed_index_exists(self):
+        ContextualWorkingMemory(job_seed="indexed")
+        conn = sqlite3.connect(DB_PATH)
+        try:
+            columns = [r[2] for r in conn.execute("PRAGMA index_info(idx_cwm_items_job_seed)")]
+        finally:
+            conn.close()
+        self.assertEqual(columns, ["job_seed", "created_at"])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,108 @@
+import unittest
+import os
+import json
+from unittest import mock
+from mace.core import durability, deterministic
+from mace.memory import semantic
+
+DB_PATH = "durability_test.db"
+SEM_DB_PATH = "mace_memory.db"
+JOURNAL = "logs/sem_write_journal.jsonl"
+
+
+def _remove_db(path):
+    for suffix in ("", "-wal", "-shm", "-journal"):
+        if os.path.exists(path + suffix):
+            os.remove(path + suffix)
+
+
+class TestDurabilityProfiles(unittest.TestCase):
+    def setUp(self):
+        _remove_db(DB_PATH)
+
+    def tearDown(self):
+        durability.flush()
+        _remove_db(DB_PATH)
+
+    def _connect(self, profile):
+        with mock.patch.dict(os.environ, {"MACE_DURABILITY_PROFILE": profile}):
+            return durability.connect(DB_PATH)
+
+    def test_default_profile_is_strict(self):
+        with mock.patch.dict(os.environ, {}, clear=False):
+            os.environ.pop("MACE_DURABILITY_PROFILE", None)
+            self.assertEqual(durability.get_profile(), "strict")
+
+    def test_unknown_profile_rejected(self):
+        with mock.patch.dict(os.environ, {"MACE_DURABILITY_PROFILE": "yolo"}):
+            with self.assertRaises(ValueError):
+                durability.get_profile()
+
+    def test_strict_pragmas(self):
+        conn = self._connect("strict")
+        try:
+            self.assertEqual(conn.execute("PRAGMA journal_mode").fetchone()[0], "delete")
+            self.assertEqual(conn.execute("PRAGMA synchronous").fetchone()[0], 2)  # FULL
+        finally:
+            conn.close()
+
+    def test_wal_pragmas(self):
+        conn = self._connect("wal")
+        try:
+            self.assertEqual(conn.execute("PRAGMA journal_mode").fetchone()[0], "wal")
+            self.assertEqual(conn.execute("PRAGMA synchronous").fetchone()[0], 1)  # NORMAL
+            self.assertEqual(conn.execute("PRAGMA busy_timeout").fetchone()[0], 5000)
+        finally:
+            conn.close()
+
+    def test_wal_reader_does_not_block_writer(self):
+        writer = self._connect("wal")
+        reader = self._connect("wal")
+        try:
+            writer.execute("CREATE TABLE t (v TEXT)")
+            writer.commit()
+            reader.execute("BEGIN")
+            reader.execute("SELECT * FROM t").fetchall()  # Open read snapshot
+            writer.execute("INSERT INTO t VALUES ('x')")
+            writer.commit()  # Would raise 'database is locked' under strict
+            self.assertEqual(reader.execute("SELECT COUNT(*) FROM t").fetchone()[0], 0)
+            reader.rollback()
+        finally:
+            reader.close()
+            writer.close()
+
+    def test_group_commit_commits_and_flushes(self):
+        conn = self._connect("group_commit")
+        try:
+            self.assertEqual(conn.execute("PRAGMA synchronous").fetchone()[0], 0)  # OFF
+            conn.execute("CREATE TABLE t (v TEXT)")
+            conn.execute("INSERT INTO t VALUES ('x')")
+            conn.commit()
+            durability.flush()
+            self.assertEqual(conn.execute("SELECT COUNT(*) FROM t").fetchone()[0], 1)
+        finally:
+            conn.close()
+
+    def test_sem_writes_identical_in_every_profile(self):
+        """Replay determinism depends on content, never on journal mode."""
+        deterministic.set_mode("DETERMINISTIC")
+        journals = {}
+        for profile in durability.PROFILES:
+            _remove_db(SEM_DB_PATH)
+            if os.path.exists(JOURNAL):
+                os.remove(JOURNAL)
+            with mock.patch.dict(os.environ, {"MACE_DURABILITY_PROFILE": profile}):
+                deterministic.init_seed("durability_seed")
+                semantic.put_sem("user/profile/u1/color", "blue", source="test")
+                semantic.put_sem("user/profile/u1/name", "ada", source="test")
+                self.assertEqual(semantic.get_sem("user/profile/u1/color")["value"], "blue")
+            with open(JOURNAL) as f:
+                journals[profile] = [json.loads(line) for line in f]
+        self.assertEqual(journals["strict"], journals["wal"])
+        self.assertEqual(journals["strict"], journals["group_commit"])
+        durability.flush()
+        _remove_db(SEM_DB_PATH)
+
+
+if __name__ == '__main__':
+    unittest.main()
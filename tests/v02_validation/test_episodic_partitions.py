@@ -0,0 +1,194 @@
+import unittest
+import os
+import gzip
+import sqlite3
+import datetime
+import tempfile
+import types
+from unittest import mock
+from mace.core import persistence
+from mace.memory import episodic_partitions
+from mace.memory.episodic import EpisodicMemory
+import mace.memory.episodic as eps
+
+DB_PATH = "episodic_partitions_test.db"
+
+
+class _Clock(datetime.datetime):
+    current = None
+
+    @classmethod
+    def now(cls, tz=None):
+        return cls.current
+
+
+def _at(ts):
+    _Clock.current = datetime.datetime.fromisoformat(ts)
+    return mock.patch.object(eps, "datetime", types.SimpleNamespace(datetime=_Clock, timezone=datetime.timezone))
+
+
+class TestEpisodicPartitions(unittest.TestCase):
+    def setUp(self):
+        persistence.close_all()
+        if os.path.exists(DB_PATH):
+            os.remove(DB_PATH)
+        self.tmp = tempfile.TemporaryDirectory()
+        self._patches = [
+            mock.patch.object(persistence, "_DB_URL", f"sqlite:///{DB_PATH}"),
+            mock.patch.object(eps, "get_knowledge_graph", side_effect=RuntimeError),
+            mock.patch.object(episodic_partitions.config_loader, "get_episodic_archive_dir",
+                              return_value=self.tmp.name),
+        ]
+        for p in self._patches:
+            p.start()
+        eps._table_initialized = False
+        self.em = EpisodicMemory(job_seed="part_seed")
+        for ts, text, agent in [
+            ("2025-01-10T08:00:00+00:00", "my name is Alice", "profile_agent"),
+            ("2025-01-20T08:00:00+00:00", "calculate 2 + 2", "math_agent"),
+            ("2025-02-03T08:00:00+00:00", "what is the capital of France", "knowledge_agent"),
+            ("2026-03-01T08:00:00+00:00", "calculate 10 * 5", "math_agent"),
+        ]:
+            with _at(ts):
+                self.em.record_interaction(text, "Stored it, Paris, 4, 50", agent)
+
+    def tearDown(self):
+        for p in reversed(self._patches):
+            p.stop()
+        episodic_partitions.close_archives()
+        persistence.close_all()
+        eps._table_initialized = False
+        self.tmp.cleanup()
+        if os.path.exists(DB_PATH):
+            os.remove(DB_PATH)
+
+    def _live(self):
+        conn = persistence.get_connection()
+        try:
+            return episodic_partitions.live_tables(conn)
+        finally:
+            conn.close()
+
+    def test_episodes_are_routed_by_month(self):
+        self.assertEqual(self._live(), ["episodic_p202603", "episodic_p202502", "episodic_p202501"])
+        self.assertEqual(episodic_partitions.month_of("2025-12-31T23:59:59+00:00"), "2025-12")
+        self.assertEqual(episodic_partitions.month_of(None), episodic_partitions.UNDATED_MONTH)
+        self.assertEqual(episodic_partitions.next_month("2025-12"), "2026-01")
+
+        recent = self.em.get_recent(3)
+        self.assertEqual([r["payload"]["percept_text"] for r in recent],
+                         ["calculate 10 * 5", "what is the capital of France", "calculate 2 + 2"])
+        self.assertEqual(len(self.em.get_session_history("part_seed")), 4)
+        self.assertEqual(self.em.get_session_history("part_seed")[0]["payload"]["percept_text"],
+                         "my name is Alice")
+        self.assertEqual(self.em.get(recent[2]["episodic_id"])["created_at"][:7], "2025-01")
+
+    def test_session_history_streams_across_partitions(self):
+        stream = self.em.iter_session_history("part_seed", batch_size=1)
+        self.assertEqual(next(stream)["payload"]["percept_text"], "my name is Alice")
+        self.assertEqual([r["payload"]["percept_text"] for r in stream],
+                         ["calculate 2 + 2", "what is the capital of France", "calculate 10 * 5"])
+        self.assertEqual(list(self.em.iter_session_history("part_seed", batch_size=3)),
+                         self.em.get_session_history("part_seed"))
+        self.assertEqual(list(self.em.iter_session_history("no_such_seed")), [])
+
+    def test_recent_queries_touch_only_hot_partitions(self):
+        with mock.patch.object(episodic_partitions, "connection_for",
+                               wraps=episodic_partitions.connection_for) as spy:
+            self.assertEqual(len(self.em.get_recent(1)), 1)
+            self.assertEqual(spy.call_count, 1)
+            spy.reset_mock()
+            results = self.em.search_content("calculate", since="2026-01-01")
+            self.assertEqual([r["payload"]["percept_text"] for r in results], ["calculate 10 * 5"])
+            self.assertEqual(spy.call_count, 1)
+            spy.reset_mock()
+            self.assertEqual(len(self.em.search_by_context("math_calculation", limit=2)), 2)
+            self.assertEqual(spy.call_count, 3)
+        # Without a window every partition is searched
+        self.assertEqual(len(self.em.search_content("calculate")), 2)
+        self.assertEqual(len(self.em.search_by_tags(any_of=["math_calculation", "fact_query"])), 3)
+
+    def test_failed_episode_in_a_savepoint_keeps_the_request(self):
+        conn = persistence.get_connection()
+        try:
+            persistence.execute_query(conn, "CREATE TABLE request_log (v TEXT)")
+            conn.commit()
+        finally:
+            conn.close()
+
+        with _at("2026-04-30T23:59:00+00:00"):
+            eps.prepare_partitions()  # As executor.execute does before its unit of work
+        with _at("2026-05-01T00:00:01+00:00"):  # First episode of a new month
+            with persistence.unit_of_work() as conn:
+                persistence.execute_query(conn, "INSERT INTO request_log VALUES ('logged')")
+                with self.assertRaises(RuntimeError):
+                    with persistence.savepoint("episodic_interaction"):
+                        self.em.record_interaction("my name is Bob", "Stored it", "profile_agent")
+                        raise RuntimeError("episodic step failed")
+
+        conn = sqlite3.connect(DB_PATH)
+        try:
+            self.assertEqual(conn.execute("SELECT v FROM request_log").fetchall(), [("logged",)])
+            self.assertEqual(conn.execute("SELECT COUNT(*) FROM episodic_p202605").fetchone(), (0,))
+        finally:
+            conn.close()
+
+    def test_legacy_table_is_partitioned(self):
+        persistence.close_all()
+        conn = sqlite3.connect(DB_PATH)
+        for table in self._live():
+            conn.execute(f"DROP TABLE {table}")
+            conn.execute(f"DROP TABLE {episodic_partitions.fts_for(table)}")
+        conn.execute("DROP TABLE episodic_tags")
+        conn.execute("""CREATE TABLE episodic (episodic_id TEXT PRIMARY KEY, job_seed TEXT, summary TEXT,
+                        payload_json TEXT, source_cwm_ids TEXT, interaction_type TEXT, created_at TEXT)""")
+        conn.executemany("INSERT INTO episodic VALUES (?, ?, ?, ?, ?, ?, ?)", [
+            ("e1", "old", "[math_calculation] calculate 1 + 1", '{"percept_text": "calculate 1 + 1", '
+             '"context_tags": ["math_calculation"]}', "[]", "interaction", "2024-11-02T00:00:00+00:00"),
+            ("e2", "old", "[fact_query] who is Ada", '{"percept_text": "who is Ada", '
+             '"context_tags": ["fact_query"]}', "[]", "interaction", "2024-12-02T00:00:00+00:00"),
+            ("e3", "old", "[general_context] undated", '{"percept_text": "undated"}', None, "interaction", None),
+        ])
+        conn.commit()
+        conn.close()
+
+        eps._table_initialized = False
+        em = EpisodicMemory()
+        self.assertEqual(self._live(), ["episodic_p202412", "episodic_p202411", "episodic_p000000"])
+        self.assertEqual([r["episodic_id"] for r in em.get_session_history("old")], ["e3", "e1", "e2"])
+        self.assertEqual(em.search_content("ada")[0]["episodic_id"], "e2")
+        self.assertEqual(em.search_by_context("math_calculation")[0]["episodic_id"], "e1")
+        self.assertEqual(em.get("e3")["payload"]["percept_text"], "undated")
+
+    def test_cold_partitions_are_archived(self):
+        self.assertEqual(episodic_partitions.cold_months(6, datetime.date(2026, 3, 15)), "2025-10")
+        archived = episodic_partitions.archive_partitions(before="2026-01")
+        self.assertEqual([(t, n) for t, n, _ in archived], [("episodic_p202501", 2), ("episodic_p202502", 1)])
+        self.assertEqual(self._live(), ["episodic_p202603"])
+        with gzip.open(archived[0][2]) as f:
+            self.assertEqual(f.read(16), b"SQLite format 3\x00")
+
+        # Cold episodes are only read on demand
+        self.assertEqual(len(self.em.get_recent(10)), 1)
+        self.assertEqual(len(self.em.get_recent(10, include_archived=True)), 4)
+        self.assertEqual(self.em.search_content("alice"), [])
+        alice = self.em.search_content("alice", include_archived=True)
+        self.assertEqual(len(alice), 1)
+        self.assertEqual(self.em.get(alice[0]["episodic_id"], include_archived=True), alice[0])
+        self.assertEqual(len(self.em.search_by_context("math_calculation", include_archived=True)), 2)
+        self.assertEqual(len(self.em.search_by_tags(all_of=["fact_query"], include_archived=True)), 1)
+        self.assertEqual(len(self.em.get_session_history("part_seed", include_archived=True)), 4)
+
+        # The live tag index no longer holds archived episodes
+        conn = persistence.get_connection()
+        try:
+            count = conn.execute("SELECT COUNT(*) FROM episodic_tags").fetchone()[0]
+        finally:
+            conn.close()
+        self.assertEqual(count, 2)
+        with self.assertRaises(ValueError):
+            episodic_partitions.archive_partitions(before="2026")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,126 @@
+import unittest
+import os
+import sqlite3
+import tempfile
+from unittest import mock
+from mace.core import persistence
+from mace.memory import episodic_partitions, episodic_payloads
+from mace.memory.episodic import EpisodicMemory
+import mace.memory.episodic as eps
+
+DB_PATH = "episodic_payloads_test.db"
+
+_VOLATILE = ("episodic_id", "created_at")
+
+
+def _stable(episode):
+    return {k: v for k, v in episode.items() if k not in _VOLATILE}
+
+
+class TestEpisodicPayloadDedup(unittest.TestCase):
+    def setUp(self):
+        persistence.close_all()
+        if os.path.exists(DB_PATH):
+            os.remove(DB_PATH)
+        self.tmp = tempfile.TemporaryDirectory()
+        self._patches = [
+            mock.patch.object(persistence, "_DB_URL", f"sqlite:///{DB_PATH}"),
+            mock.patch.object(eps, "get_knowledge_graph", side_effect=RuntimeError),
+            mock.patch.object(episodic_partitions.config_loader, "get_episodic_archive_dir",
+                              return_value=self.tmp.name),
+        ]
+        for p in self._patches:
+            p.start()
+        eps._table_initialized = False
+        self.em = EpisodicMemory(job_seed="dedup_seed")
+
+    def tearDown(self):
+        for p in reversed(self._patches):
+            p.stop()
+        episodic_partitions.close_archives()
+        persistence.close_all()
+        eps._table_initialized = False
+        self.tmp.cleanup()
+        if os.path.exists(DB_PATH):
+            os.remove(DB_PATH)
+
+    def _record(self, dedup):
+        with mock.patch.object(eps.config_loader, "get_episodic_payload_dedup", return_value=dedup):
+            for i in range(3):
+                self.em.record_interaction("calculate 2 + 2", "The answer is 4", "math_agent",
+                                           metadata={"confidence": 0.9, "turn": i})
+            self.em.record_interaction("hello there", "Hi!", "general_agent")
+            self.em.record_session_end([{"item_id": "cwm_1", "content": "greeting", "source_wm_id": "wm_1"}])
+
+    def _count(self, sql):
+        conn = persistence.get_connection()
+        try:
+            return conn.execute(sql).fetchone()[0]
+        finally:
+            conn.close()
+
+    def test_repeated_payloads_are_stored_once(self):
+        self._record(dedup=True)
+        self.assertEqual(self._count("SELECT COUNT(*) FROM episodic_payloads"), 3)
+        history = self.em.get_session_history("dedup_seed")
+        self.assertEqual(len(history), 5)
+        self.assertEqual([e["payload"]["metadata"].get("turn") for e in history[:3]], [0, 1, 2])
+
+        hashes = {episodic_payloads.split(e["payload"])[0] for e in history[:3]}
+        self.assertEqual(len(hashes), 1)
+
+    def test_returned_episodes_are_unchanged(self):
+        self._record(dedup=False)
+        plain = [_stable(e) for e in self.em.get_session_history("dedup_seed")]
+        self.assertEqual(self._count("SELECT COUNT(*) FROM episodic_payloads"), 0)
+
+        self.em.job_seed = "dedup_seed_2"
+        self._record(dedup=True)
+        deduped = [dict(_stable(e), job_seed="dedup_seed") for e in self.em.get_session_history("dedup_seed_2")]
+        self.assertEqual(deduped, plain)
+        self.assertEqual([list(e["payload"]) for e in deduped], [list(e["payload"]) for e in plain])
+
+    def test_search_and_archive_see_deduplicated_bodies(self):
+        self._record(dedup=True)
+        self.assertEqual(len(self.em.search_content("answer is 4")), 3)
+        self.assertEqual(len(self.em.search_by_context("math_calculation")), 3)
+        with mock.patch.object(eps, "_fts_enabled", False):
+            self.assertEqual(len(self.em.search_content("answer is 4")), 3)
+            self.assertEqual(len(self.em.search_by_keywords(["hello", "cwm_1"])), 2)
+
+        # Rebuilt indexes read the bodies from episodic_payloads
+        table = episodic_partitions.table_for(
+            episodic_partitions.month_of(self.em.get_recent(1)[0]["created_at"]))
+        persistence.close_all()
+        conn = sqlite3.connect(DB_PATH)
+        conn.execute(f"DROP TABLE {episodic_partitions.fts_for(table)}")
+        conn.execute("DROP TABLE episodic_tags")
+        conn.commit()
+        conn.close()
+        eps._table_initialized = False
+        em = EpisodicMemory()
+        self.assertEqual(len(em.search_content("answer is 4")), 3)
+        self.assertEqual(len(em.search_by_tags(all_of=["math_calculation", "addition"])), 3)
+
+        episodic_partitions.archive_partitions(before="9999-01")
+        self.assertEqual(em.get_recent(10), [])
+        archived = em.search_content("answer is 4", include_archived=True)
+        self.assertEqual([e["payload"]["metadata"]["turn"] for e in archived[:1]], [2])
+        self.assertEqual(len(em.get_session_history("dedup_seed", include_archived=True)), 5)
+
+    def test_archived_bodies_survive_cache_eviction(self):
+        self._record(dedup=True)
+        episodic_partitions.archive_partitions(before="9999-01")
+        conn = sqlite3.connect(DB_PATH)
+        conn.execute("DELETE FROM episodic_payloads")  # Bodies now live in the archive only
+        conn.commit()
+        conn.close()
+        with mock.patch.object(episodic_payloads, "_CACHE_MAX_ENTRIES", 0):
+            episodic_payloads._cache.clear()
+            history = self.em.get_session_history("dedup_seed", include_archived=True)
+            self.assertEqual([e["payload"]["metadata"].get("turn") for e in history[:3]], [0, 1, 2])
+            self.assertEqual(len(self.em.search_content("answer is 4", include_archived=True)), 3)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,142 @@
+import unittest
+import os
+import sqlite3
+from unittest import mock
+from mace.core import persistence
+from mace.memory.episodic import EpisodicMemory
+from mace.memory import episodic_partitions
+import mace.memory.episodic as eps
+
+DB_PATH = "episodic_search_test.db"
+MIGRATIONS = os.path.join(os.path.dirname(__file__), "..", "..", "migrations")
+
+
+class TestEpisodicSearch(unittest.TestCase):
+    def setUp(self):
+        persistence.close_all()
+        if os.path.exists(DB_PATH):
+            os.remove(DB_PATH)
+        self._url = mock.patch.object(persistence, "_DB_URL", f"sqlite:///{DB_PATH}")
+        self._url.start()
+        eps._table_initialized = False
+        self.em = EpisodicMemory(job_seed="search_seed")
+        with mock.patch.object(eps, "get_knowledge_graph", side_effect=RuntimeError):
+            self.em.record_interaction("my name is Alice", "Stored name as Alice", "profile_agent")
+            self.em.record_interaction("calculate 10 * 5", "The answer is 50", "math_agent")
+            self.em.record_interaction("what is the capital of France", "Paris", "knowledge_agent",
+                                       job_seed="other_seed")
+            self.em.record_interaction("capital of France again", "Still Paris", "knowledge_agent")
+
+    def _fts_table(self):
+        month = episodic_partitions.month_of(self.em.get_recent(1)[0]["created_at"])
+        return episodic_partitions.fts_for(episodic_partitions.table_for(month))
+
+    def tearDown(self):
+        self._url.stop()
+        persistence.close_all()
+        eps._table_initialized = False
+        if os.path.exists(DB_PATH):
+            os.remove(DB_PATH)
+
+    def test_search_uses_fts_index(self):
+        self.assertTrue(eps._fts_enabled)
+        results = self.em.search_content("10")
+        self.assertEqual([r["payload"]["percept_text"] for r in results], ["calculate 10 * 5"])
+        # Words of the response text are indexed too; the last word matches as a prefix
+        self.assertEqual(len(self.em.search_content("answer is 5")), 1)
+        self.assertEqual(self.em.search_content("Stored name"), self.em.search_content("stored NAME"))
+        # Payload keys (agent ids, metadata) are not matched
+        self.assertEqual(self.em.search_content("profile_agent"), [])
+
+    def test_keywords_and_filters(self):
+        both = self.em.search_by_keywords(["capital", "paris"], match_all=True)
+        self.assertEqual(len(both), 2)
+        self.assertEqual(len(self.em.search_by_keywords(["alice", "paris"])), 3)
+        self.assertEqual(len(self.em.search_by_keywords(["alice", "paris"], match_all=True)), 0)
+
+        mine = self.em.search_by_keywords(["paris"], job_seed="search_seed")
+        self.assertEqual([r["job_seed"] for r in mine], ["search_seed"])
+        created = self.em.search_content("paris", job_seed="other_seed")[0]["created_at"]
+        self.assertEqual(len(self.em.search_content("paris", since=created)), 2)
+        self.assertEqual(len(self.em.search_content("paris", until=created)), 0)
+
+    def test_search_by_context_tag(self):
+        results = self.em.search_by_context("math_calculation")
+        self.assertEqual([r["payload"]["percept_text"] for r in results], ["calculate 10 * 5"])
+        # Secondary tags are matched too, not only the [primary] one in the summary
+        self.assertEqual(len(self.em.search_by_context("multiplication")), 1)
+        self.assertEqual(len(self.em.search_by_context("fact_query", job_seed="other_seed")), 1)
+
+    def test_search_by_tags(self):
+        self.assertEqual(len(self.em.search_by_tags(all_of=["fact_query"])), 2)
+        both = self.em.search_by_tags(all_of=["math_calculation", "multiplication"])
+        self.assertEqual([r["payload"]["percept_text"] for r in both], ["calculate 10 * 5"])
+        self.assertEqual(self.em.search_by_tags(all_of=["math_calculation", "fact_query"]), [])
+
+        either = self.em.search_by_tags(any_of=["math_calculation", "fact_query"])
+        self.assertEqual(len(either), 3)
+        self.assertEqual(either, sorted(either, key=lambda r: r["created_at"], reverse=True))
+        self.assertEqual(len(self.em.search_by_tags(any_of=["math_calculation", "fact_query"], limit=2)), 2)
+        self.assertEqual(len(self.em.search_by_tags(all_of=["fact_query"], any_of=["location_query", "math_calculation"])), 0)
+        self.assertEqual(self.em.search_by_tags(), [])
+
+    def test_tag_index_is_backfilled(self):
+        persistence.close_all()
+        conn = sqlite3.connect(DB_PATH)
+        conn.execute("DROP TABLE episodic_tags")
+        conn.commit()
+        conn.close()
+
+        eps._table_initialized = False
+        em = EpisodicMemory()
+        self.assertEqual(len(em.search_by_tags(any_of=["fact_query", "math_calculation"])), 3)
+
+    def test_tag_index_created_empty_by_migration_is_backfilled(self):
+        persistence.close_all()
+        conn = sqlite3.connect(DB_PATH)
+        conn.execute("DROP TABLE episodic_tags")
+        with open(os.path.join(MIGRATIONS, "0007_episodic_tags.sql")) as f:
+            conn.executescript(f.read())
+        conn.commit()
+        conn.close()
+
+        eps._table_initialized = False
+        em = EpisodicMemory()
+        self.assertEqual(len(em.search_by_tags(any_of=["fact_query", "math_calculation"])), 3)
+
+    def test_replaced_episode_is_reindexed(self):
+        existing = self.em.search_content("alice")[0]["episodic_id"]
+        with mock.patch.object(eps, "get_knowledge_graph", side_effect=RuntimeError), \
+                mock.patch.object(eps.deterministic, "deterministic_id", return_value=existing):
+            self.em.record_interaction("my name is Alicia", "Stored name as Alicia", "profile_agent")
+        self.assertEqual([r["episodic_id"] for r in self.em.search_content("alicia")], [existing])
+        self.assertEqual(self.em.search_content("alice"), [])  # Old text left the index
+        self.assertEqual(len(self.em.search_by_context("stored_name_context")), 1)
+        conn = persistence.get_connection()
+        try:
+            count = conn.execute(f"SELECT COUNT(*) FROM {self._fts_table()}").fetchone()[0]
+        finally:
+            conn.close()
+        self.assertEqual(count, 4)
+
+    def test_index_is_backfilled_for_existing_episodes(self):
+        fts = self._fts_table()
+        persistence.close_all()
+        conn = sqlite3.connect(DB_PATH)
+        conn.execute(f"DROP TABLE {fts}")
+        conn.commit()
+        conn.close()
+
+        eps._table_initialized = False
+        em = EpisodicMemory()
+        self.assertEqual(len(em.search_content("france")), 2)
+
+    def test_like_fallback_without_fts(self):
+        with mock.patch.object(eps, "_fts_enabled", False):
+            self.assertEqual(len(self.em.search_content("profile_agent")), 1)
+            self.assertEqual(len(self.em.search_by_keywords(["capital", "paris"], match_all=True)), 2)
+            self.assertEqual(len(self.em.search_by_context("math_calculation")), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -100,7 +100,7 @@ class TestGoldenSuite(unittest.TestCase):
         # Mock StorageBackend.put to return False
         original_put = storage_backend.StorageBackend.put
         
-        def mock_put(self, key, value, ts):
+        def mock_put(self, key, value, ts, write_counter=None):
             return False
             
         storage_backend.StorageBackend.put = mock_put
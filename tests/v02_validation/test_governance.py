@@ -1,8 +1,10 @@
 import unittest
 import os
 import json
+from unittest import mock
 from mace.memory import semantic
 from mace.governance import amendment
+from mace.ops import metrics
 
 from mace.core import deterministic
 
@@ -63,5 +65,43 @@ class TestGovernance(unittest.TestCase):
             print(f"DEBUG: Allowed key failed: {res}")
         self.assertTrue(res["success"])
 
+    def test_policy_index_not_recompiled_when_unchanged(self):
+        """Unchanged file: checks reuse the compiled index."""
+        registry = metrics.MetricsRegistry()
+        amendment.check_policy("block_key", "user/profile/test/banned_key")
+        reloads = registry.get("amendment_policy_reloads_total")
+        with mock.patch.object(amendment, "_RACY_WINDOW_NS", 0):
+            os.utime("amendments.jsonl", ns=(1, 1))  # Touch: stat changes, content does not
+            for _ in range(10):
+                self.assertTrue(amendment.check_policy("block_key", "user/profile/test/banned_key"))
+        self.assertEqual(registry.get("amendment_policy_reloads_total"), reloads)
+
+    def test_policy_index_reloads_on_change(self):
+        """Same size, same mtime: the content hash still catches the edit."""
+        self.assertTrue(amendment.check_policy("block_key", "user/profile/test/banned_key"))
+        st = os.stat("amendments.jsonl")
+        with open("amendments.jsonl", "r") as f:
+            content = f.read()
+        with open("amendments.jsonl", "w") as f:
+            f.write(content.replace("banned_key", "banned_kez"))
+        os.utime("amendments.jsonl", ns=(st.st_atime_ns, st.st_mtime_ns))
+
+        self.assertFalse(amendment.check_policy("block_key", "user/profile/test/banned_key"))
+        self.assertTrue(amendment.check_policy("block_key", "user/profile/test/banned_kez"))
+
+    def test_corrupt_file_fails_halt_on_every_check(self):
+        """Corruption after a good load is never masked by the cached index."""
+        self.assertTrue(amendment.check_policy("block_key", "user/profile/test/banned_key"))
+        with open("amendments.jsonl", "a") as f:
+            f.write("{not json\n")
+        for _ in range(2):
+            with self.assertRaises(amendment.GovernanceViolation):
+                amendment.check_policy("block_key", "user/profile/test/banned_key")
+
+    def test_removed_file_clears_policies(self):
+        self.assertTrue(amendment.check_policy("block_key", "user/profile/test/banned_key"))
+        os.remove("amendments.jsonl")
+        self.assertFalse(amendment.check_policy("block_key", "user/profile/test/banned_key"))
+
 if __name__ == '__main__':
     unittest.main()
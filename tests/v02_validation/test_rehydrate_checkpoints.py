@@ -0,0 +1,151 @@
+import unittest
+import os
+import sqlite3
+import datetime
+import tempfile
+import types
+from unittest import mock
+from mace.core import persistence, rehydrate
+from mace.brainstate import brainstate
+from mace.memory import episodic_partitions
+from mace.memory.episodic import EpisodicMemory
+import mace.memory.episodic as eps
+
+DB_PATH = "rehydrate_checkpoints_test.db"
+
+_START = datetime.datetime(2025, 12, 20, tzinfo=datetime.timezone.utc)
+
+
+class _Clock(datetime.datetime):
+    current = None
+
+    @classmethod
+    def now(cls, tz=None):
+        return cls.current
+
+
+class TestRehydrateCheckpoints(unittest.TestCase):
+    def setUp(self):
+        persistence.close_all()
+        if os.path.exists(DB_PATH):
+            os.remove(DB_PATH)
+        self.tmp = tempfile.TemporaryDirectory()
+        self._patches = [
+            mock.patch.object(persistence, "_DB_URL", f"sqlite:///{DB_PATH}"),
+            mock.patch.object(eps, "get_knowledge_graph", side_effect=RuntimeError),
+            mock.patch.object(episodic_partitions.config_loader, "get_episodic_archive_dir",
+                              return_value=self.tmp.name),
+            mock.patch.object(eps, "datetime", types.SimpleNamespace(datetime=_Clock, timezone=datetime.timezone)),
+        ]
+        for p in self._patches:
+            p.start()
+        eps._table_initialized = False
+        rehydrate._table_initialized = False
+        self.em = EpisodicMemory(job_seed="rehydrate_seed")
+        self.recorded = 0
+
+    def tearDown(self):
+        for p in reversed(self._patches):
+            p.stop()
+        episodic_partitions.close_archives()
+        persistence.close_all()
+        eps._table_initialized = False
+        rehydrate._table_initialized = False
+        self.tmp.cleanup()
+        if os.path.exists(DB_PATH):
+            os.remove(DB_PATH)
+
+    def _record(self, n):
+        """Record n state episodes, one per day from 2025-12-20 (across a month boundary)."""
+        for _ in range(n):
+            self._record_at(_START + datetime.timedelta(days=self.recorded), self.recorded)
+            self.recorded += 1
+
+    def _record_at(self, when, i):
+        _Clock.current = when
+        payload = {"goals": [f"goal {i % 4}"], "working_memory": [{"memory_id": f"m{i}", "content": i}]}
+        self.em._add_episode(f"state {i}", payload, "rehydrate_seed", "state", [])
+
+    def _checkpoint(self):
+        conn = sqlite3.connect(DB_PATH)
+        try:
+            return conn.execute("SELECT last_episodic_id, episodes_applied FROM rehydrate_checkpoints "
+                                "WHERE job_seed = 'rehydrate_seed'").fetchone()
+        finally:
+            conn.close()
+
+    def _full_rebuild(self):
+        """Rebuild from scratch, without touching the stored checkpoint."""
+        with mock.patch.object(rehydrate, "_load_seed", return_value=None), \
+                mock.patch.object(rehydrate, "_save_checkpoint"):
+            return rehydrate.rebuild_brainstate("rehydrate_seed")
+
+    def test_rebuild_streams_all_episodes(self):
+        self.assertIsNone(rehydrate.rebuild_brainstate("rehydrate_seed"))
+        self._record(20)
+        progress = []
+        bs = rehydrate.rebuild_brainstate("rehydrate_seed", on_progress=progress.append,
+                                          checkpoint_every=8, batch_size=3)
+        self.assertEqual(progress, list(range(1, 21)))
+        self.assertEqual(bs["goals"], ["goal 0", "goal 1", "goal 2", "goal 3"])
+        self.assertEqual([item["memory_id"] for item in bs["working_memory"]],
+                         [f"m{i}" for i in range(13, 20)])
+        self.assertEqual(self._checkpoint()[1], 20)
+
+    def test_rebuild_resumes_from_checkpoint(self):
+        self._record(10)
+        with mock.patch.object(rehydrate, "_save_checkpoint", wraps=rehydrate._save_checkpoint) as saves:
+            rehydrate.rebuild_brainstate("rehydrate_seed", checkpoint_every=4)
+        self.assertEqual(saves.call_count, 3)  # After 4 and 8 episodes, and at the end
+
+        self._record(5)
+        progress = []
+        bs = rehydrate.rebuild_brainstate("rehydrate_seed", on_progress=progress.append)
+        self.assertEqual(progress, [1, 2, 3, 4, 5])
+        self.assertEqual(self._checkpoint()[1], 15)
+        self.assertEqual(bs, self._full_rebuild())
+
+        # Nothing new: the checkpoint is the answer
+        progress.clear()
+        self.assertEqual(rehydrate.rebuild_brainstate("rehydrate_seed", on_progress=progress.append), bs)
+        self.assertEqual(progress, [])
+
+    def test_checkpoint_keeps_exact_values(self):
+        rehydrate._ensure_table_exists()
+        bs = brainstate.create_snapshot("rehydrate_seed")
+        bs["attention_gain"] = 0.1 + 0.2
+        bs["goals"] = ["\ufb01le"]  # Not NFKD-normalized
+        rehydrate._save_checkpoint("rehydrate_seed", bs, ("2025-12-20T00:00:00+00:00", "e1"), {}, 1)
+        self.assertEqual(rehydrate._load_checkpoint("rehydrate_seed")["state"], bs)
+
+    def test_resume_picks_up_episodes_committed_late(self):
+        self._record_at(_START, 0)
+        self._record_at(_START + datetime.timedelta(seconds=20), 1)
+        rehydrate.rebuild_brainstate("rehydrate_seed")
+
+        # Created before the checkpoint, committed after it
+        self._record_at(_START + datetime.timedelta(seconds=10), 2)
+        self._record_at(_START + datetime.timedelta(seconds=30), 3)
+        progress = []
+        bs = rehydrate.rebuild_brainstate("rehydrate_seed", on_progress=progress.append)
+        self.assertEqual(progress, [1, 2])
+        self.assertEqual([item["memory_id"] for item in bs["working_memory"]], ["m0", "m1", "m2", "m3"])
+        self.assertEqual(self._checkpoint()[1], 4)
+
+    def test_rebuild_reads_stage1_episodic_table(self):
+        persistence.close_all()
+        conn = sqlite3.connect(DB_PATH)
+        for table in episodic_partitions.live_tables(conn):
+            conn.execute(f"DROP TABLE {table}")
+        conn.execute("CREATE TABLE episodic (episodic_id TEXT PRIMARY KEY, job_seed TEXT, summary TEXT, "
+                     "payload JSONB, created_seeded_ts TEXT, provenance JSONB)")
+        conn.execute("INSERT INTO episodic VALUES ('e1', 'stage1_job', 'goal', '{\"goals\": [\"ship\"]}', "
+                     "'2024-05-01T00:00:00+00:00', NULL)")
+        conn.commit()
+        conn.close()
+        eps._table_initialized = False
+        self.assertEqual(rehydrate.rebuild_brainstate("stage1_job")["goals"], ["ship"])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,103 @@
+import unittest
+import os
+import json
+from unittest import mock
+from mace.memory import semantic
+from mace.core import deterministic
+
+JOURNAL = "logs/sem_write_journal.jsonl"
+
+ITEMS = [
+    ("user/profile/u1/name", "ada"),
+    ("user/profile/u1/age", 36),
+    ("bad key", "x"),
+    ("user/profile/u1/ssn", "123-45-6789"),
+    ("user/profile/u1/prefs", {"tags": ["a", "b"]}),
+    ("user/profile/u1/name", "ada lovelace"),
+]
+
+
+class TestSEMBatch(unittest.TestCase):
+    def setUp(self):
+        deterministic.set_mode("DETERMINISTIC")
+        semantic.set_store(semantic.LiveSEMStore())
+        self._reset()
+
+    def tearDown(self):
+        self._reset()
+
+    def _reset(self):
+        semantic.close_live_stores()
+        for path in (JOURNAL, "mace_memory.db"):
+            if os.path.exists(path):
+                os.remove(path)
+
+    def _journal(self):
+        with open(JOURNAL) as f:
+            return [json.loads(line) for line in f]
+
+    def _state(self):
+        return {k: semantic.get_sem(k) for k, _ in ITEMS if k != "bad key"}
+
+    def test_batch_matches_sequential_puts(self):
+        deterministic.init_seed("batch_seed")
+        sequential = [semantic.put_sem(k, v, source="bulk") for k, v in ITEMS]
+        seq_journal = self._journal()
+        seq_state = self._state()
+
+        self._reset()
+        deterministic.init_seed("batch_seed")
+        batched = semantic.put_sem_many(ITEMS, source="bulk")
+
+        self.assertEqual(batched, sequential)
+        self.assertEqual(self._journal(), seq_journal)
+        self.assertEqual(self._state(), seq_state)
+        self.assertEqual(semantic.get_sem("user/profile/u1/name")["value"], "ada lovelace")
+
+    def test_amendments_loaded_once(self):
+        deterministic.init_seed("batch_seed")
+        with mock.patch.object(semantic.amendment._policy_index, "get", return_value={
+            ("block_key", "user/profile/u1/age"): True
+        }) as policies:
+            results = semantic.put_sem_many(ITEMS)
+        self.assertEqual(policies.call_count, 1)
+        self.assertEqual(results[1], {"success": False, "error": "POLICY_BLOCKED"})
+
+    def test_failed_write_is_all_or_nothing(self):
+        deterministic.init_seed("batch_seed")
+        with mock.patch.object(semantic.LiveSEMStore, "put_many", return_value=False):
+            results = semantic.put_sem_many([("user/profile/u1/a", 1), ("user/profile/u1/b", 2)])
+        self.assertEqual([r["error"] for r in results], ["DB_WRITE_FAILED"] * 2)
+        self.assertFalse(os.path.exists(JOURNAL))
+
+    def test_get_many_matches_get(self):
+        deterministic.init_seed("batch_seed")
+        semantic.put_sem_many(ITEMS)
+        keys = ["user/profile/u1/name", "user/profile/u1/missing", "user/profile/u1/prefs"]
+        semantic.get_sem("user/profile/u1/name")  # One key already cached
+
+        semantic.start_capture()
+        batched = semantic.get_sem_many(keys)
+        batch_capture = semantic.stop_capture()
+
+        semantic.start_capture()
+        single = {k: semantic.get_sem(k) for k in keys}
+        single_capture = semantic.stop_capture()
+
+        self.assertEqual(batched, single)
+        self.assertEqual(batch_capture, single_capture)
+        self.assertFalse(batched["user/profile/u1/missing"]["exists"])
+
+    def test_replay_store_batch(self):
+        semantic.set_store(semantic.ReplaySEMStore({"user/profile/u1/name": "ada"}))
+        deterministic.init_seed("batch_seed")
+        results = semantic.put_sem_many([("user/profile/u1/age", 36)])
+        self.assertTrue(results[0]["success"])
+        self.assertFalse(os.path.exists(JOURNAL))
+        got = semantic.get_sem_many(["user/profile/u1/name", "user/profile/u1/nope"])
+        self.assertEqual(got["user/profile/u1/name"]["value"], "ada")
+        self.assertFalse(got["user/profile/u1/nope"]["exists"])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,112 @@
+import unittest
+import os
+import json
+import sqlite3
+from unittest import mock
+from mace.memory import semantic, sem_bloom
+from mace.core import deterministic
+from mace.ops import metrics
+
+
+class TestSEMBloom(unittest.TestCase):
+    def setUp(self):
+        deterministic.set_mode("DETERMINISTIC")
+        deterministic.init_seed("sem_bloom_seed")
+        self.enabled = mock.patch.object(semantic.config_loader, "get_sem_bloom_enabled", return_value=True)
+        self.enabled.start()
+        semantic.close_live_stores()
+        semantic.set_store(semantic.LiveSEMStore())
+        self.registry = metrics.MetricsRegistry()
+
+    def tearDown(self):
+        semantic.close_live_stores()
+        self.enabled.stop()
+        if os.path.exists("mace_memory.db.bloom"):
+            os.remove("mace_memory.db.bloom")
+
+    def test_filter_basics(self):
+        bloom = sem_bloom.BloomFilter(100, 0.01)
+        for i in range(100):
+            bloom.add(f"user/profile/u{i}/name")
+        self.assertTrue(all(f"user/profile/u{i}/name" in bloom for i in range(100)))
+        false_positives = sum(f"user/profile/x{i}/name" in bloom for i in range(1000))
+        self.assertLess(false_positives, 50)
+
+    def test_miss_skips_database_and_is_traced(self):
+        semantic.put_sem("user/profile/u1/name", "ada")
+        skipped = self.registry.get("sem_bloom_skipped_reads_total")
+
+        semantic.start_capture()
+        res = semantic.get_sem("user/profile/u1/age")
+        captured = semantic.stop_capture()
+
+        self.assertFalse(res["exists"])
+        self.assertEqual(captured["reads"]["user/profile/u1/age"], {"value": None, "exists": False})
+        self.assertEqual(self.registry.get("sem_bloom_skipped_reads_total"), skipped + 1)
+        self.assertEqual(semantic.get_sem("user/profile/u1/name")["value"], "ada")
+
+    def test_put_many_updates_filter(self):
+        semantic.put_sem_many([("user/profile/u2/a", 1), ("user/profile/u2/b", 2)])
+        got = semantic.get_sem_many(["user/profile/u2/a", "user/profile/u2/b", "user/profile/u2/c"])
+        self.assertEqual([r["exists"] for r in got.values()], [True, True, False])
+
+    def test_writes_from_other_connections_are_seen(self):
+        semantic.get_sem("user/profile/u3/name")  # Open store + filters
+        conn = sqlite3.connect("mace_memory.db")
+        conn.execute("INSERT INTO sem_kv VALUES ('user/profile/u3/name', '\"zed\"', 't')")
+        conn.execute("INSERT INTO sem_versions (canonical_key, value, last_updated) "
+                     "VALUES ('user/profile/u3/name', '\"zed\"', 't')")
+        conn.commit()
+        conn.close()
+        semantic._read_cache.clear()
+        self.assertEqual(semantic.get_sem("user/profile/u3/name")["value"], "zed")
+
+    def test_warm_start_from_saved_filters(self):
+        semantic.put_sem("user/profile/u4/name", "ada")
+        semantic.close_live_stores()  # Saves the filters
+        self.assertTrue(os.path.exists("mace_memory.db.bloom"))
+
+        warm = self.registry.get("sem_bloom_warm_starts_total")
+        self.assertEqual(semantic.get_sem("user/profile/u4/name")["value"], "ada")
+        self.assertEqual(self.registry.get("sem_bloom_warm_starts_total"), warm + 1)
+        self.assertFalse(semantic.get_sem("user/profile/u4/age")["exists"])
+
+    def test_saved_filters_for_another_db_are_ignored(self):
+        semantic.put_sem("user/profile/u5/name", "ada")
+        semantic.close_live_stores()
+        os.remove("mace_memory.db")
+        builds = self.registry.get("sem_bloom_builds_total")
+        self.assertFalse(semantic.get_sem("user/profile/u5/name")["exists"])
+        self.assertEqual(self.registry.get("sem_bloom_builds_total"), builds + 1)
+
+    def test_saved_filters_for_a_db_that_reused_the_inode_are_ignored(self):
+        semantic.put_sem("user/profile/u7/name", "ada")
+        semantic.close_live_stores()
+        with open("mace_memory.db.bloom") as f:
+            stale = json.load(f)
+        os.remove("mace_memory.db")
+
+        # A new database; pretend it landed on the old file's inode
+        semantic.put_sem("user/profile/u8/name", "bob")
+        semantic.close_live_stores()
+        with open("mace_memory.db.bloom") as f:
+            fresh = json.load(f)
+        with open("mace_memory.db.bloom", "w") as f:
+            json.dump(stale, f)
+
+        self.assertNotEqual(stale["database_id"], fresh["database_id"])
+        self.assertEqual(semantic.get_sem("user/profile/u8/name")["value"], "bob")
+
+    def test_namespace_resizes_without_false_negatives(self):
+        store = semantic.LiveSEMStore()
+        with mock.patch.object(semantic.config_loader, "get_sem_bloom_min_capacity", return_value=4):
+            semantic.close_live_stores()
+            semantic.put_sem_many([(f"user/profile/u6/k{i}", i) for i in range(20)])
+            semantic._read_cache.clear()
+            got = semantic.get_sem_many([f"user/profile/u6/k{i}" for i in range(20)])
+        self.assertTrue(all(r["exists"] for r in got.values()))
+        self.assertGreaterEqual(store._blooms["mace_memory.db"].filters["user/profile/u6"].capacity, 20)
+
+
+if __name__ == '__main__':
+    unittest.main()
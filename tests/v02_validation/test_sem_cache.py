@@ -0,0 +1,103 @@
+import unittest
+from mace.memory import semantic, sem_cache, sem_shards
+from mace.core import deterministic
+from mace.ops import metrics
+
+
+class TestSEMReadCache(unittest.TestCase):
+    def setUp(self):
+        deterministic.set_mode("DETERMINISTIC")
+        deterministic.init_seed("sem_cache_seed")
+        semantic.set_store(semantic.LiveSEMStore())
+        self.registry = metrics.MetricsRegistry()
+
+    def tearDown(self):
+        semantic.set_store(semantic.LiveSEMStore())
+
+    def test_second_read_is_a_hit(self):
+        semantic.put_sem("user/profile/u1/color", "blue")
+        hits = self.registry.get("sem_cache_hits_total")
+        misses = self.registry.get("sem_cache_misses_total")
+
+        self.assertEqual(semantic.get_sem("user/profile/u1/color")["value"], "blue")
+        self.assertEqual(semantic.get_sem("user/profile/u1/color")["value"], "blue")
+
+        self.assertEqual(self.registry.get("sem_cache_misses_total"), misses + 1)
+        self.assertEqual(self.registry.get("sem_cache_hits_total"), hits + 1)
+
+    def test_put_invalidates(self):
+        semantic.put_sem("user/profile/u1/color", "blue")
+        semantic.get_sem("user/profile/u1/color")
+        semantic.put_sem("user/profile/u1/color", "green")
+        self.assertEqual(semantic.get_sem("user/profile/u1/color")["value"], "green")
+
+    def test_negative_entry_cleared_by_put(self):
+        self.assertFalse(semantic.get_sem("user/profile/u1/age")["exists"])
+        hits = self.registry.get("sem_cache_hits_total")
+        self.assertFalse(semantic.get_sem("user/profile/u1/age")["exists"])
+        self.assertEqual(self.registry.get("sem_cache_hits_total"), hits + 1)
+
+        semantic.put_sem("user/profile/u1/age", 30)
+        self.assertEqual(semantic.get_sem("user/profile/u1/age")["value"], 30)
+
+    def test_cached_value_cannot_be_mutated_by_caller(self):
+        semantic.put_sem("user/profile/u1/prefs", {"tags": ["a"]})
+        semantic.get_sem("user/profile/u1/prefs")["value"]["tags"].append("b")
+        self.assertEqual(semantic.get_sem("user/profile/u1/prefs")["value"], {"tags": ["a"]})
+
+    def test_capture_identical_on_hit_and_miss(self):
+        semantic.put_sem("user/profile/u1/name", "ada")
+
+        semantic.start_capture()
+        semantic.get_sem("user/profile/u1/name")  # miss
+        semantic.get_sem("user/profile/u1/nope")  # miss
+        on_miss = semantic.stop_capture()
+
+        semantic.start_capture()
+        semantic.get_sem("user/profile/u1/name")  # hit
+        semantic.get_sem("user/profile/u1/nope")  # negative hit
+        on_hit = semantic.stop_capture()
+
+        self.assertEqual(on_miss, on_hit)
+        self.assertEqual(on_hit["reads"]["user/profile/u1/nope"], {"value": None, "exists": False})
+
+    def test_replay_store_bypasses_cache(self):
+        semantic.put_sem("user/profile/u1/color", "blue")
+        semantic.get_sem("user/profile/u1/color")
+
+        semantic.set_store(semantic.ReplaySEMStore({"user/profile/u1/color": "red"}))
+        res = semantic.get_sem("user/profile/u1/color")
+        self.assertEqual(res["value"], "red")
+        self.assertEqual(res["last_updated"], "REPLAY_SNAPSHOT")
+
+    def test_write_from_another_connection_invalidates(self):
+        self.assertFalse(semantic.get_sem("user/profile/u1/city")["exists"])
+        other = sem_shards.open_backend(semantic.LiveSEMStore().db_path)
+        try:
+            other.put("user/profile/u1/city", '"paris"', "t")
+        finally:
+            other.close()
+        self.assertEqual(semantic.get_sem("user/profile/u1/city")["value"], "paris")
+
+    def test_lru_eviction(self):
+        cache = sem_cache.SEMReadCache(max_entries=2)
+        evictions = self.registry.get("sem_cache_evictions_total")
+        cache.store("a", 1, "t", cache.fill_ticket())
+        cache.store("b", 2, "t", cache.fill_ticket())
+        cache.lookup("a")  # a becomes most recent
+        cache.store("c", 3, "t", cache.fill_ticket())
+
+        self.assertIsNone(cache.lookup("b"))
+        self.assertEqual(cache.lookup("a"), (1, "t"))
+        self.assertEqual(self.registry.get("sem_cache_evictions_total"), evictions + 1)
+
+    def test_stale_fill_is_dropped(self):
+        cache = sem_cache.SEMReadCache(max_entries=8)
+        ticket = cache.fill_ticket()
+        cache.invalidate("a")  # A write lands between the read and the fill
+        cache.store("a", "old", "t", ticket)
+        self.assertIsNone(cache.lookup("a"))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,68 @@
+import unittest
+from mace.memory import semantic, storage_backend
+from mace.core import deterministic
+
+
+class TestSEMScan(unittest.TestCase):
+    def setUp(self):
+        deterministic.set_mode("DETERMINISTIC")
+        deterministic.init_seed("sem_scan_seed")
+        semantic.set_store(semantic.LiveSEMStore())
+        for name in ["age", "city", "color", "name", "pet"]:
+            semantic.put_sem(f"user/profile/user_123/{name}", name)
+        semantic.put_sem("user/profile/user_1234/name", "other")
+        semantic.put_sem("user/profile/user_12/name", "other")
+
+    def tearDown(self):
+        semantic.set_store(semantic.LiveSEMStore())
+
+    def test_prefix_upper_bound(self):
+        self.assertEqual(storage_backend.prefix_upper_bound("user/a/"), "user/a0")
+        self.assertGreater(storage_backend.prefix_upper_bound(""), "zzzz")
+
+    def test_scan_paginates_namespace(self):
+        prefix = "user/profile/user_123/"
+        page = semantic.scan_sem(prefix, limit=2)
+        self.assertEqual([i["key"].rsplit("/", 1)[1] for i in page["items"]], ["age", "city"])
+
+        keys = []
+        cursor = None
+        while True:
+            page = semantic.scan_sem(prefix, limit=2, cursor=cursor)
+            keys.extend(i["key"] for i in page["items"])
+            cursor = page["next_cursor"]
+            if cursor is None:
+                break
+        self.assertEqual(keys, [f"{prefix}{n}" for n in ["age", "city", "color", "name", "pet"]])
+        self.assertEqual([i["key"] for i in semantic.iter_sem(prefix, page_size=3)], keys)
+
+    def test_count(self):
+        self.assertEqual(semantic.count_sem("user/profile/user_123/"), 5)
+        self.assertEqual(semantic.count_sem("user/profile/user_123"), 6)
+        self.assertEqual(semantic.count_sem("user/profile/"), 7)
+        self.assertEqual(semantic.count_sem("nope/"), 0)
+
+    def test_scan_uses_primary_key_index(self):
+        backend = semantic.LiveSEMStore()._backend()
+        plan = backend.conn.execute(
+            "EXPLAIN QUERY PLAN " + storage_backend._SQL_SCAN, ("a/", "", "a0", 10)
+        ).fetchall()
+        self.assertIn("USING INDEX", " ".join(row[-1] for row in plan))
+
+    def test_replay_store_matches_live(self):
+        prefix = "user/profile/user_123/"
+        semantic.start_capture()
+        live = list(semantic.iter_sem(prefix, page_size=2))
+        captured = semantic.stop_capture()
+
+        snapshot = {k: r["value"] for k, r in captured["reads"].items() if r["exists"]}
+        semantic.set_store(semantic.ReplaySEMStore(snapshot))
+        replayed = list(semantic.iter_sem(prefix, page_size=2))
+
+        self.assertEqual([(i["key"], i["value"]) for i in replayed],
+                         [(i["key"], i["value"]) for i in live])
+        self.assertEqual(semantic.count_sem(prefix), 5)
+
+
+if __name__ == '__main__':
+    unittest.main()
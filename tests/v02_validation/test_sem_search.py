@@ -0,0 +1,76 @@
+import unittest
+import os
+import tempfile
+from mace.memory import semantic
+from mace.memory.storage_backend import StorageBackend, fts_query
+from mace.core import deterministic
+
+
+class TestSEMSearch(unittest.TestCase):
+    def setUp(self):
+        deterministic.set_mode("DETERMINISTIC")
+        deterministic.init_seed("sem_search_seed")
+        semantic.set_store(semantic.LiveSEMStore())
+
+    def test_fts_query(self):
+        self.assertEqual(fts_query("User_12 name"), '"user"* AND "12"* AND "name"*')
+        self.assertEqual(fts_query("sarah", prefix=False), '"sarah"')
+        self.assertIsNone(fts_query("  /// "))
+
+    def test_prefix_match_on_value(self):
+        semantic.put_sem("user/profile/u1/name", "Sarah")
+        semantic.put_sem("user/profile/u2/name", "Bob")
+        keys = [r["key"] for r in semantic.search_sem("sar")]
+        self.assertEqual(keys, ["user/profile/u1/name"])
+        self.assertEqual(semantic.search_sem("sar", prefix=False), [])
+
+    def test_key_match_ranks_above_value_match(self):
+        semantic.put_sem("user/profile/u1/note", "likes the color teal")
+        semantic.put_sem("user/profile/u1/color", "teal")
+        results = semantic.search_sem("color")
+        self.assertEqual(results[0]["key"], "user/profile/u1/color")
+
+    def test_index_follows_overwrite(self):
+        semantic.put_sem("user/profile/u1/city", "paris")
+        semantic.put_sem("user/profile/u1/city", "berlin")
+        self.assertEqual(semantic.search_sem("paris"), [])
+        self.assertEqual(semantic.search_sem("berlin")[0]["value"], "berlin")
+
+    def test_rebuild_indexes_rows_written_without_put(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            backend = StorageBackend(os.path.join(tmp, "sem.db"))
+            try:
+                backend.put("user/profile/u1/name", '"ada"', "t1")
+                backend.conn.execute(
+                    "INSERT INTO sem_kv VALUES ('user/profile/u2/name', '\"grace\"', 't2')"
+                )
+                backend.conn.commit()
+                self.assertEqual(backend.search_keys("grace"), [])
+                self.assertEqual(backend.rebuild_search_index(), 2)
+                self.assertEqual(backend.search_keys("grace")[0][0], "user/profile/u2/name")
+            finally:
+                backend.close()
+
+    def test_existing_table_is_backfilled(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "sem.db")
+            backend = StorageBackend(path)
+            backend.put("user/profile/u1/name", '"ada"', "t1")
+            backend.conn.execute("DROP TABLE sem_fts")
+            backend.conn.commit()
+            backend.close()
+
+            backend = StorageBackend(path)
+            try:
+                self.assertEqual(backend.search_keys("ada")[0][0], "user/profile/u1/name")
+            finally:
+                backend.close()
+
+    def test_key_path_query(self):
+        semantic.put_sem("user/profile/u1/name", "ada")
+        keys = [r["key"] for r in semantic.search_sem("/u1/")]
+        self.assertEqual(keys, ["user/profile/u1/name"])
+
+
+if __name__ == '__main__':
+    unittest.main()
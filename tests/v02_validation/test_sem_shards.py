@@ -0,0 +1,168 @@
+import unittest
+import os
+import json
+import tempfile
+from unittest import mock
+from mace.memory import semantic, sem_shards, sem_snapshot_file
+from mace.core import deterministic
+
+
+def _keys(n):
+    return [f"user/profile/u{i}/name" for i in range(n)]
+
+
+class TestSEMShards(unittest.TestCase):
+    def setUp(self):
+        deterministic.set_mode("DETERMINISTIC")
+        deterministic.init_seed("sem_shards_seed")
+        self.tmp = tempfile.TemporaryDirectory()
+        self.db = os.path.join(self.tmp.name, "sem.db")
+        self.shards = mock.patch.object(sem_shards.config_loader, "get_sem_shards", return_value=4)
+        self.shards.start()
+
+    def tearDown(self):
+        semantic.close_live_stores()
+        semantic.set_store(semantic.LiveSEMStore())
+        self.shards.stop()
+        self.tmp.cleanup()
+
+    def test_routing_is_stable_and_by_namespace(self):
+        self.assertEqual(sem_shards.shard_index("user/profile/u1/name", 4),
+                         sem_shards.shard_index("user/profile/u1/age", 4))
+        self.assertEqual(len({sem_shards.shard_index(k, 4) for k in _keys(50)}), 4)
+        # SHA-256 based, so the same in every process and on every platform
+        self.assertEqual([sem_shards.shard_index(k, 4) for k in _keys(8)], [0, 3, 1, 3, 2, 0, 1, 0])
+        self.assertEqual(sem_shards.shard_paths("mace_memory.db", 1), ["mace_memory.db"])
+        self.assertEqual(sem_shards.shard_paths("mace_memory.db", 2),
+                         ["mace_memory.shard-0-of-2.db", "mace_memory.shard-1-of-2.db"])
+
+    def test_single_key_ops_route_and_fan_out_reads_merge(self):
+        backend = sem_shards.open_backend(self.db)
+        try:
+            self.assertIsInstance(backend, sem_shards.ShardedStorageBackend)
+            self.assertEqual(sem_shards.read_manifest(self.db), 4)
+            keys = _keys(40)
+            self.assertTrue(backend.put_many([(k, json.dumps(f"name {i}"), f"t{i:02d}") for i, k in enumerate(keys)]))
+
+            for key in keys[:5]:
+                home = sem_shards.shard_index(key, 4)
+                for i, shard in enumerate(backend.shards):
+                    self.assertEqual(shard.get(key)[0] is not None, i == home)
+
+            self.assertEqual(backend.get(keys[3]), (json.dumps("name 3"), "t03"))
+            self.assertEqual(set(backend.get_many(keys[:10] + ["user/profile/x/name"])), set(keys[:10]))
+
+            # Cross-shard scan: key order and cursors across shards
+            paged, after = [], None
+            while True:
+                rows = backend.scan("user/profile/", 7, after)
+                paged.extend(r[0] for r in rows)
+                if len(rows) < 7:
+                    break
+                after = rows[-1][0]
+            self.assertEqual(paged, sorted(keys))
+            self.assertEqual(backend.count("user/"), 40)
+            self.assertEqual(backend.count("user/profile/u1/"), 1)
+            self.assertEqual([r[0] for r in backend.scan("user/profile/u1/")], ["user/profile/u1/name"])
+
+            hits = backend.search_keys("name", limit=5)
+            self.assertEqual(len(hits), 5)
+            self.assertTrue(all(k.startswith("user/profile/") for k, _, _ in hits))
+        finally:
+            backend.close()
+
+    def test_versions_are_per_shard(self):
+        backend = sem_shards.open_backend(self.db)
+        try:
+            key = "user/profile/u1/city"
+            backend.put(key, '"paris"', "t1", 1)
+            before = backend.current_version()
+            self.assertEqual(len(before), 4)
+            backend.put(key, '"berlin"', "t2", 2)
+
+            self.assertEqual(backend.get_as_of(key, before)[0], '"paris"')
+            self.assertEqual([h[1] for h in backend.history(key)], ['"paris"', '"berlin"'])
+            with self.assertRaises(ValueError):
+                backend.get_as_of(key, 1)
+
+            path = os.path.join(self.tmp.name, "sem.snap")
+            backend.put("user/profile/u2/city", '"rome"', "t3")
+            self.assertEqual(backend.export_snapshot(path), 2)
+            with sem_snapshot_file.SEMSnapshotFile(path) as snap:
+                self.assertEqual(list(snap), [key, "user/profile/u2/city"])
+        finally:
+            backend.close()
+
+    def test_live_store_journal_and_ids_match_unsharded(self):
+        def run(db, shards):
+            journal = os.path.join(self.tmp.name, f"journal_{shards}.jsonl")
+            deterministic.init_seed("sem_shards_seed")
+            with mock.patch.object(sem_shards.config_loader, "get_sem_shards", return_value=shards), \
+                    mock.patch.object(semantic, "JOURNAL_FILE", journal):
+                semantic.set_store(semantic.LiveSEMStore(db))
+                results = [semantic.put_sem(k, i) for i, k in enumerate(_keys(12))]
+                results.append(semantic.put_sem_many([("user/profile/u1/age", 30), ("user/profile/u7/age", 31)]))
+                reads = semantic.get_sem_many(_keys(12) + ["user/profile/u7/age"])
+                semantic.close_live_stores()
+            with open(journal) as f:
+                return results, {k: r["value"] for k, r in reads.items()}, f.read()
+
+        single = run(os.path.join(self.tmp.name, "single.db"), 1)
+        sharded = run(self.db, 4)
+        self.assertEqual(single, sharded)
+        self.assertFalse(os.path.exists(self.db))
+        self.assertTrue(os.path.exists(sem_shards.shard_paths(self.db, 4)[0]))
+
+    def test_online_reshard(self):
+        store = semantic.LiveSEMStore(self.db)
+        semantic.set_store(store)
+        for i, key in enumerate(_keys(30)):
+            semantic.put_sem(key, i)
+        semantic.put_sem("user/profile/u0/name", "latest")
+
+        result = sem_shards.reshard(self.db, 3, batch_size=8, grace_s=0)
+        self.assertEqual((result["from"], result["to"], result["keys"]), (4, 3, 30))
+        self.assertEqual(result["versions_copied"], 31)
+        self.assertFalse(any(os.path.exists(p) for p in sem_shards.shard_paths(self.db, 4)))
+
+        # The live store follows the manifest without being reopened by hand
+        self.assertEqual(semantic.get_sem("user/profile/u0/name")["value"], "latest")
+        self.assertEqual(semantic.count_sem("user/profile/"), 30)
+        self.assertEqual(len(store.current_version()), 3)
+        self.assertEqual(len(semantic.sem_history("user/profile/u0/name")), 2)
+
+        semantic.close_live_stores()
+        sem_shards.reshard(self.db, 1, grace_s=0)
+        self.assertEqual(semantic.get_sem("user/profile/u5/name")["value"], 5)
+        self.assertEqual(semantic.count_sem("user/profile/"), 30)
+
+        # Going back onto a layout that still holds data needs force
+        sem_shards.reshard(self.db, 2, grace_s=0, keep_source=True)
+        with self.assertRaises(ValueError):
+            sem_shards.reshard(self.db, 1, grace_s=0)
+        self.assertEqual(sem_shards.reshard(self.db, 1, grace_s=0, force=True)["keys"], 30)
+
+    def test_straggler_does_not_overwrite_newer_write(self):
+        store = semantic.LiveSEMStore(self.db)
+        semantic.set_store(store)
+        for i, key in enumerate(_keys(4)):
+            semantic.put_sem(key, i)
+
+        def writers_during_grace(_):
+            # A writer still on the old layout, then one already on the new one
+            old = sem_shards.open_backend(self.db, 4)
+            old.put("user/profile/u0/name", '"straggler"', "t1")
+            old.put("user/profile/u1/name", '"straggler"', "t1")
+            old.close()
+            new = sem_shards.open_backend(self.db, 2)
+            new.put("user/profile/u0/name", '"newer"', "t2")
+            new.close()
+
+        with mock.patch.object(sem_shards.time, "sleep", side_effect=writers_during_grace):
+            sem_shards.reshard(self.db, 2, grace_s=1)
+        self.assertEqual(semantic.get_sem("user/profile/u0/name")["value"], "newer")
+        self.assertEqual(semantic.get_sem("user/profile/u1/name")["value"], "straggler")
+
+
+if __name__ == '__main__':
+    unittest.main()
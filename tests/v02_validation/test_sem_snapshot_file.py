@@ -0,0 +1,107 @@
+import unittest
+import os
+import json
+import tempfile
+from unittest import mock
+from mace.memory import semantic, sem_snapshot_file
+from mace.memory.storage_backend import StorageBackend
+from mace.core import deterministic
+
+
+class TestSEMSnapshotFile(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.db = os.path.join(self.tmp.name, "sem.db")
+        self.snap = os.path.join(self.tmp.name, "sem.snap")
+        self.backend = StorageBackend(self.db)
+        for key, value in [("user/profile/u2/name", "bob"), ("user/profile/u1/name", "ada"),
+                           ("user/profile/u1/prefs", {"tags": ["x"]}), ("world/fact/geo/capital", "paris")]:
+            self.backend.put(key, json.dumps(value), "t")
+
+    def tearDown(self):
+        self.backend.close()
+        self.tmp.cleanup()
+
+    def test_export_and_lookup(self):
+        self.assertEqual(self.backend.export_snapshot(self.snap), 4)
+        with sem_snapshot_file.SEMSnapshotFile(self.snap) as snap:
+            self.assertEqual(len(snap), 4)
+            self.assertEqual(list(snap), sorted(snap))
+            self.assertEqual(snap["user/profile/u1/prefs"], {"tags": ["x"]})
+            self.assertEqual(snap.serialized("world/fact/geo/capital"), '"paris"')
+            self.assertIn("user/profile/u2/name", snap)
+            self.assertNotIn("user/profile/u3/name", snap)
+            self.assertNotIn("a", snap)
+            self.assertNotIn("zzz", snap)
+            view = snap.raw("user/profile/u1/name")
+            self.assertIsInstance(view, memoryview)
+            self.assertEqual(bytes(view), b'"ada"')
+            view.release()
+
+    def test_export_as_of_version(self):
+        version = self.backend.current_version()
+        self.backend.put("user/profile/u1/name", '"grace"', "t")
+        self.backend.export_snapshot(self.snap, version)
+        with sem_snapshot_file.SEMSnapshotFile(self.snap) as snap:
+            self.assertEqual(snap.sem_version, version)
+            self.assertEqual(snap["user/profile/u1/name"], "ada")
+
+    def test_empty_snapshot(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            backend = StorageBackend(os.path.join(tmp, "empty.db"))
+            path = os.path.join(tmp, "empty.snap")
+            self.assertEqual(backend.export_snapshot(path), 0)
+            backend.close()
+            with sem_snapshot_file.SEMSnapshotFile(path) as snap:
+                self.assertEqual(len(snap), 0)
+                self.assertNotIn("user/profile/u1/name", snap)
+
+    def test_rejects_other_files(self):
+        with open(self.snap, "wb") as f:
+            f.write(b"not a snapshot at all, definitely")
+        with self.assertRaises(ValueError):
+            sem_snapshot_file.SEMSnapshotFile(self.snap)
+
+    def test_replay_store_source(self):
+        self.backend.export_snapshot(self.snap)
+        deterministic.set_mode("DETERMINISTIC")
+        deterministic.init_seed("snapshot_file_seed")
+        store = semantic.ReplaySEMStore.from_snapshot_file(self.snap)
+        semantic.set_store(store)
+        try:
+            res = semantic.get_sem("user/profile/u1/prefs")
+            self.assertEqual(res["value"], {"tags": ["x"]})
+            self.assertEqual(res["last_updated"], "REPLAY_SNAPSHOT")
+            self.assertFalse(semantic.get_sem("user/profile/u9/name")["exists"])
+            page = semantic.scan_sem("user/profile/u1/")
+            self.assertEqual([i["key"] for i in page["items"]],
+                             ["user/profile/u1/name", "user/profile/u1/prefs"])
+        finally:
+            semantic.set_store(semantic.LiveSEMStore())
+            store.snapshot.close()
+
+    def test_replay_scan_searches_the_file(self):
+        self.backend.export_snapshot(self.snap)
+        store = semantic.ReplaySEMStore.from_snapshot_file(self.snap)
+        try:
+            store.put("user/profile/u1/age", "30", "t")
+            store.put("user/profile/u2/name", '"carol"', "t")
+            # NORMAL mode: sandbox writes read back with the current time
+            with mock.patch.object(deterministic, "_mode", "NORMAL"), \
+                    mock.patch.object(sem_snapshot_file.SEMSnapshotFile, "__iter__",
+                                      side_effect=AssertionError("full scan")):
+                self.assertEqual([row[0] for row in store.scan("user/profile/")],
+                                 ["user/profile/u1/age", "user/profile/u1/name",
+                                  "user/profile/u1/prefs", "user/profile/u2/name"])
+                page = store.scan("user/profile/", limit=2, after="user/profile/u1/name")
+                self.assertEqual([row[:2] for row in page], [("user/profile/u1/prefs", '{"tags": ["x"]}'),
+                                                             ("user/profile/u2/name", '"carol"')])
+                self.assertEqual(store.count("user/profile/"), 4)
+                self.assertEqual(store.count(""), 5)
+                self.assertEqual(store.count("world/fact/geo/capital0"), 0)
+        finally:
+            store.snapshot.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -129,5 +129,27 @@ class TestSEMStorage(unittest.TestCase):
         # Error message might be validation error, but structure is what matters
         self.assertIn("error", res)
 
+    def test_live_store_reuses_backend(self):
+        """LiveSEMStore keeps one backend open across calls."""
+        semantic.put_sem("user/profile/u1/reuse", "a")
+        backend = semantic.LiveSEMStore._backends["mace_memory.db"]
+        semantic.get_sem("user/profile/u1/reuse")
+        semantic.put_sem("user/profile/u1/reuse", "b")
+        self.assertIs(semantic.LiveSEMStore._backends["mace_memory.db"], backend)
+        self.assertEqual(semantic.get_sem("user/profile/u1/reuse")["value"], "b")
+
+    def test_live_store_reopens_replaced_db(self):
+        """Deleting the DB file must not leave the store reading the old file."""
+        semantic.put_sem("user/profile/u1/gone", "a")
+        os.remove("mace_memory.db")
+        self.assertFalse(semantic.get_sem("user/profile/u1/gone")["exists"])
+
+    def test_close_live_stores(self):
+        semantic.put_sem("user/profile/u1/closed", "a")
+        semantic.close_live_stores()
+        self.assertEqual(semantic.LiveSEMStore._backends, {})
+        # Next access reopens lazily
+        self.assertEqual(semantic.get_sem("user/profile/u1/closed")["value"], "a")
+
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,100 @@
+import unittest
+import os
+import tempfile
+from unittest import mock
+from mace.memory import semantic, storage_backend
+from mace.core import deterministic
+
+
+class TestSEMVersions(unittest.TestCase):
+    def setUp(self):
+        deterministic.set_mode("DETERMINISTIC")
+        deterministic.init_seed("sem_versions_seed")
+        semantic.set_store(semantic.LiveSEMStore())
+
+    def tearDown(self):
+        semantic.set_store(semantic.LiveSEMStore())
+
+    def test_get_as_of_snapshot(self):
+        semantic.put_sem("user/profile/u1/city", "paris")
+        before = semantic.sem_snapshot()
+        semantic.put_sem("user/profile/u1/city", "berlin")
+        semantic.put_sem("user/profile/u1/pet", "cat")
+
+        self.assertEqual(semantic.get_sem("user/profile/u1/city")["value"], "berlin")
+        self.assertEqual(semantic.get_sem("user/profile/u1/city", as_of=before)["value"], "paris")
+        self.assertFalse(semantic.get_sem("user/profile/u1/pet", as_of=before)["exists"])
+        self.assertFalse(semantic.get_sem("user/profile/u1/city", as_of=0)["exists"])
+        before.release()
+
+    def test_snapshot_is_a_mapping(self):
+        semantic.put_sem("user/profile/u1/city", "paris")
+        semantic.put_sem("user/profile/u1/pet", "cat")
+        with semantic.sem_snapshot() as snap:
+            semantic.put_sem("user/profile/u1/city", "berlin")
+            self.assertEqual(dict(snap), {"user/profile/u1/city": "paris", "user/profile/u1/pet": "cat"})
+
+            semantic.set_store(semantic.ReplaySEMStore(snap))
+            self.assertEqual(semantic.get_sem("user/profile/u1/city")["value"], "paris")
+
+    def test_replay_store_does_not_scan_its_snapshot(self):
+        semantic.put_sem("user/profile/u1/city", "paris")
+        with semantic.sem_snapshot() as snap:
+            with mock.patch.object(semantic.SEMSnapshot, "__len__", side_effect=AssertionError("full scan")):
+                store = semantic.ReplaySEMStore(snap)
+            self.assertIs(store.snapshot, snap)
+
+    def test_replay_scan_over_snapshot_reads_only_the_prefix(self):
+        semantic.put_sem("user/profile/u1/city", "paris")
+        semantic.put_sem("user/profile/u2/city", "rome")
+        with semantic.sem_snapshot() as snap:
+            semantic.put_sem("user/profile/u1/pet", "cat")
+            store = semantic.ReplaySEMStore(snap)
+            store.put("user/profile/u1/age", "30", "t")
+            # NORMAL mode: sandbox writes read back with the current time
+            with mock.patch.object(deterministic, "_mode", "NORMAL"), \
+                    mock.patch.object(semantic.SEMSnapshot, "__iter__", side_effect=AssertionError("full scan")):
+                self.assertEqual([row[0] for row in store.scan("user/profile/u1/")],
+                                 ["user/profile/u1/age", "user/profile/u1/city"])
+                self.assertEqual(store.count("user/profile/u1/"), 2)
+
+    def test_history_records_write_counters(self):
+        semantic.put_sem("user/profile/u1/city", "paris")
+        semantic.put_sem_many([("user/profile/u1/city", "rome"), ("user/profile/u1/city", "oslo")])
+        history = semantic.sem_history("user/profile/u1/city")
+        self.assertEqual([h["value"] for h in history], ["paris", "rome", "oslo"])
+        self.assertEqual([h["write_counter"] for h in history], [1, 2, 3])
+
+    def test_compaction_respects_horizon_and_snapshots(self):
+        for city in ["a", "b", "c", "d"]:
+            semantic.put_sem("user/profile/u1/city", city)
+        pinned = semantic.sem_snapshot()  # Sees "d"
+        semantic.put_sem("user/profile/u1/city", "e")
+
+        removed = semantic.compact_sem(keep_per_key=1)
+        self.assertEqual(removed, 3)  # a, b, c; "d" is pinned
+        self.assertEqual(semantic.get_sem("user/profile/u1/city", as_of=pinned)["value"], "d")
+
+        pinned.release()
+        self.assertEqual(semantic.compact_sem(keep_per_key=1), 1)
+        self.assertEqual([h["value"] for h in semantic.sem_history("user/profile/u1/city")], ["e"])
+
+    def test_existing_table_is_seeded(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "sem.db")
+            backend = storage_backend.StorageBackend(path)
+            backend.put("user/profile/u1/name", '"ada"', "t1")
+            backend.conn.execute("DROP TABLE sem_versions")
+            backend.conn.commit()
+            backend.close()
+
+            backend = storage_backend.StorageBackend(path)
+            try:
+                version = backend.current_version()
+                self.assertEqual(backend.get_as_of("user/profile/u1/name", version), ('"ada"', "t1"))
+            finally:
+                backend.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
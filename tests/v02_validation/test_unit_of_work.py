@@ -0,0 +1,131 @@
+import unittest
+import os
+import sqlite3
+from unittest import mock
+from mace.core import persistence
+
+DB_PATH = "uow_test.db"
+
+
+class TestUnitOfWork(unittest.TestCase):
+    def setUp(self):
+        persistence.close_all()
+        if os.path.exists(DB_PATH):
+            os.remove(DB_PATH)
+        self._url = mock.patch.object(persistence, "_DB_URL", f"sqlite:///{DB_PATH}")
+        self._url.start()
+
+        conn = persistence.get_connection()
+        try:
+            persistence.execute_query(conn, "CREATE TABLE t (v TEXT)")
+            conn.commit()
+        finally:
+            conn.close()
+
+    def tearDown(self):
+        self._url.stop()
+        persistence.close_all()
+        if os.path.exists(DB_PATH):
+            os.remove(DB_PATH)
+
+    def _write(self, value):
+        conn = persistence.get_connection()
+        try:
+            persistence.execute_query(conn, "INSERT INTO t VALUES (?)", (value,))
+            conn.commit()
+        finally:
+            conn.close()
+
+    def _committed_rows(self):
+        conn = sqlite3.connect(DB_PATH)
+        try:
+            return [r[0] for r in conn.execute("SELECT v FROM t ORDER BY v")]
+        finally:
+            conn.close()
+
+    def test_writers_share_one_commit(self):
+        with persistence.unit_of_work():
+            self._write("a")
+            self._write("b")
+            # Participants' commit() is deferred until the block exits
+            self.assertEqual(self._committed_rows(), [])
+        self.assertEqual(self._committed_rows(), ["a", "b"])
+
+    def test_failure_rolls_back_everything(self):
+        with self.assertRaises(RuntimeError):
+            with persistence.unit_of_work():
+                self._write("a")
+                raise RuntimeError("step failed")
+        self.assertEqual(self._committed_rows(), [])
+
+        # Pool is usable again afterwards
+        self._write("c")
+        self.assertEqual(self._committed_rows(), ["c"])
+
+    def test_nested_unit_of_work_joins_outer(self):
+        with persistence.unit_of_work() as outer:
+            with persistence.unit_of_work() as inner:
+                self.assertIs(inner, outer)
+                self._write("a")
+            self.assertEqual(self._committed_rows(), [])
+        self.assertEqual(self._committed_rows(), ["a"])
+
+    def test_savepoint_isolates_optional_step(self):
+        with persistence.unit_of_work():
+            self._write("a")
+            try:
+                with persistence.savepoint("optional"):
+                    self._write("b")
+                    raise ValueError("optional step failed")
+            except ValueError:
+                pass
+            self._write("c")
+        self.assertEqual(self._committed_rows(), ["a", "c"])
+
+    def test_rollback_hooks_run_only_on_rollback(self):
+        calls = []
+        with persistence.unit_of_work():
+            persistence.on_rollback(lambda: calls.append("committed_path"))
+        self.assertEqual(calls, [])
+
+        with self.assertRaises(RuntimeError):
+            with persistence.unit_of_work():
+                persistence.on_rollback(lambda: calls.append("rolled_back"))
+                raise RuntimeError("boom")
+        self.assertEqual(calls, ["rolled_back"])
+
+    def test_rollback_hooks_run_when_their_savepoint_rolls_back(self):
+        calls = []
+        with persistence.unit_of_work():
+            with persistence.savepoint("kept"):
+                persistence.on_rollback(lambda: calls.append("kept"))
+            with self.assertRaises(ValueError):
+                with persistence.savepoint("outer"):
+                    with persistence.savepoint("inner"):
+                        persistence.on_rollback(lambda: calls.append("inner"))
+                    raise ValueError("optional step failed")
+            self.assertEqual(calls, ["inner"])
+        self.assertEqual(calls, ["inner"])
+
+    def test_exit_hooks_run_after_commit_and_rollback(self):
+        calls = []
+
+        def hook():
+            calls.append(persistence.in_unit_of_work())
+
+        with persistence.unit_of_work():
+            persistence.after_unit_of_work(hook)
+            persistence.after_unit_of_work(hook)
+            self.assertEqual(calls, [])
+        self.assertEqual(calls, [False])
+
+        with self.assertRaises(RuntimeError):
+            with persistence.unit_of_work():
+                persistence.after_unit_of_work(hook)
+                raise RuntimeError("boom")
+        persistence.after_unit_of_work(hook)
+        self.assertEqual(calls, [False] * 3)
+
+
+if __name__ == '__main__':
+    unittest.main()
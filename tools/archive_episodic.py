@@ -0,0 +1,40 @@
+#!/usr/bin/env python3
+"""
+Archive cold episodic partitions.
+
+Moves every monthly episodic partition older than --before (default: all but
+the newest `episodic_hot_months` months) into a gzip-compressed, read-only
+SQLite file under --dir and drops it from the live database. Archived
+episodes stay queryable through EpisodicMemory with include_archived=True
+(see memory/episodic_partitions.py).
+
+Usage:
+    python tools/archive_episodic.py
+    python tools/archive_episodic.py --before 2025-01 --dir archived/episodic
+"""
+import argparse
+import sys
+import os
+
+sys.path.append(os.path.join(os.path.dirname(__file__), "../src"))
+
+from mace.memory import episodic_partitions
+from mace.memory.episodic import EpisodicMemory
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Archive cold episodic partitions")
+    parser.add_argument("--before", help="Archive partitions of months before this one (YYYY-MM)")
+    parser.add_argument("--dir", help="Archive directory (default: episodic_archive_dir)")
+    args = parser.parse_args()
+
+    EpisodicMemory()  # Partitions a pre-partitioning episodic table first
+    try:
+        archived = episodic_partitions.archive_partitions(args.before, args.dir)
+    except ValueError as e:
+        print(f"FAIL: {e}")
+        sys.exit(1)
+
+    if not archived:
+        print("No cold partitions to archive.")
+    for table, count, path in archived:
+        print(f"Archived {table}: {count} episodes -> {path}")
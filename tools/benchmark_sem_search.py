@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+SEM Search Benchmark
+
+Compares search_keys latency of the LIKE scan against the FTS5 index over
+synthetic SEM tables of increasing size.
+
+Usage:
+    python tools/benchmark_sem_search.py --sizes 10000 100000 1000000 --output sem_search_results.json
+"""
+import argparse
+import json
+import time
+import sys
+import os
+import tempfile
+from statistics import median
+
+sys.path.append(os.path.join(os.path.dirname(__file__), "../src"))
+
+from mace.memory.storage_backend import StorageBackend
+
+NAMES = ["alice", "bob", "carol", "dave", "erin", "frank", "grace", "heidi"]
+COLORS = ["red", "green", "blue", "orange", "purple", "teal"]
+QUERIES = ["sarah", "grace", "user_42", "favorite_color", "purple", "zzz_no_match"]
+
+
+def populate(backend, size):
+    """Insert `size` synthetic SEM rows and build the index in one pass."""
+    rows = []
+    for i in range(size):
+        name = NAMES[i % len(NAMES)]
+        key = f"user/profile/user_{i}/favorite_color" if i % 2 else f"user/profile/user_{i}/name"
+        value = json.dumps(COLORS[i % len(COLORS)] if i % 2 else f"{name} {i}")
+        rows.append((key, value, f"2025-01-01T00:00:{i % 60:02d}Z"))
+    # One known hit for a rare term
+    rows.append(("user/profile/user_x/name", json.dumps("sarah"), "2025-01-01T00:00:00Z"))
+    backend._ensure_schema()
+    backend.conn.executemany(
+        "INSERT INTO sem_kv (canonical_key, value, last_updated) VALUES (?, ?, ?)", rows
+    )
+    backend.conn.commit()
+    backend.rebuild_search_index()
+
+
+def time_queries(backend, ranked, repeats):
+    latencies = []
+    for _ in range(repeats):
+        for query in QUERIES:
+            start = time.perf_counter()
+            backend.search_keys(query, limit=50, ranked=ranked)
+            latencies.append((time.perf_counter() - start) * 1000)
+    latencies.sort()
+    n = len(latencies)
+    return {
+        "p50": median(latencies),
+        "p95": latencies[int(n * 0.95)],
+        "max": latencies[-1],
+    }
+
+
+def run_sem_search_benchmark(sizes, repeats):
+    results = {}
+    for size in sizes:
+        print(f"Populating {size} rows...", file=sys.stderr)
+        with tempfile.TemporaryDirectory() as tmp:
+            backend = StorageBackend(os.path.join(tmp, "sem_bench.db"))
+            try:
+                populate(backend, size)
+                results[str(size)] = {
+                    "like_ms": time_queries(backend, ranked=False, repeats=repeats),
+                    "fts_ms": time_queries(backend, ranked=True, repeats=repeats)
+                    if backend.fts_enabled else None,
+                }
+            finally:
+                backend.close()
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark SEM search: LIKE scan vs FTS5")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 100000, 1000000],
+                        help="Row counts to benchmark")
+    parser.add_argument("--repeats", type=int, default=5, help="Repetitions of the query set")
+    parser.add_argument("--output", default="sem_search_results.json", help="Output file")
+
+    args = parser.parse_args()
+
+    results = run_sem_search_benchmark(args.sizes, args.repeats)
+
+    with open(args.output, 'w') as f:
+        json.dump(results, f, indent=2)
+
+    print(f"\n=== SEM Search Benchmark ===")
+    for size, res in results.items():
+        like = res["like_ms"]
+        print(f"{size:>9} rows  LIKE p50 {like['p50']:8.2f}ms  p95 {like['p95']:8.2f}ms", end="")
+        if res["fts_ms"]:
+            fts = res["fts_ms"]
+            print(f"  |  FTS p50 {fts['p50']:8.2f}ms  p95 {fts['p95']:8.2f}ms")
+        else:
+            print("  |  FTS unavailable")
+    print(f"\nResults written to: {args.output}")
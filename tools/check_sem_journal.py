@@ -1,48 +1,72 @@
+import argparse
 import json
 import sys
 import os
-from mace.memory.storage_backend import StorageBackend
+
+sys.path.append(os.path.join(os.path.dirname(__file__), "../src"))
+
+from mace.memory import sem_shards
+from mace.memory.sem_journal import SEMJournal
 
 JOURNAL_FILE = "logs/sem_write_journal.jsonl"
+CHECKPOINT_FILE = "logs/sem_journal_check.json"
+
+def latest_entries(journal, start=None):
+    """
+    {canonical_key: latest journal entry}.
 
-def check_consistency():
-    if not os.path.exists(JOURNAL_FILE):
-        print(f"Journal file {JOURNAL_FILE} not found.")
+    With a start position, only the entries written since are streamed;
+    otherwise the journal's key index gives one entry per key without
+    rescanning the history.
+    """
+    if start is not None:
+        latest = {}
+        for _, entry in journal.read(start):
+            if entry.get("op") == "PUT":
+                latest[entry["canonical_key"]] = entry
+        return latest
+    return {key: journal.latest(key) for key in journal.index()}
+
+def check_consistency(db_path="mace_memory.db", journal_path=JOURNAL_FILE,
+                      checkpoint_path=CHECKPOINT_FILE, full=False):
+    journal = SEMJournal(journal_path)
+    if not journal.segments():
+        print(f"Journal file {journal_path} not found.")
         return
-        
-    backend = StorageBackend()
-    
-    mismatches = 0
-    checked = 0
-    
-    with open(JOURNAL_FILE, "r") as f:
-        for line in f:
-            entry = json.loads(line)
-            if entry["op"] == "PUT":
-                key = entry["key"]
-                ts = entry["timestamp"]
-                
-                # Check DB
-                val_str, last_updated = backend.get(key)
-                
-                if val_str is None:
-                    print(f"MISMATCH: Key {key} in journal but missing in DB.")
-                    mismatches += 1
-                else:
-                    # DB timestamp must be >= journal timestamp (since journal is append log of writes)
-                    # If DB has older timestamp, it means a newer write was lost?
-                    # Or if DB has newer, it means subsequent write happened.
-                    # So DB >= Journal is correct.
-                    if last_updated < ts:
-                        print(f"MISMATCH: Key {key} DB timestamp ({last_updated}) < Journal timestamp ({ts})")
-                        mismatches += 1
-                
-                checked += 1
-                
+
+    start = None
+    if not full and os.path.exists(checkpoint_path):
+        with open(checkpoint_path, "r") as f:
+            start = tuple(json.load(f)["position"])
+    end = journal.end_position()
+
+    entries = latest_entries(journal, start)
+    backend = sem_shards.open_backend(db_path)
+    rows = backend.get_many(list(entries))
     backend.close()
-    
-    print(f"Checked {checked} entries.")
+
+    mismatches = 0
+    for key, entry in entries.items():
+        ts = entry["last_updated"]
+        if key not in rows:
+            print(f"MISMATCH: Key {key} in journal but missing in DB.")
+            mismatches += 1
+            continue
+        # DB timestamp must be >= journal timestamp (since journal is append log of writes)
+        # If DB has older timestamp, it means a newer write was lost?
+        # Or if DB has newer, it means subsequent write happened.
+        # So DB >= Journal is correct.
+        _, last_updated = rows[key]
+        if last_updated < ts:
+            print(f"MISMATCH: Key {key} DB timestamp ({last_updated}) < Journal timestamp ({ts})")
+            mismatches += 1
+
+    print(f"Checked {len(entries)} keys" + (f" written since {start}." if start else "."))
     if mismatches == 0:
+        # Next run only needs to look at what is appended after this point
+        os.makedirs(os.path.dirname(os.path.abspath(checkpoint_path)), exist_ok=True)
+        with open(checkpoint_path, "w") as f:
+            json.dump({"position": list(end)}, f)
         print("PASS: Journal consistency check passed.")
         sys.exit(0)
     else:
@@ -50,4 +74,12 @@ def check_consistency():
         sys.exit(1)
 
 if __name__ == "__main__":
-    check_consistency()
+    parser = argparse.ArgumentParser(description="Check the SEM write journal against the SEM database")
+    parser.add_argument("--db", default="mace_memory.db", help="SEM database path")
+    parser.add_argument("--journal", default=JOURNAL_FILE, help="Active journal segment path")
+    parser.add_argument("--checkpoint", default=CHECKPOINT_FILE,
+                        help="Where the last passing position is kept for incremental checks")
+    parser.add_argument("--full", action="store_true", help="Ignore the checkpoint and check every key")
+    args = parser.parse_args()
+
+    check_consistency(args.db, args.journal, args.checkpoint, args.full)
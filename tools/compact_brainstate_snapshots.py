@@ -0,0 +1,31 @@
+#!/usr/bin/env python3
+"""
+Re-keyframe BrainState snapshot chains.
+
+Rewrites snapshots as keyframes wherever a chain runs more than --interval
+- 1 deltas past its keyframe (default: brainstate_keyframe_interval in
+config/limits.yaml), e.g. after lowering the interval.
+
+Usage:
+    python tools/compact_brainstate_snapshots.py --interval 8 --job-seed my_seed
+"""
+import argparse
+import sys
+import os
+
+sys.path.append(os.path.join(os.path.dirname(__file__), "../src"))
+
+from mace.brainstate import persistence as bs_persistence
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Re-keyframe BrainState snapshot chains")
+    parser.add_argument("--interval", type=int, default=None, help="Snapshots per keyframe")
+    parser.add_argument("--job-seed", default=None, help="Only compact this job_seed's chains")
+    args = parser.parse_args()
+
+    if args.interval is not None and args.interval < 1:
+        print("--interval must be at least 1.")
+        sys.exit(1)
+
+    rewritten = bs_persistence.compact_snapshots(args.interval, args.job_seed)
+    print(f"Rewrote {rewritten} snapshots as keyframes")
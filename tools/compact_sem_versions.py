@@ -0,0 +1,34 @@
+#!/usr/bin/env python3
+"""
+Compact the SEM version history.
+
+Removes versions that no snapshot at or after the horizon can see, always
+keeping the newest --keep versions of every key (default:
+sem_version_keep_per_key in config/limits.yaml).
+
+Usage:
+    python tools/compact_sem_versions.py --db mace_memory.db --before-version 5000 --keep 4
+"""
+import argparse
+import sys
+import os
+
+sys.path.append(os.path.join(os.path.dirname(__file__), "../src"))
+
+from mace.memory import semantic
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compact the SEM version history")
+    parser.add_argument("--db", default="mace_memory.db", help="SEM database path")
+    parser.add_argument("--before-version", type=int, default=None,
+                        help="Horizon version (default: current version)")
+    parser.add_argument("--keep", type=int, default=None, help="Versions kept per key")
+    args = parser.parse_args()
+
+    if not os.path.exists(args.db):
+        print(f"Database {args.db} not found.")
+        sys.exit(1)
+
+    semantic.set_store(semantic.LiveSEMStore(args.db))
+    removed = semantic.compact_sem(args.before_version, args.keep)
+    print(f"Removed {removed} versions from {args.db}")
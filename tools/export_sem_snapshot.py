@@ -0,0 +1,36 @@
+#!/usr/bin/env python3
+"""
+Export a read-only, memory-mapped SEM snapshot file.
+
+Replay workers open it with ReplaySEMStore.from_snapshot_file(path) and
+share it through the OS page cache instead of each loading a sem_state dict.
+
+Usage:
+    python tools/export_sem_snapshot.py --db mace_memory.db --output sem.snap [--version 1200]
+"""
+import argparse
+import sys
+import os
+
+sys.path.append(os.path.join(os.path.dirname(__file__), "../src"))
+
+from mace.memory import sem_shards
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Export a SEM snapshot file")
+    parser.add_argument("--db", default="mace_memory.db", help="SEM database path")
+    parser.add_argument("--output", required=True, help="Snapshot file to write")
+    parser.add_argument("--version", type=int, default=None,
+                        help="Export the state as of this SEM version (default: current)")
+    args = parser.parse_args()
+
+    if not sem_shards.exists(args.db):
+        print(f"Database {args.db} not found.")
+        sys.exit(1)
+
+    backend = sem_shards.open_backend(args.db)
+    try:
+        count = backend.export_snapshot(args.output, args.version)
+    finally:
+        backend.close()
+    print(f"Wrote {count} entries to {args.output}")
@@ -0,0 +1,38 @@
+#!/usr/bin/env python3
+"""
+Rebuild the SEM full-text search index (sem_fts) from sem_kv.
+
+Only needed if sem_kv was modified by something other than StorageBackend.put
+(manual SQL, restored backups); the index is otherwise kept in sync on every
+write and backfilled automatically the first time it is created.
+
+Usage:
+    python tools/rebuild_sem_search_index.py --db mace_memory.db
+"""
+import argparse
+import sys
+import os
+
+sys.path.append(os.path.join(os.path.dirname(__file__), "../src"))
+
+from mace.memory import sem_shards
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Rebuild the SEM full-text search index")
+    parser.add_argument("--db", default="mace_memory.db", help="SEM database path")
+    args = parser.parse_args()
+
+    if not sem_shards.exists(args.db):
+        print(f"Database {args.db} not found.")
+        sys.exit(1)
+
+    backend = sem_shards.open_backend(args.db)
+    try:
+        rows = backend.rebuild_search_index()
+        if not backend.fts_enabled:
+            print("SQLite was built without FTS5; search uses LIKE scans, nothing to rebuild.")
+            sys.exit(1)
+    finally:
+        backend.close()
+
+    print(f"Rebuilt sem_fts over {rows} rows in {args.db}")
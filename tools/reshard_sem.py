@@ -0,0 +1,50 @@
+#!/usr/bin/env python3
+"""
+Reshard the SEM database online.
+
+Copies the SEM version history into a layout of --shards SQLite files while
+the database stays in use, switches live stores over through the shard
+manifest, then clears the old layout (see sem_shards.reshard).
+
+Version numbers are renumbered in the new layout: release SEMSnapshots and
+discard saved version numbers taken before the switch.
+
+Usage:
+    python tools/reshard_sem.py --db mace_memory.db --shards 4
+"""
+import argparse
+import sys
+import os
+
+sys.path.append(os.path.join(os.path.dirname(__file__), "../src"))
+
+from mace.memory import sem_shards
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Reshard the SEM database online")
+    parser.add_argument("--db", default="mace_memory.db", help="SEM database path")
+    parser.add_argument("--shards", type=int, required=True, help="New shard count")
+    parser.add_argument("--batch-size", type=int, default=1000, help="Versions copied per transaction")
+    parser.add_argument("--grace", type=float, default=2.0,
+                        help="Seconds to wait after switching before the final copy")
+    parser.add_argument("--keep-source", action="store_true", help="Leave the old layout in place")
+    parser.add_argument("--force", action="store_true",
+                        help="Replace SEM data already present in the new layout")
+    args = parser.parse_args()
+
+    if not sem_shards.exists(args.db):
+        print(f"Database {args.db} not found.")
+        sys.exit(1)
+
+    try:
+        result = sem_shards.reshard(args.db, args.shards, args.batch_size, args.grace,
+                                    args.keep_source, args.force, log=print)
+    except (ValueError, RuntimeError) as e:
+        print(f"FAIL: {e}")
+        sys.exit(1)
+
+    if result["from"] == result["to"]:
+        print(f"{args.db} already has {args.shards} shard(s); nothing to do.")
+    else:
+        print(f"Resharded {args.db} from {result['from']} to {result['to']} shard(s): "
+              f"{result['versions_copied']} versions, {result['keys']} keys")
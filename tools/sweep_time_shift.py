@@ -9,7 +9,16 @@ Time points:
 - T0: Empty SEM (cold start)
 - T1: Partial SEM (some existing facts)
 - T2: Dense SEM (many existing facts)
+
+Or, with --db, real historical states read from a SEM database's version
+history (see snapshots_from_history).
+
+Usage:
+    python tools/sweep_time_shift.py --candidates candidates.jsonl
+    python tools/sweep_time_shift.py --candidates candidates.jsonl --db mace_memory.db \
+        --point 120:5 --point 480:12
 """
+import argparse
 import os
 import sys
 import json
@@ -19,7 +28,7 @@ from typing import Dict, List
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), "../src"))
 
 from mace.core import deterministic
-from mace.memory import consolidator, rewards
+from mace.memory import rewards, semantic, sem_shards
 
 
 # =============================================================================
@@ -62,6 +71,28 @@ SEM_SNAPSHOTS = {
 }
 
 
+def snapshots_from_history(db_path: str, points: List[str]) -> Dict:
+    """
+    Build time-shift snapshots from the SEM version history in `db_path`.
+
+    Each point is "VERSION:TICK" (e.g. "120:5"); a sharded store's VERSION
+    has one version per shard, comma-separated (e.g. "40,38,45:5"). States
+    are SEMSnapshot views read from the database on demand, not copies of
+    the store.
+    """
+    store = semantic.LiveSEMStore(db_path)
+    snapshots = {}
+    for point in points:
+        version, tick = point.rsplit(":", 1)
+        versions = tuple(int(v) for v in version.split(","))
+        snapshots[f"V{version}"] = {
+            "description": f"SEM as of version {version}",
+            "tick": int(tick),
+            "state": semantic.SEMSnapshot(store, versions if len(versions) > 1 else versions[0]),
+        }
+    return snapshots
+
+
 def run_time_shifted_replay(
     candidates: List[Dict],
     snapshot_name: str,
@@ -100,16 +131,17 @@ def run_time_shifted_replay(
 
 def run_all_time_shifts(
     candidates: List[Dict],
-    output_dir: str = "training_artifacts/time_shifts"
+    output_dir: str = "training_artifacts/time_shifts",
+    snapshots: Dict = None
 ) -> List[Dict]:
     """
-    Run all time-shifted replays.
+    Run all time-shifted replays (against SEM_SNAPSHOTS unless `snapshots` is given).
     """
     os.makedirs(output_dir, exist_ok=True)
     
     all_results = []
     
-    for snap_name, snap_data in SEM_SNAPSHOTS.items():
+    for snap_name, snap_data in (snapshots or SEM_SNAPSHOTS).items():
         print(f"\n=== Running time-shift: {snap_name} ===")
         print(f"  Description: {snap_data['description']}")
         print(f"  SEM size: {len(snap_data['state'])} items")
@@ -196,7 +228,28 @@ def analyze_temporal_patterns(
     }
 
 
+def load_candidates(path: str) -> List[Dict]:
+    """Read MEMCandidates from a JSONL file."""
+    with open(path) as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
 if __name__ == "__main__":
-    print("Time-Shifted Replay Runner")
-    print("Usage: python sweep_time_shift.py")
-    print("(Requires candidates to be loaded first)")
+    parser = argparse.ArgumentParser(description="Time-Shifted Replay Runner")
+    parser.add_argument("--candidates", required=True, help="MEMCandidates JSONL file")
+    parser.add_argument("--db", default=None,
+                        help="Replay against this SEM database's history instead of SEM_SNAPSHOTS")
+    parser.add_argument("--point", action="append", default=[], metavar="VERSION:TICK",
+                        help="Historical state to replay against (with --db; repeatable)")
+    parser.add_argument("--output-dir", default="training_artifacts/time_shifts", help="Output directory")
+    args = parser.parse_args()
+
+    if bool(args.db) != bool(args.point):
+        parser.error("--db and --point go together")
+    snapshots = None
+    if args.db:
+        if not sem_shards.exists(args.db):
+            print(f"Database {args.db} not found.")
+            sys.exit(1)
+        snapshots = snapshots_from_history(args.db, args.point)
+    run_all_time_shifts(load_candidates(args.candidates), args.output_dir, snapshots=snapshots)